@@ -1,24 +1,101 @@
 from django.contrib import admin
+from django.db.models.functions import Substr
 
-from .models import Consultation, Patient
+from .admin_utils import ScalableAdminMixin
+from .models import Consultation, ConsultationSummary, Patient, SummaryBatch, SummaryBatchFailure, SummaryTiming
 
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "full_name", "email", "date_of_birth")
-    search_fields = ("full_name", "email")
+    # Prefix matches only: served by the UPPER() trigram indexes on Postgres.
+    search_fields = ("^full_name", "^email")
+    search_help_text = "Start of the patient's name or email."
     list_filter = ("date_of_birth",)
     ordering = ("full_name",)
 
+    def get_list_queryset(self, queryset):
+        return queryset.defer("longitudinal_summary")
+
+
+class ConsultationSummaryInline(admin.TabularInline):
+    model = ConsultationSummary
+    fields = ("version", "provider", "model", "created_at", "text")
+    readonly_fields = fields
+    ordering = ("-version",)
+    extra = 0
+    can_delete = False
+
 
 @admin.register(Consultation)
-class ConsultationAdmin(admin.ModelAdmin):
+class ConsultationAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "patient", "created_at", "short_symptoms")
-    list_filter = ("created_at",)
-    search_fields = ("patient__full_name", "symptoms", "diagnosis")
+    list_select_related = ("patient",)
+    date_hierarchy = "created_at"
+    # Exact or prefix lookups only — no substring scans of the notes.
+    search_fields = ("=id", "^patient__full_name", "=patient__email")
+    search_help_text = "Consultation ID, patient email, or the start of the patient's name."
     readonly_fields = ("created_at",)
-    ordering = ("-created_at",)
+    autocomplete_fields = ("patient",)
+    exclude = ("current_summary",)
+    inlines = (ConsultationSummaryInline,)
+    # Primary key order follows creation order and enables keyset paging.
+    ordering = ("-pk",)
+
+    def get_list_queryset(self, queryset):
+        return queryset.defer("symptoms", "diagnosis", "patient__longitudinal_summary").annotate(
+            symptoms_preview=Substr("symptoms", 1, 81)
+        )
 
     @admin.display(description="Symptoms")
     def short_symptoms(self, obj):
-        return obj.symptoms[:80] + "…" if len(obj.symptoms) > 80 else obj.symptoms
+        text = obj.symptoms_preview
+        return text[:80] + "…" if len(text) > 80 else text
+
+
+@admin.register(SummaryTiming)
+class SummaryTimingAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "created_at", "consultation_id", "provider", "model", "outcome",
+        "queue_ms", "fetch_ms", "provider_ms", "save_ms", "total_ms",
+        "prompt_tokens", "completion_tokens",
+    )
+    list_filter = ("outcome", "provider", "model")
+    date_hierarchy = "created_at"
+    ordering = ("-pk",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SummaryBatch)
+class SummaryBatchAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at", "remote_id", "provider", "model", "status", "remote_status",
+        "applied_count", "failed_count", "completed_at",
+    )
+    list_filter = ("status", "provider")
+    exclude = ("consultation_ids",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SummaryBatchFailure)
+class SummaryBatchFailureAdmin(admin.ModelAdmin):
+    """Deleting a row lets the consultation be batched again."""
+
+    list_display = ("consultation_id", "attempts", "last_batch", "updated_at")
+    raw_id_fields = ("consultation", "last_batch")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
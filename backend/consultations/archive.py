@@ -0,0 +1,170 @@
+"""
+Cold-data archival for consultations.
+
+Consultations older than a cutoff are moved, in batches, from the hot
+``Consultation`` table into ``ArchivedConsultation`` as zlib-compressed JSON.
+Each batch is copied and deleted in a single transaction, so a consultation
+is always in exactly one of the two tables.
+
+On Postgres the archive is range-partitioned by month on ``created_at``;
+partitions are created on demand before each batch is written (and can be
+pre-created with ``manage.py maintain_archive_partitions``).
+"""
+
+import json
+import logging
+import zlib
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+
+from .models import ArchivedConsultation, Consultation, ConsultationSummary
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_VERSION = 1
+
+
+# ── Payload encoding ────────────────────────────────────────────────
+def pack_consultation(consultation: Consultation) -> bytes:
+    """
+    Serialise the consultation's text fields into a compressed payload.
+
+    Only the current summary version is kept; older versions are dropped
+    with the hot row.
+    """
+    data = {
+        "v": PAYLOAD_VERSION,
+        "symptoms": consultation.symptoms,
+        "diagnosis": consultation.diagnosis,
+        "ai_summary": consultation.ai_summary,
+        "ai_summary_data": consultation.current_summary.data if consultation.current_summary else None,
+    }
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode(), level=9)
+
+
+def unpack_consultation(archived: ArchivedConsultation) -> Consultation:
+    """Rebuild an unsaved, read-only Consultation from an archive row."""
+    data = json.loads(zlib.decompress(bytes(archived.payload)))
+    summary = data["ai_summary"]
+    return Consultation(
+        id=archived.consultation_id,
+        patient=archived.patient,
+        created_at=archived.created_at,
+        symptoms=data["symptoms"],
+        diagnosis=data["diagnosis"],
+        current_summary=(
+            ConsultationSummary(text=summary, data=data.get("ai_summary_data"))
+            if summary is not None
+            else None
+        ),
+    )
+
+
+def get_archived_consultation(pk: int) -> Consultation | None:
+    archived = (
+        ArchivedConsultation.objects.select_related("patient")
+        .filter(consultation_id=pk)
+        .first()
+    )
+    return unpack_consultation(archived) if archived else None
+
+
+# ── Partitions (Postgres only) ──────────────────────────────────────
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{ArchivedConsultation._meta.db_table}_p{month:%Y%m}"
+
+
+def ensure_partitions(start: datetime, end: datetime) -> list[str]:
+    """
+    Create monthly archive partitions covering ``[start, end]``.
+
+    Returns the names of the partitions covering the range.  A no-op on
+    databases without declarative partitioning.
+    """
+    if connection.vendor != "postgresql":
+        return []
+
+    table = ArchivedConsultation._meta.db_table
+    names = []
+    month = _month_start(start)
+    with connection.cursor() as cursor:
+        while month <= end:
+            upper = _next_month(month)
+            name = partition_name(month)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [month, upper],
+            )
+            names.append(name)
+            month = upper
+    return names
+
+
+def list_partitions() -> list[tuple[str, int]]:
+    """Return ``(partition, estimated_rows)`` pairs for the archive table."""
+    if connection.vendor != "postgresql":
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, GREATEST(child.reltuples, 0)::bigint
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [ArchivedConsultation._meta.db_table],
+        )
+        return cursor.fetchall()
+
+
+# ── Archival ─────────────────────────────────────────────────────────
+def archive_consultations(cutoff: datetime, batch_size: int = 1000) -> int:
+    """
+    Move consultations created before *cutoff* into the archive.
+
+    Batches are taken oldest first via ``idx_consultation_created``.
+    Returns the number of consultations archived.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Consultation.objects.select_related("current_summary")
+                .select_for_update(of=("self",))
+                .filter(created_at__lt=cutoff)
+                .order_by("created_at")[:batch_size]
+            )
+            if not batch:
+                break
+
+            ensure_partitions(batch[0].created_at, batch[-1].created_at)
+            ArchivedConsultation.objects.bulk_create(
+                ArchivedConsultation(
+                    consultation_id=consultation.pk,
+                    created_at=consultation.created_at,
+                    patient_id=consultation.patient_id,
+                    payload=pack_consultation(consultation),
+                )
+                for consultation in batch
+            )
+            Consultation.objects.filter(pk__in=[c.pk for c in batch]).delete()
+
+        archived += len(batch)
+        logger.info("Archived %d consultations (up to %s).", archived, batch[-1].created_at)
+
+    return archived
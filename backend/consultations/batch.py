@@ -0,0 +1,309 @@
+"""
+Batch summaries for backfills.
+
+Per-request chat completions are the slowest and most expensive way to
+summarise a large backlog.  Instead:
+  - ``submit_batch()`` writes the summary request of every pending
+    consultation (no summary yet, not in a submitted batch) to a JSONL file
+    in the provider's batch format, uploads it and starts a batch,
+  - ``poll_batches()`` checks the submitted batches and, once one has
+    finished, applies its results in bulk: a new ConsultationSummary
+    version per consultation and one roll-up task per patient.
+
+Batches go to "openai" ("auto" uses it too) or "mock", whose
+SimulatedClient processes batch files locally so the pipeline runs offline;
+Ollama has no batch API.  Notes over the prompt budget need the map-reduce
+path and are left to ``generate_summary_task``.  Requests that fail in a
+batch are picked up again by the next ``submit_batch()``, until a
+consultation has failed in AI_BATCH_MAX_ATTEMPTS batches (counted in
+SummaryBatchFailure): it is then handed to ``generate_summary_task`` and no
+longer batched, so a request that always fails cannot hold a slot forever.
+
+Request and result files are kept in AI_BATCH_DIR.
+"""
+
+import json
+import logging
+import time
+import uuid
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import providers
+from .models import Consultation, ConsultationSummary, SummaryBatch, SummaryBatchFailure
+from .outbox import enqueue
+from .services import AIServiceError, parse_summary, summary_request
+from .tasks import generate_summary_task, update_patient_summary_task
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROVIDERS = ("openai", "mock")
+ENDPOINT = "/v1/chat/completions"
+CUSTOM_ID_PREFIX = "consultation-"
+# Provider statuses after which a batch produces no more results.
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Results applied per transaction.
+APPLY_CHUNK_SIZE = 1000
+
+
+def batch_provider() -> str:
+    """The provider batches are sent to, from AI_PROVIDER."""
+    provider = settings.AI_PROVIDER.lower()
+    if provider == "auto":
+        provider = "openai"
+    if provider not in BATCH_PROVIDERS:
+        raise AIServiceError(f"AI provider {provider!r} does not support batch requests.")
+    return provider
+
+
+def _batch_dir() -> Path:
+    path = Path(settings.AI_BATCH_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# ── Submit ───────────────────────────────────────────────────────────
+def pending_consultations():
+    """
+    Consultations without a summary that no submitted batch covers and
+    that have not failed in AI_BATCH_MAX_ATTEMPTS batches.
+    """
+    in_flight = set(
+        chain.from_iterable(
+            SummaryBatch.objects.filter(status=SummaryBatch.STATUS_SUBMITTED).values_list(
+                "consultation_ids", flat=True
+            )
+        )
+    )
+    consultations = (
+        Consultation.objects.filter(current_summary__isnull=True)
+        .exclude(symptoms="")
+        .exclude(
+            pk__in=SummaryBatchFailure.objects.filter(
+                attempts__gte=settings.AI_BATCH_MAX_ATTEMPTS
+            ).values("consultation_id")
+        )
+        .order_by("pk")
+        .only("pk", "patient_id", "symptoms", "diagnosis")
+    )
+    for consultation in consultations.iterator(chunk_size=2000):
+        if consultation.pk not in in_flight and consultation.symptoms.strip():
+            yield consultation
+
+
+def submit_batch(limit: int | None = None) -> SummaryBatch | None:
+    """
+    Submit one batch of up to *limit* (default AI_BATCH_MAX_REQUESTS)
+    pending consultations.  Returns None when there is nothing to submit.
+    """
+    limit = min(limit or settings.AI_BATCH_MAX_REQUESTS, settings.AI_BATCH_MAX_REQUESTS)
+    provider = batch_provider()
+    client, model = providers.get_client_and_model(provider)
+
+    lines, consultation_ids, oversized = [], [], 0
+    for consultation in pending_consultations():
+        body = summary_request(consultation.symptoms, consultation.diagnosis, model)
+        if body is None:
+            oversized += 1
+            continue
+        lines.append({"custom_id": f"{CUSTOM_ID_PREFIX}{consultation.pk}", "method": "POST", "url": ENDPOINT, "body": body})
+        consultation_ids.append(consultation.pk)
+        if len(consultation_ids) >= limit:
+            break
+    if oversized:
+        logger.info("Left %d consultations over the prompt budget to per-request summaries.", oversized)
+    if not consultation_ids:
+        client.close()
+        return None
+
+    path = _batch_dir() / f"summaries-{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.jsonl"
+    content = "".join(json.dumps(line) + "\n" for line in lines).encode()
+    path.write_bytes(content)
+    try:
+        upload = client.files.create(file=(path.name, content), purpose="batch")
+        remote = client.batches.create(
+            input_file_id=upload.id,
+            endpoint=ENDPOINT,
+            completion_window=settings.AI_BATCH_COMPLETION_WINDOW,
+        )
+    finally:
+        client.close()
+
+    batch = SummaryBatch.objects.create(
+        provider=provider,
+        model=model,
+        remote_id=remote.id,
+        remote_status=remote.status or "",
+        input_file=str(path),
+        consultation_ids=consultation_ids,
+    )
+    logger.info("Submitted batch %s with %d consultations.", batch.remote_id, len(consultation_ids))
+    return batch
+
+
+# ── Poll and apply ───────────────────────────────────────────────────
+def poll_batches() -> list[SummaryBatch]:
+    """
+    Check every submitted batch and apply the results of the finished
+    ones.  Returns the batches that finished.
+    """
+    finished = []
+    clients = {}
+    try:
+        for batch in SummaryBatch.objects.filter(status=SummaryBatch.STATUS_SUBMITTED).order_by("pk"):
+            if batch.provider not in clients:
+                clients[batch.provider] = providers.get_client_and_model(batch.provider)[0]
+            if _poll(clients[batch.provider], batch):
+                finished.append(batch)
+    finally:
+        for client in clients.values():
+            client.close()
+    return finished
+
+
+def _poll(client, batch: SummaryBatch) -> bool:
+    remote = client.batches.retrieve(batch.remote_id)
+    batch.remote_status = remote.status or ""
+    if remote.status not in FINISHED_STATUSES:
+        batch.save(update_fields=["remote_status"])
+        return False
+
+    results, failed = {}, 0
+    if remote.output_file_id:
+        results, failed = parse_results(_download(client, batch, remote.output_file_id, "output"))
+    if remote.error_file_id:
+        failed += len(_download(client, batch, remote.error_file_id, "errors").splitlines())
+
+    batch.applied_count = apply_results(batch, results)
+    record_failures(batch, [pk for pk in batch.consultation_ids if pk not in results])
+    batch.failed_count = failed
+    batch.status = SummaryBatch.STATUS_COMPLETED if remote.status == "completed" else SummaryBatch.STATUS_FAILED
+    batch.completed_at = timezone.now()
+    batch.save(update_fields=["remote_status", "status", "applied_count", "failed_count", "completed_at"])
+    logger.info(
+        "Batch %s %s: %d summaries applied, %d requests failed.",
+        batch.remote_id, remote.status, batch.applied_count, failed,
+    )
+    return True
+
+
+def _download(client, batch: SummaryBatch, file_id: str, kind: str) -> str:
+    text = client.files.content(file_id).text
+    Path(batch.input_file).with_suffix(f".{kind}.jsonl").write_text(text)
+    return text
+
+
+def parse_results(text: str) -> tuple[dict[int, str], int]:
+    """
+    Answer per consultation id from a batch output file, and the number of
+    lines that did not carry a usable completion.
+    """
+    results, failed = {}, 0
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            result = json.loads(line)
+            consultation_id = int(result["custom_id"].removeprefix(CUSTOM_ID_PREFIX))
+            response = result["response"]
+            if response["status_code"] != 200:
+                raise ValueError(f"status {response['status_code']}")
+            text = response["body"]["choices"][0]["message"]["content"].strip()
+            if not text:
+                raise ValueError("empty completion")
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            logger.warning("Unusable batch result line (%s): %.200s", exc, line)
+            failed += 1
+            continue
+        results[consultation_id] = text
+    return results, failed
+
+
+def apply_results(batch: SummaryBatch, results: dict[int, str]) -> int:
+    """
+    Store *results* as new summary versions of the consultations that
+    still have none, in bulk; returns the number applied.  Consultations
+    summarised meanwhile (e.g. regenerated on request) are left alone.
+    """
+    applied = 0
+    ids = sorted(results)
+    for start in range(0, len(ids), APPLY_CHUNK_SIZE):
+        chunk = ids[start : start + APPLY_CHUNK_SIZE]
+        with transaction.atomic():
+            consultations = list(
+                Consultation.objects.select_for_update()
+                .filter(pk__in=chunk, current_summary__isnull=True)
+                .only("pk", "patient_id")
+                .order_by("pk")
+            )
+            if not consultations:
+                continue
+            latest = dict(
+                ConsultationSummary.objects.filter(consultation__in=consultations)
+                .order_by()
+                .values("consultation")
+                .annotate(latest=Max("version"))
+                .values_list("consultation", "latest")
+            )
+            summaries = []
+            for consultation in consultations:
+                text, data = parse_summary(results[consultation.pk])
+                summaries.append(
+                    ConsultationSummary(
+                        consultation=consultation,
+                        version=latest.get(consultation.pk, 0) + 1,
+                        text=text,
+                        data=data,
+                        provider=batch.provider,
+                        model=batch.model,
+                    )
+                )
+            summaries = ConsultationSummary.objects.bulk_create(summaries)
+            for consultation, summary in zip(consultations, summaries):
+                consultation.current_summary = summary
+            Consultation.objects.bulk_update(consultations, ["current_summary"])
+            for patient_id in sorted({consultation.patient_id for consultation in consultations}):
+                enqueue(update_patient_summary_task, patient_id)
+        applied += len(consultations)
+    return applied
+
+
+def record_failures(batch: SummaryBatch, consultation_ids: list[int]) -> None:
+    """
+    Count one more failed batch for each of *consultation_ids* (those
+    *batch* returned no usable summary for).  Consultations reaching
+    AI_BATCH_MAX_ATTEMPTS are handed to ``generate_summary_task``.
+    """
+    with transaction.atomic():
+        # Not those deleted or summarised (e.g. regenerated) meanwhile.
+        consultation_ids = list(
+            Consultation.objects.filter(pk__in=consultation_ids, current_summary__isnull=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if not consultation_ids:
+            return
+        failures = SummaryBatchFailure.objects.filter(consultation_id__in=consultation_ids)
+        failures.update(attempts=F("attempts") + 1, last_batch=batch, updated_at=timezone.now())
+        SummaryBatchFailure.objects.bulk_create(
+            [
+                SummaryBatchFailure(consultation_id=pk, attempts=1, last_batch=batch)
+                for pk in consultation_ids
+            ],
+            ignore_conflicts=True,
+        )
+        exhausted = list(
+            failures.filter(attempts=settings.AI_BATCH_MAX_ATTEMPTS).values_list("consultation_id", flat=True)
+        )
+        for consultation_id in sorted(exhausted):
+            enqueue(generate_summary_task, consultation_id, enqueued_at=time.time())
+    if exhausted:
+        logger.warning(
+            "%d consultations failed in %d batches; left to per-request summaries.",
+            len(exhausted), settings.AI_BATCH_MAX_ATTEMPTS,
+        )
@@ -0,0 +1,287 @@
+"""
+Consultation embeddings and the in-process similarity index.
+
+Embeddings are produced by a pluggable embedder chosen by
+settings.AI_EMBEDDING_PROVIDER:
+  "hashing" — deterministic local hashing vectorizer (offline, no model)
+  "openai"  — the OpenAI embeddings API
+  "ollama"  — a local Ollama embedding model via its OpenAI-compatible API
+
+Vectors are L2-normalised and stored as raw little-endian float32 bytes in
+ConsultationEmbedding, one row per consultation.  They are written by
+``embed_consultation_task`` after a consultation is created (or in bulk by
+``manage.py embed_consultations``).
+
+Each process keeps a NumPy matrix of all stored vectors.  The matrix is
+loaded on first use (or at worker start, with SIMILAR_CONSULTATIONS_PRELOAD)
+and then caught up incrementally: every lookup first loads embedding rows
+with a ``seq`` above the last one seen.  ``seq`` comes from a ChangeCounter,
+so rows become visible in seq order and none is skipped.  Queries
+for an existing consultation reuse its stored vector, so answering never
+calls a provider.  Search is an exact dot-product scan.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import EMBEDDING_CHANGES, ChangeCounter, Consultation, ConsultationEmbedding
+from . import providers
+from .services import AIServiceError
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPE = np.dtype("<f4")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# ── Encoding ─────────────────────────────────────────────────────────
+def vector_to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+def vector_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype=VECTOR_DTYPE)
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(VECTOR_DTYPE)
+
+
+def consultation_text(consultation: Consultation) -> str:
+    return f"{consultation.symptoms}\n{consultation.diagnosis}".strip()
+
+
+# ── Embedders ────────────────────────────────────────────────────────
+class HashingEmbedder:
+    """
+    Feature-hashing bag of words and word bigrams.
+
+    Each feature is hashed with BLAKE2b (stable across processes, unlike
+    ``hash()``) into one of *dimensions* buckets with a +/-1 sign.
+    """
+
+    local = True
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> list[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=VECTOR_DTYPE)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                vectors[row, (digest >> 1) % self.dimensions] += 1.0 if digest & 1 else -1.0
+        return _normalise(vectors)
+
+
+class ProviderEmbedder:
+    """Embeddings from OpenAI or Ollama through the OpenAI SDK."""
+
+    local = False
+
+    def __init__(self, provider: str, model: str, dimensions: int):
+        self.provider = provider
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"{provider}:{model}@{dimensions}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        client, _ = providers.get_client_and_model(self.provider)
+        # Only OpenAI's text-embedding-3 models can shorten their output.
+        extra = {"dimensions": self.dimensions} if self.provider == "openai" else {}
+        try:
+            response = client.embeddings.create(model=self.model, input=texts, **extra)
+        except Exception as exc:
+            raise AIServiceError(f"Embedding request failed: {exc}") from exc
+        finally:
+            client.close()
+        vectors = np.array([item.embedding for item in response.data], dtype=VECTOR_DTYPE)
+        return _normalise(vectors[:, : self.dimensions])
+
+
+def get_embedder():
+    """Return the embedder configured by AI_EMBEDDING_PROVIDER."""
+    provider = settings.AI_EMBEDDING_PROVIDER.lower()
+    if provider == "hashing":
+        return HashingEmbedder(settings.AI_EMBEDDING_DIMENSIONS)
+    if provider in ("openai", "ollama"):
+        return ProviderEmbedder(provider, settings.AI_EMBEDDING_MODEL, settings.AI_EMBEDDING_DIMENSIONS)
+    raise AIServiceError(f"Unknown AI_EMBEDDING_PROVIDER {provider!r}.")
+
+
+def embed_consultations(consultations: list[Consultation], embedder=None) -> int:
+    """
+    Embed *consultations* in one call and store (or replace) their vectors.
+
+    Replaced rows are deleted and re-inserted with new ``seq`` stamps so
+    that they are picked up by the indexes' incremental sync.
+    """
+    if not consultations:
+        return 0
+    embedder = embedder or get_embedder()
+    vectors = embedder.embed([consultation_text(c) for c in consultations])
+    with transaction.atomic():
+        last = ChangeCounter.next(EMBEDDING_CHANGES, len(consultations))
+        ConsultationEmbedding.objects.filter(consultation__in=consultations).delete()
+        ConsultationEmbedding.objects.bulk_create(
+            ConsultationEmbedding(
+                consultation=consultation,
+                embedder=embedder.name,
+                vector=vector_to_bytes(vector),
+                seq=seq,
+            )
+            for seq, consultation, vector in zip(
+                range(last - len(consultations) + 1, last + 1), consultations, vectors
+            )
+        )
+    return len(consultations)
+
+
+# ── Similarity index ─────────────────────────────────────────────────
+class SimilarityIndex:
+    """
+    Incrementally built, exact top-k cosine index over stored embeddings.
+
+    Holds one float32 row per consultation (``4 × dimensions`` bytes); the
+    matrix grows by doubling so appends are amortised O(1).
+    """
+
+    SYNC_BATCH_SIZE = 10_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, embedder_name: str | None = None) -> None:
+        self.embedder_name = embedder_name
+        self._vectors = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows: dict[int, int] = {}
+        self._size = 0
+        self._watermark = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def sync(self, embedder_name: str) -> int:
+        """Load embedding rows stored since the last sync; return how many."""
+        with self._lock:
+            if embedder_name != self.embedder_name:
+                self.reset(embedder_name)
+
+            loaded = 0
+            while True:
+                batch = list(
+                    ConsultationEmbedding.objects.filter(
+                        embedder=embedder_name, seq__gt=self._watermark
+                    )
+                    .order_by("seq")
+                    .values_list("seq", "consultation_id", "vector")[: self.SYNC_BATCH_SIZE]
+                )
+                if not batch:
+                    if loaded:
+                        logger.info("Loaded %d embeddings into the similarity index.", loaded)
+                    return loaded
+                seqs, ids, blobs = zip(*batch)
+                vectors = np.frombuffer(b"".join(bytes(blob) for blob in blobs), dtype=VECTOR_DTYPE)
+                self._add(np.asarray(ids, dtype=np.int64), vectors.reshape(len(ids), -1))
+                self._watermark = seqs[-1]
+                loaded += len(batch)
+
+    def add(self, ids, vectors: np.ndarray) -> None:
+        """Add or replace vectors (``(n, dimensions)``) for consultation *ids*."""
+        with self._lock:
+            self._add(np.asarray(ids, dtype=np.int64), np.asarray(vectors, dtype=VECTOR_DTYPE))
+
+    def _add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        if self._vectors is None:
+            self._vectors = np.empty((max(len(ids), 1024), vectors.shape[1]), dtype=VECTOR_DTYPE)
+            self._ids = np.empty(len(self._vectors), dtype=np.int64)
+
+        for consultation_id, vector in zip(ids.tolist(), vectors):
+            row = self._rows.get(consultation_id)
+            if row is None:
+                if self._size == len(self._vectors):
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._rows[consultation_id] = row
+                self._ids[row] = consultation_id
+            self._vectors[row] = vector
+
+    def _grow(self) -> None:
+        capacity = len(self._vectors) * 2
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=VECTOR_DTYPE)
+        vectors[: self._size] = self._vectors[: self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        self._vectors, self._ids = vectors, ids
+
+    def remove(self, consultation_ids) -> None:
+        """Drop consultations (e.g. deleted or archived) from the index."""
+        with self._lock:
+            for consultation_id in consultation_ids:
+                row = self._rows.pop(consultation_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved = int(self._ids[last])
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._size = last
+
+    def vector(self, consultation_id: int) -> np.ndarray | None:
+        with self._lock:
+            row = self._rows.get(consultation_id)
+            return None if row is None else self._vectors[row].copy()
+
+    def search(self, vector: np.ndarray, k: int, exclude=()) -> list[tuple[int, float]]:
+        """Return up to *k* ``(consultation_id, cosine_similarity)`` pairs, best first."""
+        with self._lock:
+            if not self._size or k <= 0:
+                return []
+            scores = self._vectors[: self._size] @ np.asarray(vector, dtype=VECTOR_DTYPE)
+            for consultation_id in exclude:
+                row = self._rows.get(consultation_id)
+                if row is not None:
+                    scores[row] = -np.inf
+
+            k = min(k, self._size)
+            top = np.argpartition(scores, self._size - k)[self._size - k :]
+            top = top[np.argsort(scores[top])[::-1]]
+            return [
+                (int(self._ids[row]), float(scores[row]))
+                for row in top
+                if scores[row] != -np.inf
+            ]
+
+
+similarity_index = SimilarityIndex()
+
+
+def preload_similarity_index() -> None:
+    """
+    Load every stored vector now rather than in the first similar-consultation
+    request (see SIMILAR_CONSULTATIONS_PRELOAD).  Failures are logged, never
+    raised: a web worker must start even when the database is not ready yet.
+    """
+    try:
+        similarity_index.sync(get_embedder().name)
+    except Exception as exc:
+        logger.warning("Could not preload the similarity index: %s", exc)
@@ -1,9 +1,57 @@
+import json
+
+from django.db import connections
 from django_filters import rest_framework as filters
-from .models import Consultation
+from .models import Consultation, Patient
 
 class ConsultationFilter(filters.FilterSet):
+    """
+    ?patient=ID&created_after=...&created_before=...&complaint=...
+
+    Range bounds accept ISO dates or datetimes (``created_before`` is
+    exclusive).  Combined with ``patient`` the query is served by
+    ``idx_patient_created``; pure time ranges use ``idx_consultation_created``
+    (or the BRIN index on Postgres).
+
+    ``complaint`` matches a chief complaint of the current structured
+    summary exactly (case-insensitively); on Postgres through the GIN index
+    on the summary data.
+    """
+
     patient = filters.NumberFilter(field_name="patient")
+    created_after = filters.DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = filters.DateTimeFilter(field_name="created_at", lookup_expr="lt")
+    complaint = filters.CharFilter(method="filter_complaint")
 
     class Meta:
         model = Consultation
-        fields = ["patient"]
+        fields = ["patient", "created_after", "created_before", "complaint"]
+
+    def filter_complaint(self, queryset, name, value):
+        # Stored complaints are normalised the same way (validate_summary_data).
+        complaint = " ".join(value.split()).lower()
+        if not complaint:
+            return queryset
+        if connections[queryset.db].vendor == "postgresql":
+            return queryset.filter(current_summary__data__contains={"chief_complaints": [complaint]})
+        # No JSON containment elsewhere: match the quoted string in the list.
+        return queryset.filter(current_summary__data__chief_complaints__icontains=json.dumps(complaint))
+
+
+class PatientFilter(filters.FilterSet):
+    min_consultations = filters.NumberFilter(field_name="consultation_count", lookup_expr="gte")
+    max_consultations = filters.NumberFilter(field_name="consultation_count", lookup_expr="lte")
+    last_visit_after = filters.DateTimeFilter(field_name="last_consultation_at", lookup_expr="gte")
+    last_visit_before = filters.DateTimeFilter(field_name="last_consultation_at", lookup_expr="lt")
+    ordering = filters.OrderingFilter(
+        fields=("full_name", "consultation_count", "last_consultation_at"),
+    )
+
+    class Meta:
+        model = Patient
+        fields = [
+            "min_consultations",
+            "max_consultations",
+            "last_visit_after",
+            "last_visit_before",
+        ]
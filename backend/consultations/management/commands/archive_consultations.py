@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from consultations.archive import archive_consultations
+from consultations.models import Consultation
+
+
+class Command(BaseCommand):
+    help = "Move consultations older than a cutoff into compressed archive storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=365,
+            help="Archive consultations created more than N days ago (default: 365).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Consultations moved per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many consultations would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+
+        if options["dry_run"]:
+            count = Consultation.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(f"{count} consultations created before {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        archived = archive_consultations(cutoff, batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} consultations created before {cutoff:%Y-%m-%d}.")
+        )
@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from consultations.batch import poll_batches, submit_batch
+from consultations.models import SummaryBatch
+from consultations.services import AIServiceError
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise consultations that have no summary through the provider's "
+        "batch API: submit a batch of pending consultations, then poll the "
+        "submitted batches and apply the results of finished ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=settings.AI_BATCH_MAX_REQUESTS,
+            help="Consultations per submitted batch (default: AI_BATCH_MAX_REQUESTS).",
+        )
+        parser.add_argument(
+            "--no-submit",
+            action="store_true",
+            help="Only poll the batches already submitted.",
+        )
+        parser.add_argument(
+            "--wait",
+            action="store_true",
+            help="Keep polling until no submitted batch is left.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.AI_BATCH_POLL_INTERVAL,
+            help="Seconds between polls with --wait (default: AI_BATCH_POLL_INTERVAL).",
+        )
+
+    def handle(self, *args, **options):
+        pending = 0
+        try:
+            if not options["no_submit"]:
+                batch = submit_batch(options["limit"])
+                if batch is None:
+                    self.stdout.write("No pending consultations to submit.")
+                else:
+                    self.stdout.write(
+                        f"Submitted batch {batch.remote_id} with {len(batch.consultation_ids)} consultations."
+                    )
+
+            while True:
+                close_old_connections()
+                for batch in poll_batches():
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Batch {batch.remote_id} {batch.remote_status}: "
+                            f"{batch.applied_count} summaries applied, {batch.failed_count} failed."
+                        )
+                    )
+                pending = SummaryBatch.objects.filter(status=SummaryBatch.STATUS_SUBMITTED).count()
+                if not options["wait"] or not pending:
+                    break
+                time.sleep(options["interval"])
+        except AIServiceError as exc:
+            raise CommandError(str(exc))
+        except KeyboardInterrupt:
+            pass
+
+        if pending:
+            self.stdout.write(f"{pending} batches still in progress.")
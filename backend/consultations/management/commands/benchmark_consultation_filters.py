@@ -0,0 +1,121 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from consultations.filters import ConsultationFilter
+from consultations.models import Consultation, Patient
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN plans and timings for the consultation date-range "
+        "filters, to confirm which indexes the planner picks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Insert N synthetic consultations spread over --days first. "
+            "Only use against a scratch database.",
+        )
+        parser.add_argument("--days", type=int, default=365, help="Days of history to seed (default: 365).")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (default: 5).")
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Use EXPLAIN ANALYZE on Postgres (executes the query).",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self._seed(options["seed"], options["days"])
+            self._analyze_tables()
+
+        patient_id = Consultation.objects.values_list("patient_id", flat=True).first()
+        if patient_id is None:
+            self.stderr.write("No consultations found — run with --seed N on a scratch database.")
+            return
+
+        now = timezone.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        scenarios = {
+            "last 7 days": {"created_after": (now - timedelta(days=7)).isoformat()},
+            "this month": {"created_after": month_start.isoformat()},
+            "patient + last 7 days": {
+                "patient": patient_id,
+                "created_after": (now - timedelta(days=7)).isoformat(),
+            },
+        }
+
+        # No ORDER BY / LIMIT: a pure range scan, which is what the BRIN
+        # index on created_at is for (the pages above use the B-trees).
+        range_scenarios = {
+            "daily counts, 90 to 30 days ago": {
+                "created_after": (now - timedelta(days=90)).isoformat(),
+                "created_before": (now - timedelta(days=30)).isoformat(),
+            },
+        }
+
+        explain_options = {"analyze": True} if options["analyze"] and connection.vendor == "postgresql" else {}
+        for name, params in scenarios.items():
+            queryset = ConsultationFilter(params, queryset=Consultation.objects.all()).qs
+            self._report(name, params, queryset[:10].values_list("pk", flat=True), explain_options, options["repeat"])
+        for name, params in range_scenarios.items():
+            queryset = (
+                ConsultationFilter(params, queryset=Consultation.objects.all())
+                .qs.order_by()
+                .values(day=TruncDate("created_at"))
+                .annotate(consultations=Count("pk"))
+            )
+            self._report(name, params, queryset, explain_options, options["repeat"])
+
+    def _report(self, name, params, queryset, explain_options, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}  {params}"))
+        self.stdout.write(queryset.explain(**explain_options))
+        self.stdout.write(f"median {statistics.median(timings):.2f} ms over {len(timings)} runs\n")
+
+    def _seed(self, total, days):
+        patients = [
+            Patient(full_name=f"Benchmark Patient {i}", date_of_birth="1980-01-01", email=f"bench{i}@example.invalid")
+            for i in range(max(1, total // 20))
+        ]
+        Patient.objects.bulk_create(patients, ignore_conflicts=True)
+        patient_ids = list(
+            Patient.objects.filter(email__endswith="@example.invalid").values_list("pk", flat=True)
+        )
+
+        now = timezone.now()
+        per_day = max(1, total // days)
+        created = 0
+        for day in range(days):
+            if created >= total:
+                break
+            batch = [
+                Consultation(patient_id=patient_ids[(created + i) % len(patient_ids)], symptoms="Benchmark symptoms")
+                for i in range(min(per_day, total - created))
+            ]
+            pks = [obj.pk for obj in Consultation.objects.bulk_create(batch)]
+            # auto_now_add always stamps "now"; spread rows over the history.
+            Consultation.objects.filter(pk__in=pks).update(created_at=now - timedelta(days=days - day))
+            created += len(batch)
+
+        Patient.objects.filter(pk__in=patient_ids).refresh_consultation_stats()
+        self.stdout.write(f"Seeded {created} consultations over {days} days.")
+
+    def _analyze_tables(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from consultations.embeddings import SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Time top-k lookups on an in-memory similarity index filled with "
+        "synthetic vectors (no database access)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Indexed vectors (default: 1000000).")
+        parser.add_argument(
+            "--dimensions",
+            type=int,
+            default=settings.AI_EMBEDDING_DIMENSIONS,
+            help="Vector size (default: AI_EMBEDDING_DIMENSIONS).",
+        )
+        parser.add_argument("--k", type=int, default=settings.SIMILAR_CONSULTATIONS_LIMIT)
+        parser.add_argument("--repeat", type=int, default=20, help="Timed lookups (default: 20).")
+
+    def handle(self, *args, **options):
+        rows, dimensions = options["rows"], options["dimensions"]
+        rng = np.random.default_rng(0)
+        index = SimilarityIndex()
+
+        started = time.perf_counter()
+        for start in range(0, rows, 100_000):
+            count = min(100_000, rows - start)
+            vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            index.add(np.arange(start, start + count), vectors)
+        self.stdout.write(
+            f"Built {len(index)} × {dimensions} index in {time.perf_counter() - started:.1f}s "
+            f"({len(index) * dimensions * 4 / 2**20:.0f} MiB)."
+        )
+
+        timings = []
+        for _ in range(options["repeat"]):
+            query_id = int(rng.integers(rows))
+            vector = index.vector(query_id)
+            started = time.perf_counter()
+            index.search(vector, options["k"], exclude={query_id})
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f"top-{options['k']}: median {statistics.median(timings):.1f} ms, "
+            f"p95 {p95:.1f} ms over {len(timings)} lookups"
+        )
@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consultations import providers
+from consultations.routing import LOCAL_PROVIDER
+from consultations.services import summary_request
+from consultations.warmup import unload_model, warm_up, warmup_providers
+
+SYMPTOMS = "Dry cough for five days, mild fever in the evenings, no shortness of breath."
+DIAGNOSIS = "Viral upper respiratory tract infection."
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency of the first summary after a cold start (Ollama "
+        "model unloaded) with the first summary after the worker warm-up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Cold / warm pairs to time (default: 3).")
+
+    def handle(self, *args, **options):
+        if LOCAL_PROVIDER not in warmup_providers():
+            raise CommandError("The warm-up only matters with AI_PROVIDER=ollama or auto.")
+
+        cold, warm, warmups = [], [], []
+        for run in range(1, options["runs"] + 1):
+            unload_model()
+            cold.append(self._first_summary())
+
+            unload_model()
+            started = time.perf_counter()
+            warm_up()
+            warmups.append(time.perf_counter() - started)
+            warm.append(self._first_summary())
+
+            self.stdout.write(
+                f"run {run}: cold {cold[-1]:.2f} s, warm-up {warmups[-1]:.2f} s, warm {warm[-1]:.2f} s"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"median first summary: cold {statistics.median(cold):.2f} s, "
+                f"warm {statistics.median(warm):.2f} s "
+                f"(warm-up {statistics.median(warmups):.2f} s at worker start)"
+            )
+        )
+
+    @staticmethod
+    def _first_summary() -> float:
+        # Straight to Ollama: with AI_PROVIDER=auto the router could answer
+        # from the cloud provider and time the wrong backend.
+        started = time.perf_counter()
+        client, model = providers.get_client_and_model(LOCAL_PROVIDER)
+        try:
+            client.chat.completions.create(**summary_request(SYMPTOMS, DIAGNOSIS, model))
+        except Exception as exc:
+            raise CommandError(f"The Ollama summary failed: {exc}") from exc
+        finally:
+            client.close()
+        return time.perf_counter() - started
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from consultations.outbox import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish tasks from the transactional outbox to the Celery broker. "
+        "Runs until interrupted; full batches are drained back to back and "
+        "the outbox is polled every --interval seconds when idle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help="Tasks published per transaction (default: OUTBOX_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.OUTBOX_POLL_INTERVAL,
+            help="Seconds to sleep when the outbox is empty (default: OUTBOX_POLL_INTERVAL).",
+        )
+        parser.add_argument("--once", action="store_true", help="Drain the outbox once and exit.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                published = dispatch_pending(batch_size)
+                total += published
+                if published == batch_size:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Published {total} outbox tasks.")
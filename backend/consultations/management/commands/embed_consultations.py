@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from consultations.embeddings import embed_consultations, get_embedder
+from consultations.models import Consultation
+
+
+class Command(BaseCommand):
+    help = (
+        "Store embeddings for consultations that have none from the configured "
+        "embedder (e.g. after enabling similar-consultation lookup or switching "
+        "AI_EMBEDDING_PROVIDER)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=256,
+            help="Consultations embedded per provider call (default: 256).",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Re-embed every consultation, not only missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        embedder = get_embedder()
+        queryset = Consultation.objects.order_by("pk").only("symptoms", "diagnosis")
+        if not options["rebuild"]:
+            queryset = queryset.exclude(embedding__embedder=embedder.name)
+
+        embedded, last_pk = 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[: options["batch_size"]])
+            if not batch:
+                break
+            embedded += embed_consultations(batch, embedder)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Embedded {embedded} consultations…")
+
+        self.stdout.write(self.style.SUCCESS(f"Embedded {embedded} consultations with {embedder.name}."))
@@ -0,0 +1,198 @@
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from consultations.models import Consultation, ConsultationSummary, Patient
+from consultations.services import router, summarize_consultation
+from consultations.tasks import generate_summary_task
+
+_WORDS = (
+    "persistent cough fever headache nausea fatigue wheezing chest pain "
+    "shortness of breath dizziness rash swelling joint stiffness since "
+    "three days worse at night after meals mild moderate severe reports "
+    "denies history of hypertension asthma diabetes medication ibuprofen"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test consultation summarisation and report sustained "
+        "summaries/sec and completion-time percentiles per provider "
+        "configuration.  Pair with AI_PROVIDER=mock plus AI_MOCK_* settings, "
+        "or with `manage.py serve_simulated_llm`, to avoid paying for a model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--config",
+            action="append",
+            default=[],
+            metavar="LABEL:SETTING=VALUE,...",
+            help="A configuration to test, e.g. "
+            "'slow:AI_PROVIDER=mock,AI_MOCK_LATENCY=1.5,AI_MOCK_RATE_LIMIT_RATE=0.05'. "
+            "Repeatable; defaults to the current settings.  Inline mode only.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=("inline", "celery"),
+            default="inline",
+            help="inline: call the service from a thread pool in this process. "
+            "celery: enqueue generate_summary_task for synthetic consultations "
+            "and time them end to end through the running workers "
+            "(creates rows — scratch database only).",
+        )
+        parser.add_argument("--count", type=int, default=200, help="Summaries per configuration (default: 200).")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Parallel requests in inline mode (default: 8).",
+        )
+        parser.add_argument("--min-tokens", type=int, default=50, help="Shortest synthetic note (default: 50).")
+        parser.add_argument("--max-tokens", type=int, default=1500, help="Longest synthetic note (default: 1500).")
+        parser.add_argument("--timeout", type=float, default=600.0, help="Celery mode: give up after N seconds.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        notes = [self._note(rng, options["min_tokens"], options["max_tokens"]) for _ in range(options["count"])]
+
+        if options["mode"] == "celery":
+            if options["config"]:
+                raise CommandError("--config only applies to inline mode; configure the workers instead.")
+            rows = [self._run_celery(notes, options["timeout"])]
+        else:
+            configs = [self._parse_config(value) for value in options["config"]] or [
+                (settings.AI_PROVIDER, {})
+            ]
+            rows = []
+            for label, overrides in configs:
+                with override_settings(**overrides):
+                    router.reset()
+                    rows.append(self._run_inline(label, notes, options["concurrency"]))
+        self._report(rows)
+
+    # ── Workloads ────────────────────────────────────────────────────
+    def _note(self, rng, min_tokens, max_tokens):
+        # ~4 characters per token (see services.count_tokens).
+        words = rng.randint(min_tokens, max_tokens) * 4 // 6
+        symptoms = " ".join(rng.choice(_WORDS) for _ in range(max(1, words)))
+        return symptoms, "Suspected " + rng.choice(("asthma", "migraine", "gastritis", "influenza"))
+
+    def _run_inline(self, label, notes, concurrency):
+        def run(note):
+            started = time.perf_counter()
+            try:
+                result = summarize_consultation(*note)
+            except Exception:
+                return time.perf_counter() - started, "error"
+            return time.perf_counter() - started, "fallback" if result.fallback else "ok"
+
+        self.stdout.write(f"Running {label!r}: {len(notes)} summaries, concurrency {concurrency}…")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(run, notes))
+        return self._row(label, results, time.perf_counter() - started)
+
+    def _run_celery(self, notes, timeout):
+        patient = Patient.objects.create(
+            full_name="Load Test Patient",
+            date_of_birth="1980-01-01",
+            email=f"loadtest-{int(time.time())}@example.invalid",
+        )
+        consultations = Consultation.objects.bulk_create(
+            Consultation(patient=patient, symptoms=symptoms, diagnosis=diagnosis)
+            for symptoms, diagnosis in notes
+        )
+        self.stdout.write(f"Enqueuing {len(consultations)} summaries to the Celery workers…")
+
+        enqueued_at = {}
+        for consultation in consultations:
+            enqueued_at[consultation.pk] = timezone.now()
+            generate_summary_task.delay(consultation.pk, enqueued_at=time.time())
+        first_enqueue = min(enqueued_at.values())
+
+        done = {}
+        deadline = time.monotonic() + timeout
+        while len(done) < len(enqueued_at) and time.monotonic() < deadline:
+            time.sleep(0.5)
+            for summary in ConsultationSummary.objects.filter(
+                consultation_id__in=enqueued_at.keys() - done.keys()
+            ).only("consultation_id", "created_at", "provider", "model"):
+                done[summary.consultation_id] = summary
+
+        # Workers share this process's settings; a "mock" summary without a
+        # model from a real provider configuration is a fallback.
+        real_provider = settings.AI_PROVIDER != "mock"
+        results = [
+            (
+                (summary.created_at - enqueued_at[pk]).total_seconds(),
+                "fallback" if real_provider and summary.provider == "mock" and not summary.model else "ok",
+            )
+            for pk, summary in done.items()
+        ]
+        results += [(timeout, "error")] * (len(enqueued_at) - len(done))
+        last_done = max((summary.created_at for summary in done.values()), default=timezone.now())
+        row = self._row("celery workers", results, (last_done - first_enqueue).total_seconds())
+        patient.delete()
+        return row
+
+    # ── Reporting ────────────────────────────────────────────────────
+    @staticmethod
+    def _percentile(values, pct):
+        if not values:
+            return float("nan")
+        return values[max(1, math.ceil(pct / 100 * len(values))) - 1]
+
+    def _row(self, label, results, elapsed):
+        durations = sorted(duration for duration, _ in results)
+        outcomes = [outcome for _, outcome in results]
+        completed = outcomes.count("ok") + outcomes.count("fallback")
+        return {
+            "label": label,
+            "n": len(results),
+            "ok": outcomes.count("ok"),
+            "fallback": outcomes.count("fallback"),
+            "error": outcomes.count("error"),
+            "rate": completed / elapsed if elapsed > 0 else float("nan"),
+            "p50": self._percentile(durations, 50),
+            "p95": self._percentile(durations, 95),
+            "p99": self._percentile(durations, 99),
+        }
+
+    def _report(self, rows):
+        header = f"{'configuration':<24} {'n':>6} {'ok':>6} {'fallbk':>6} {'error':>6} {'sum/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}"
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        for row in rows:
+            self.stdout.write(
+                f"{row['label']:<24} {row['n']:>6} {row['ok']:>6} {row['fallback']:>6} {row['error']:>6} "
+                f"{row['rate']:>8.2f} {row['p50']:>8.3f} {row['p95']:>8.3f} {row['p99']:>8.3f}"
+            )
+
+    @staticmethod
+    def _parse_config(value):
+        label, _, assignments = value.partition(":")
+        if not assignments:
+            label, assignments = value, value
+        overrides = {}
+        for assignment in filter(None, assignments.split(",")):
+            name, sep, raw = (part.strip() for part in assignment.partition("="))
+            if not sep or not hasattr(settings, name):
+                raise CommandError(f"Invalid setting override {assignment!r} in --config {value!r}.")
+            current = getattr(settings, name)
+            try:
+                if isinstance(current, bool):
+                    overrides[name] = raw.lower() in ("1", "true", "yes", "on")
+                elif isinstance(current, (int, float)):
+                    overrides[name] = type(current)(raw)
+                else:
+                    overrides[name] = raw
+            except ValueError as exc:
+                raise CommandError(f"Invalid value for {name}: {raw!r}.") from exc
+        return label, overrides
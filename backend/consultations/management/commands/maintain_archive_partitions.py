@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone as django_timezone
+
+from consultations.archive import ensure_partitions, list_partitions
+from consultations.models import Consultation
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc)
+    except ValueError as exc:
+        raise CommandError(f"Expected YYYY-MM, got {value!r}.") from exc
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly Postgres partitions of the consultation archive "
+        "and list existing ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            help="First month to create (YYYY-MM). Defaults to the month of the oldest hot consultation.",
+        )
+        parser.add_argument(
+            "--end",
+            help="Last month to create (YYYY-MM). Defaults to the current month.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write("The archive is only partitioned on PostgreSQL — nothing to do.")
+            return
+
+        if options["start"]:
+            start = _parse_month(options["start"])
+        else:
+            oldest = Consultation.objects.order_by("created_at").values_list("created_at", flat=True).first()
+            start = oldest or django_timezone.now()
+        end = _parse_month(options["end"]) if options["end"] else django_timezone.now()
+
+        created = ensure_partitions(start, end)
+        self.stdout.write(f"Ensured {len(created)} monthly partitions.")
+        for name, rows in list_partitions():
+            self.stdout.write(f"  {name}  ~{rows} rows")
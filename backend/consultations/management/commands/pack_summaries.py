@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from consultations.batch import pending_consultations
+from consultations.outbox import enqueue
+from consultations.services import summarize_consultations
+from consultations.tasks import update_patient_summary_task
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise consultations that have no summary, packing several short "
+        "notes into each completion. Meant for small local models (Ollama), "
+        "where the per-request overhead dominates and there is no batch API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Summarise at most N consultations (default: all pending).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Consultations loaded and packed together per round (default: 100).",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        chunk = []
+        for consultation in pending_consultations():
+            chunk.append(consultation)
+            if options["limit"] and total + len(chunk) >= options["limit"]:
+                break
+            if len(chunk) >= options["chunk_size"]:
+                total += self._summarize(chunk)
+                chunk = []
+        total += self._summarize(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Summarised {total} consultations."))
+
+    def _summarize(self, consultations) -> int:
+        if not consultations:
+            return 0
+        results = summarize_consultations(
+            [(consultation.pk, consultation.symptoms, consultation.diagnosis) for consultation in consultations]
+        )
+        for consultation in consultations:
+            result = results[consultation.pk]
+            consultation.set_summary(result.text, provider=result.provider, model=result.model, data=result.data)
+        for patient_id in sorted({consultation.patient_id for consultation in consultations}):
+            enqueue(update_patient_summary_task, patient_id)
+        return len(consultations)
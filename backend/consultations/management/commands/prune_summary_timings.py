@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from consultations.models import SummaryTiming
+
+
+class Command(BaseCommand):
+    help = "Delete summary timing records older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SUMMARY_TIMING_RETENTION_DAYS,
+            help="Keep records from the last N days (default: SUMMARY_TIMING_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Rows deleted per DELETE statement (default: 10000).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        total = 0
+        # Delete in primary-key batches so each DELETE stays short.
+        while True:
+            pks = list(
+                SummaryTiming.objects.filter(created_at__lt=cutoff)
+                .order_by()
+                .values_list("pk", flat=True)[: options["batch_size"]]
+            )
+            if not pks:
+                break
+            total += SummaryTiming.objects.filter(pk__in=pks).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} summary timings before {cutoff:%Y-%m-%d}."))
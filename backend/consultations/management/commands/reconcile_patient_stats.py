@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from consultations.models import Patient
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute each patient's denormalised consultation_count and "
+        "last_consultation_at from the consultations table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of patients updated per UPDATE statement (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        total = 0
+
+        # Walk patients in primary-key batches so each UPDATE stays short.
+        while True:
+            pks = list(
+                Patient.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            total += Patient.objects.filter(pk__in=pks).refresh_consultation_stats()
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled consultation stats for {total} patients."))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from consultations.rollups import rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold consultations created since the last run into the analytics "
+        "rollups (normally done every ROLLUP_INTERVAL seconds by Celery beat)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ROLLUP_BATCH_SIZE,
+            help="Consultations folded per transaction (default: ROLLUP_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Clear the rollups and recompute them from the consultations table "
+            "(archived consultations are not included).",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            folded = rebuild_rollups(options["batch_size"])
+        else:
+            folded = refresh_rollups(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} consultations into the rollups."))
@@ -0,0 +1,175 @@
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from consultations.embeddings import HashingEmbedder
+from consultations.providers.mock import completion_body, count_completion_tokens
+from consultations.services import count_tokens
+from consultations.simulation import RATE_LIMIT, SIMULATED_MODEL, TIMEOUT, LatencyModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local OpenAI-compatible stand-in server (/v1/chat/completions, "
+        "/v1/embeddings, /v1/models) with simulated latency and faults. "
+        "Point OPENAI_BASE_URL and/or OLLAMA_BASE_URL at it to load-test the "
+        "real client path without paying for a model."
+    )
+
+    def add_arguments(self, parser):
+        defaults = LatencyModel.from_settings()
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8099)
+        parser.add_argument("--latency", type=float, default=defaults.latency, help="Base latency in seconds.")
+        parser.add_argument(
+            "--distribution",
+            choices=("fixed", "uniform", "lognormal"),
+            default=defaults.distribution,
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=defaults.jitter,
+            help="± seconds for uniform, sigma for lognormal.",
+        )
+        parser.add_argument("--per-prompt-token", type=float, default=defaults.seconds_per_prompt_token)
+        parser.add_argument("--per-completion-token", type=float, default=defaults.seconds_per_completion_token)
+        parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate)
+        parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+        parser.add_argument(
+            "--hang-seconds",
+            type=float,
+            default=600.0,
+            help="How long a simulated timeout holds the request open (default: 600).",
+        )
+        parser.add_argument(
+            "--retry-after",
+            type=float,
+            default=1.0,
+            help="Retry-After sent with simulated 429s (default: 1).",
+        )
+
+    def handle(self, *args, **options):
+        latency_model = LatencyModel(
+            latency=options["latency"],
+            distribution=options["distribution"],
+            jitter=options["jitter"],
+            seconds_per_prompt_token=options["per_prompt_token"],
+            seconds_per_completion_token=options["per_completion_token"],
+            timeout_rate=options["timeout_rate"],
+            rate_limit_rate=options["rate_limit_rate"],
+        )
+        handler = type(
+            "SimulatedLLMHandler",
+            (SimulatedLLMHandler,),
+            {
+                "latency_model": latency_model,
+                "hang_seconds": options["hang_seconds"],
+                "retry_after": options["retry_after"],
+            },
+        )
+        server = ThreadingHTTPServer((options["host"], options["port"]), handler)
+        server.daemon_threads = True
+        self.stdout.write(
+            self.style.SUCCESS(f"Simulated LLM listening on http://{options['host']}:{options['port']}/v1")
+        )
+        self.stdout.write(f"{latency_model}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+class SimulatedLLMHandler(BaseHTTPRequestHandler):
+    latency_model: LatencyModel
+    hang_seconds: float
+    retry_after: float
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, {"object": "list", "data": [{"id": SIMULATED_MODEL, "object": "model"}]})
+        else:
+            self._send(404, {"error": {"message": "Not found.", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": {"message": "Invalid JSON.", "type": "invalid_request_error"}})
+            return
+
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            self._chat_completion(body)
+        elif path.endswith("/embeddings"):
+            self._embedding(body)
+        else:
+            self._send(404, {"error": {"message": "Not found.", "type": "invalid_request_error"}})
+
+    def _simulate(self, prompt_tokens: int, completion_tokens: int) -> bool:
+        """Sleep like a provider would; return False if a fault was sent."""
+        fault = self.latency_model.fault()
+        if fault == TIMEOUT:
+            time.sleep(self.hang_seconds)
+            self.close_connection = True
+            return False
+        time.sleep(self.latency_model.delay(prompt_tokens, completion_tokens if not fault else 0))
+        if fault == RATE_LIMIT:
+            self._send(
+                429,
+                {"error": {"message": "Simulated rate limit.", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": f"{self.retry_after:g}"},
+            )
+            return False
+        return True
+
+    def _chat_completion(self, body):
+        prompt_tokens, completion_tokens = count_completion_tokens(body.get("messages", []), body.get("max_tokens"))
+        if not self._simulate(prompt_tokens, completion_tokens):
+            return
+        self._send(
+            200,
+            {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), **completion_body(body)},
+        )
+
+    def _embedding(self, body):
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        prompt_tokens = sum(count_tokens(text) for text in texts)
+        if not self._simulate(prompt_tokens, 0):
+            return
+        vectors = HashingEmbedder(body.get("dimensions") or settings.AI_EMBEDDING_DIMENSIONS).embed(texts)
+        self._send(
+            200,
+            {
+                "object": "list",
+                "model": body.get("model", SIMULATED_MODEL),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vector.tolist()}
+                    for i, vector in enumerate(vectors)
+                ],
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            },
+        )
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
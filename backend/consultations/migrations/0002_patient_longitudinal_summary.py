@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='longitudinal_summary',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='longitudinal_summary_through',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='consultations.consultation'),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='longitudinal_summary_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
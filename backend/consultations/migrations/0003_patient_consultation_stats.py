@@ -0,0 +1,49 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:52
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_consultation_stats(apps, schema_editor):
+    Patient = apps.get_model("consultations", "Patient")
+    Consultation = apps.get_model("consultations", "Consultation")
+    consultations = Consultation.objects.filter(patient=OuterRef("pk")).order_by()
+    Patient.objects.update(
+        consultation_count=Coalesce(
+            Subquery(consultations.values("patient").annotate(total=Count("pk")).values("total")),
+            0,
+        ),
+        last_consultation_at=Subquery(
+            consultations.values("patient").annotate(latest=Max("created_at")).values("latest")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0002_patient_longitudinal_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='consultation_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='last_consultation_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['consultation_count'], name='idx_patient_consult_count'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['last_consultation_at'], name='idx_patient_last_consult'),
+        ),
+        migrations.RunPython(backfill_consultation_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:54
+
+from django.db import migrations, models
+
+
+# Trigram GIN indexes over UPPER(...) so that both the `%` similarity
+# operator and Django's case-insensitive prefix lookups (which compile to
+# UPPER(col) LIKE UPPER('q%')) can use them.  Postgres only; SQLite falls
+# back to the plain full_name btree index.
+TRIGRAM_INDEXES = {
+    "idx_patient_name_trgm": "UPPER(full_name)",
+    "idx_patient_email_trgm": "UPPER(email)",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, expression in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON consultations_patient "
+            f"USING gin ({expression} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0003_patient_consultation_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['full_name'], name='idx_patient_full_name'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
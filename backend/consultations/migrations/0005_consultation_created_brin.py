@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:56
+
+from django.db import migrations
+
+
+# Consultations are append-only and created_at grows with the heap order,
+# which is the ideal case for a BRIN index: a few pages of summary data that
+# let pure time-range scans skip everything outside the range.  Postgres
+# only; elsewhere the idx_consultation_created btree covers range filters.
+BRIN_INDEX = "idx_consultation_created_brin"
+
+
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {BRIN_INDEX} ON consultations_consultation "
+        f"USING brin (created_at) WITH (pages_per_range = 32)"
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {BRIN_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0004_patient_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.11 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_archive_table(apps, schema_editor):
+    """
+    Create the archive table; on Postgres as a monthly range-partitioned
+    table (partitions are created on demand by consultations.archive).
+    """
+    model = apps.get_model("consultations", "ArchivedConsultation")
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(model)
+        return
+    sql, params = schema_editor.table_sql(model)
+    schema_editor.execute(f"{sql} PARTITION BY RANGE (created_at)", params or None)
+    schema_editor.deferred_sql.extend(schema_editor._model_indexes_sql(model))
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model("consultations", "ArchivedConsultation"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0005_consultation_created_brin'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArchivedConsultation',
+                    fields=[
+                        ('pk', models.CompositePrimaryKey('consultation_id', 'created_at', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('consultation_id', models.BigIntegerField()),
+                        ('created_at', models.DateTimeField()),
+                        ('payload', models.BinaryField()),
+                        ('archived_at', models.DateTimeField(auto_now_add=True)),
+                        ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_consultations', to='consultations.patient')),
+                    ],
+                    options={
+                        'verbose_name': 'Archived consultation',
+                        'verbose_name_plural': 'Archived consultations',
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
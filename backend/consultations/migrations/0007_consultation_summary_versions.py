@@ -0,0 +1,82 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_summaries_to_side_table(apps, schema_editor):
+    """Turn every existing ai_summary into version 1 of a ConsultationSummary."""
+    Consultation = apps.get_model("consultations", "Consultation")
+    ConsultationSummary = apps.get_model("consultations", "ConsultationSummary")
+
+    pending = (
+        Consultation.objects.filter(ai_summary__isnull=False)
+        .exclude(ai_summary="")
+        .order_by("pk")
+        .only("pk", "ai_summary")
+    )
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        summaries = ConsultationSummary.objects.bulk_create(
+            ConsultationSummary(consultation_id=c.pk, version=1, text=c.ai_summary, provider="legacy")
+            for c in batch
+        )
+        for consultation, summary in zip(batch, summaries):
+            consultation.current_summary_id = summary.pk
+        Consultation.objects.bulk_update(batch, ["current_summary"])
+        last_pk = batch[-1].pk
+
+
+def copy_summaries_back(apps, schema_editor):
+    Consultation = apps.get_model("consultations", "Consultation")
+    for consultation in Consultation.objects.filter(current_summary__isnull=False).select_related(
+        "current_summary"
+    ).iterator(chunk_size=BATCH_SIZE):
+        consultation.ai_summary = consultation.current_summary.text
+        consultation.save(update_fields=["ai_summary"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0006_archived_consultation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('provider', models.CharField(blank=True, default='', max_length=32)),
+                ('model', models.CharField(blank=True, default='', max_length=128)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('consultation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='consultations.consultation')),
+            ],
+            options={
+                'verbose_name': 'Consultation summary',
+                'verbose_name_plural': 'Consultation summaries',
+                'ordering': ['consultation', 'version'],
+            },
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='current_summary',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='consultations.consultationsummary'),
+        ),
+        migrations.AddConstraint(
+            model_name='consultationsummary',
+            constraint=models.UniqueConstraint(fields=('consultation', 'version'), name='uniq_consultation_summary_version'),
+        ),
+        migrations.RunPython(copy_summaries_to_side_table, copy_summaries_back),
+        migrations.RemoveField(
+            model_name='consultation',
+            name='ai_summary',
+        ),
+    ]
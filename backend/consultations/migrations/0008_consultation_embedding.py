@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0007_consultation_summary_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultationEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedder', models.CharField(max_length=128)),
+                ('vector', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('consultation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='embedding', to='consultations.consultation')),
+            ],
+            options={
+                'verbose_name': 'Consultation embedding',
+                'verbose_name_plural': 'Consultation embeddings',
+                'indexes': [models.Index(fields=['embedder', 'id'], name='idx_embedding_sync')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0009_outbox_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consultation_id', models.BigIntegerField()),
+                ('provider', models.CharField(max_length=32)),
+                ('model', models.CharField(blank=True, default='', max_length=128)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('fallback', 'Fallback'), ('error', 'Error')], max_length=16)),
+                ('attempt', models.PositiveSmallIntegerField(default=0)),
+                ('queue_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('fetch_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('provider_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('save_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_ms', models.PositiveIntegerField()),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('completion_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Summary timing',
+                'verbose_name_plural': 'Summary timings',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='idx_summary_timing_created')],
+            },
+        ),
+    ]
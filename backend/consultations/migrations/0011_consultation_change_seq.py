@@ -0,0 +1,42 @@
+# Generated by Django 5.2.11 on 2026-10-19 16:40
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def stamp_existing_consultations(apps, schema_editor):
+    """Existing rows enter the changes feed in primary-key order."""
+    ChangeCounter = apps.get_model("consultations", "ChangeCounter")
+    Consultation = apps.get_model("consultations", "Consultation")
+
+    Consultation.objects.update(change_seq=F("pk"))
+    last = Consultation.objects.aggregate(last=Max("pk"))["last"] or 0
+    ChangeCounter.objects.create(name="consultations", value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0010_summary_timing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='consultation',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(stamp_existing_consultations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='consultation',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, unique=True),
+        ),
+    ]
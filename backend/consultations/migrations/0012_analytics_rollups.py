@@ -0,0 +1,50 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0011_consultation_change_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyConsultationCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('cohort', models.CharField(max_length=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily consultation count',
+                'verbose_name_plural': 'Daily consultation counts',
+                'ordering': ['day', 'cohort'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'cohort'), name='uniq_daily_count_day_cohort')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DiagnosisCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('diagnosis', models.CharField(max_length=255, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Diagnosis count',
+                'verbose_name_plural': 'Diagnosis counts',
+                'ordering': ['-count'],
+                'indexes': [models.Index(fields=['-count', 'diagnosis'], name='idx_diagnosis_count')],
+            },
+        ),
+    ]
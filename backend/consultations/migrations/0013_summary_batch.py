@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0012_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=32)),
+                ('model', models.CharField(max_length=128)),
+                ('remote_id', models.CharField(max_length=128, unique=True)),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('completed', 'Completed'), ('failed', 'Failed')], default='submitted', max_length=16)),
+                ('remote_status', models.CharField(blank=True, default='', max_length=32)),
+                ('input_file', models.CharField(max_length=255)),
+                ('consultation_ids', models.JSONField(default=list)),
+                ('applied_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Summary batch',
+                'verbose_name_plural': 'Summary batches',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='idx_summary_batch_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:42
+
+from django.db import migrations, models
+
+
+# jsonb_path_ops indexes the @> containment operator only, and is smaller
+# and faster than the default jsonb_ops for it: the complaint filter queries
+# ``data @> '{"chief_complaints": [...]}'``.  Postgres only.
+GIN_INDEX = "idx_summary_data_gin"
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON consultations_consultationsummary "
+        f"USING gin (data jsonb_path_ops)"
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {GIN_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0013_summary_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultationsummary',
+            name='data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
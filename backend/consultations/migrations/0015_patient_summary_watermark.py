@@ -0,0 +1,51 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def _rewrite_watermarks(apps, column, matching):
+    """Set every patient's watermark to Max(*column*) over the consultations *matching* it."""
+    Consultation = apps.get_model("consultations", "Consultation")
+    Patient = apps.get_model("consultations", "Patient")
+    latest = (
+        Consultation.objects.filter(patient=OuterRef("pk"), **matching)
+        .order_by()
+        .values("patient")
+        .annotate(latest=Max(column))
+        .values("latest")
+    )
+    Patient.objects.filter(longitudinal_summary_through__isnull=False).update(
+        longitudinal_summary_through_id=Subquery(latest)
+    )
+
+
+def consultation_to_summary_watermark(apps, schema_editor):
+    # The watermark held the last consultation folded; its summaries, and
+    # those of the consultations before it, are the ones already covered.
+    _rewrite_watermarks(
+        apps, "current_summary_id", {"pk__lte": OuterRef("longitudinal_summary_through_id")}
+    )
+
+
+def summary_to_consultation_watermark(apps, schema_editor):
+    _rewrite_watermarks(
+        apps, "pk", {"current_summary_id__lte": OuterRef("longitudinal_summary_through_id")}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0014_consultation_summary_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patient',
+            name='longitudinal_summary_through',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='consultations.consultationsummary'),
+        ),
+        migrations.RunPython(consultation_to_summary_watermark, summary_to_consultation_watermark),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.11 on 2026-10-19 14:10
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def stamp_existing_embeddings(apps, schema_editor):
+    """Existing rows keep their primary-key order."""
+    ChangeCounter = apps.get_model("consultations", "ChangeCounter")
+    ConsultationEmbedding = apps.get_model("consultations", "ConsultationEmbedding")
+
+    ConsultationEmbedding.objects.update(seq=F("pk"))
+    last = ConsultationEmbedding.objects.aggregate(last=Max("pk"))["last"] or 0
+    ChangeCounter.objects.create(name="embeddings", value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0015_patient_summary_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultationembedding',
+            name='seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(stamp_existing_embeddings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='consultationembedding',
+            name='seq',
+            field=models.BigIntegerField(editable=False, unique=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='consultationembedding',
+            name='idx_embedding_sync',
+        ),
+        migrations.AddIndex(
+            model_name='consultationembedding',
+            index=models.Index(fields=['embedder', 'seq'], name='idx_embedding_sync'),
+        ),
+    ]
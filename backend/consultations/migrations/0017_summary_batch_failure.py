@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-19 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0016_embedding_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryBatchFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('consultation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='consultations.consultation')),
+                ('last_batch', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='consultations.summarybatch')),
+            ],
+            options={
+                'verbose_name': 'Summary batch failure',
+                'verbose_name_plural': 'Summary batch failures',
+            },
+        ),
+    ]
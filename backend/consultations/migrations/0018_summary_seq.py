@@ -0,0 +1,59 @@
+# Generated by Django 5.2.11 on 2026-10-19 15:20
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery
+
+
+def stamp_existing_summaries(apps, schema_editor):
+    """Existing summaries keep their primary-key order; watermarks follow."""
+    ChangeCounter = apps.get_model("consultations", "ChangeCounter")
+    ConsultationSummary = apps.get_model("consultations", "ConsultationSummary")
+    Patient = apps.get_model("consultations", "Patient")
+
+    ConsultationSummary.objects.update(seq=F("pk"))
+    last = ConsultationSummary.objects.aggregate(last=Max("pk"))["last"] or 0
+    ChangeCounter.objects.create(name="summaries", value=last)
+    Patient.objects.update(longitudinal_summary_seq=F("longitudinal_summary_through_id"))
+
+
+def unstamp_watermarks(apps, schema_editor):
+    ConsultationSummary = apps.get_model("consultations", "ConsultationSummary")
+    Patient = apps.get_model("consultations", "Patient")
+
+    Patient.objects.filter(longitudinal_summary_seq__isnull=False).update(
+        longitudinal_summary_through_id=Subquery(
+            ConsultationSummary.objects.filter(seq__lte=OuterRef("longitudinal_summary_seq"))
+            .order_by("-seq")
+            .values("pk")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0017_summary_batch_failure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultationsummary',
+            name='seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='longitudinal_summary_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(stamp_existing_summaries, unstamp_watermarks),
+        migrations.AlterField(
+            model_name='consultationsummary',
+            name='seq',
+            field=models.BigIntegerField(editable=False, unique=True),
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='longitudinal_summary_through',
+        ),
+    ]
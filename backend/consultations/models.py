@@ -1,4 +1,40 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+
+class PatientQuerySet(models.QuerySet):
+    def refresh_consultation_stats(self):
+        """
+        Recompute the denormalised consultation counters for these patients.
+
+        Archived consultations still count.  Uses correlated subqueries
+        served by ``idx_patient_created`` (and the archive's patient index),
+        so the cost is proportional to the selected patients' rows only.
+        """
+        def total(queryset):
+            return Coalesce(
+                Subquery(
+                    queryset.values("patient").annotate(total=Count("pk")).values("total")
+                ),
+                0,
+            )
+
+        def latest(queryset):
+            return Subquery(
+                queryset.values("patient").annotate(latest=Max("created_at")).values("latest")
+            )
+
+        hot = Consultation.objects.filter(patient=OuterRef("pk")).order_by()
+        cold = ArchivedConsultation.objects.filter(patient=OuterRef("pk")).order_by()
+        return self.update(
+            consultation_count=total(hot) + total(cold),
+            # GREATEST() returns NULL on SQLite if either side is NULL.
+            last_consultation_at=Greatest(
+                Coalesce(latest(hot), latest(cold)), Coalesce(latest(cold), latest(hot))
+            ),
+        )
 
 
 class Patient(models.Model):
@@ -8,15 +44,114 @@ class Patient(models.Model):
     date_of_birth = models.DateField()
     email = models.EmailField(unique=True)
 
+    # Roll-up across all of the patient's consultations, maintained
+    # incrementally: each new summary is folded into the previous roll-up,
+    # and *longitudinal_summary_seq* records the ``ConsultationSummary.seq``
+    # covered so far.  Summaries, not consultations: they finish in any
+    # order, and a regenerated summary is a new row past the watermark.
+    longitudinal_summary = models.TextField(null=True, blank=True)
+    longitudinal_summary_seq = models.BigIntegerField(null=True, blank=True, editable=False)
+    longitudinal_summary_updated_at = models.DateTimeField(null=True, blank=True)
+
+    # Denormalised from Consultation so the patient list can show and sort
+    # by them without aggregating the consultations table.  Kept up to date
+    # by Consultation.save()/delete() and ConsultationQuerySet's bulk paths;
+    # `manage.py reconcile_patient_stats` repairs any drift.
+    consultation_count = models.PositiveIntegerField(default=0, editable=False)
+    last_consultation_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = PatientQuerySet.as_manager()
+
     class Meta:
         ordering = ["full_name"]
         verbose_name = "Patient"
         verbose_name_plural = "Patients"
+        # Postgres additionally gets pg_trgm GIN indexes on UPPER(full_name)
+        # and UPPER(email) for autocomplete (see migration 0004).
+        indexes = [
+            models.Index(fields=["full_name"], name="idx_patient_full_name"),
+            models.Index(fields=["consultation_count"], name="idx_patient_consult_count"),
+            models.Index(fields=["last_consultation_at"], name="idx_patient_last_consult"),
+        ]
 
     def __str__(self):
         return self.full_name
 
 
+class ChangeCounter(models.Model):
+    """
+    A named, monotonic change sequence (see ``ChangeCounter.next()``).
+
+    Consultation writes stamp ``Consultation.change_seq`` from the
+    "consultations" counter, which orders the changes feed
+    (GET /api/consultations/changes/); embedding writes stamp
+    ``ConsultationEmbedding.seq`` from the "embeddings" counter, which the
+    similarity index syncs on; new summaries stamp ``ConsultationSummary.seq``
+    from the "summaries" counter, which the patient roll-up folds on.
+    """
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+    @classmethod
+    def next(cls, name: str, count: int = 1) -> int:
+        """
+        Reserve *count* values of the *name* sequence and return the last.
+
+        Must be called inside the transaction that writes the stamped rows:
+        the UPDATE keeps the counter row locked until that transaction
+        commits, so values become visible in sequence order and a reader
+        that has seen value N will never later find a new row below N.
+        The price is that stamped writes are serialised on the counter.
+        """
+        if not cls.objects.filter(name=name).update(value=F("value") + count):
+            cls.objects.bulk_create([cls(name=name)], ignore_conflicts=True)
+            cls.objects.filter(name=name).update(value=F("value") + count)
+        return cls.objects.filter(name=name).values_list("value", flat=True).get()
+
+
+CONSULTATION_CHANGES = "consultations"
+EMBEDDING_CHANGES = "embeddings"
+SUMMARY_CHANGES = "summaries"
+
+
+class ConsultationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic():
+            if objs:
+                last = ChangeCounter.next(CONSULTATION_CHANGES, len(objs))
+                for seq, obj in enumerate(objs, start=last - len(objs) + 1):
+                    obj.change_seq = seq
+            objs = super().bulk_create(objs, *args, **kwargs)
+        patient_ids = {obj.patient_id for obj in objs}
+        if patient_ids:
+            Patient.objects.filter(pk__in=patient_ids).refresh_consultation_stats()
+        return objs
+
+    def delete(self):
+        patient_ids = set(self.values_list("patient_id", flat=True).distinct())
+        result = super().delete()
+        if patient_ids:
+            Patient.objects.filter(pk__in=patient_ids).refresh_consultation_stats()
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic():
+            if objs:
+                last = ChangeCounter.next(CONSULTATION_CHANGES, len(objs))
+                for seq, obj in enumerate(objs, start=last - len(objs) + 1):
+                    obj.change_seq = seq
+            return super().bulk_update(objs, [*fields, "change_seq"], *args, **kwargs)
+
+
 class Consultation(models.Model):
     """Represents a consultation session between a patient and the system."""
 
@@ -28,7 +163,20 @@ class Consultation(models.Model):
     symptoms = models.TextField()
     diagnosis = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
-    ai_summary = models.TextField(null=True, blank=True)
+    # Summaries live in ConsultationSummary so list scans stay narrow;
+    # this points at the latest version (see set_summary()).
+    current_summary = models.ForeignKey(
+        "ConsultationSummary",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    # Position of the latest create / update in the changes feed; bumped by
+    # save(), bulk_create() and bulk_update() (not by QuerySet.update()).
+    change_seq = models.BigIntegerField(unique=True, editable=False)
+
+    objects = ConsultationQuerySet.as_manager()
 
     class Meta:
         ordering = ["created_at"]
@@ -41,3 +189,345 @@ class Consultation(models.Model):
 
     def __str__(self):
         return f"Consultation #{self.pk} — {self.patient.full_name}"
+
+    @property
+    def ai_summary(self):
+        """Text of the current summary version, or None if not generated."""
+        return self.current_summary.text if self.current_summary else None
+
+    def set_summary(self, text, provider="", model="", data=None):
+        """
+        Store *text* as a new summary version and make it current.
+
+        The consultation row is locked while the version number is picked,
+        so concurrent regenerations get consecutive versions.
+        """
+        with transaction.atomic():
+            Consultation.objects.select_for_update().filter(pk=self.pk).exists()
+            latest = self.summaries.aggregate(latest=Max("version"))["latest"] or 0
+            summary = ConsultationSummary.objects.create(
+                consultation=self,
+                version=latest + 1,
+                text=text,
+                data=data,
+                provider=provider,
+                model=model,
+            )
+            self.current_summary = summary
+            self.save(update_fields=["current_summary"])
+        return summary
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "change_seq"}
+        with transaction.atomic():
+            self.change_seq = ChangeCounter.next(CONSULTATION_CHANGES)
+            super().save(*args, **kwargs)
+            if adding:
+                created_at = Value(self.created_at)
+                Patient.objects.filter(pk=self.patient_id).update(
+                    consultation_count=F("consultation_count") + 1,
+                    last_consultation_at=Greatest(
+                        Coalesce("last_consultation_at", created_at), created_at
+                    ),
+                )
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Patient.objects.filter(pk=self.patient_id).refresh_consultation_stats()
+        return result
+
+
+class ConsultationSummaryQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic():
+            if objs:
+                last = ChangeCounter.next(SUMMARY_CHANGES, len(objs))
+                for seq, obj in enumerate(objs, start=last - len(objs) + 1):
+                    obj.seq = seq
+            return super().bulk_create(objs, *args, **kwargs)
+
+
+class ConsultationSummary(models.Model):
+    """One version of a consultation's AI summary, with its provenance."""
+
+    consultation = models.ForeignKey(
+        Consultation,
+        on_delete=models.CASCADE,
+        related_name="summaries",
+    )
+    version = models.PositiveIntegerField()
+    text = models.TextField()
+    # Structured form of *text* (services.SUMMARY_SCHEMA) when generated with
+    # AI_STRUCTURED_SUMMARIES; GIN-indexed on Postgres for containment filters.
+    data = models.JSONField(null=True, blank=True)
+    provider = models.CharField(max_length=32, blank=True, default="")
+    model = models.CharField(max_length=128, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Stamped from the "summaries" ChangeCounter when the row is inserted:
+    # unlike the pk, it becomes visible in order, so the patient roll-up can
+    # fold on it without skipping a summary committed late.
+    seq = models.BigIntegerField(unique=True, editable=False)
+
+    objects = ConsultationSummaryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["consultation", "version"]
+        verbose_name = "Consultation summary"
+        verbose_name_plural = "Consultation summaries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["consultation", "version"], name="uniq_consultation_summary_version"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Summary v{self.version} of consultation #{self.consultation_id}"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                self.seq = ChangeCounter.next(SUMMARY_CHANGES)
+            super().save(*args, **kwargs)
+
+
+class ConsultationEmbedding(models.Model):
+    """
+    Text embedding of a consultation for similar-case lookup.
+
+    *vector* holds L2-normalised little-endian float32 values; *embedder*
+    names the embedder (and dimensionality) that produced it, so vectors
+    from different embedders are never compared (see embeddings.py).
+    """
+
+    consultation = models.OneToOneField(
+        Consultation,
+        on_delete=models.CASCADE,
+        related_name="embedding",
+    )
+    embedder = models.CharField(max_length=128)
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Stamped from the "embeddings" ChangeCounter by embed_consultations():
+    # unlike the pk, it becomes visible in order, so the similarity index
+    # can sync on it without skipping rows committed late.
+    seq = models.BigIntegerField(unique=True, editable=False)
+
+    class Meta:
+        verbose_name = "Consultation embedding"
+        verbose_name_plural = "Consultation embeddings"
+        indexes = [
+            # Incremental index sync: rows of one embedder after a seq.
+            models.Index(fields=["embedder", "seq"], name="idx_embedding_sync"),
+        ]
+
+    def __str__(self):
+        return f"Embedding of consultation #{self.consultation_id} ({self.embedder})"
+
+
+class OutboxTask(models.Model):
+    """
+    A Celery task waiting to be published by the outbox dispatcher.
+
+    Rows are written in the same transaction as the change that needs the
+    task, so the task is enqueued if and only if that change commits, and
+    are deleted once published (see outbox.py).
+    """
+
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["pk"]
+        verbose_name = "Outbox task"
+        verbose_name_plural = "Outbox tasks"
+
+    def __str__(self):
+        return f"{self.task}{tuple(self.args)}"
+
+
+class SummaryTiming(models.Model):
+    """
+    Stage timings and token usage of one ``generate_summary_task`` run.
+
+    Durations are in milliseconds; *queue_ms* is the time from the request
+    enqueuing the task to a worker starting it (including retry backoff).
+    Rows are aggregated by ``timings.timing_stats()`` and pruned by
+    ``manage.py prune_summary_timings``.
+    """
+
+    OUTCOME_OK = "ok"
+    OUTCOME_FALLBACK = "fallback"
+    OUTCOME_ERROR = "error"
+    OUTCOME_CHOICES = [
+        (OUTCOME_OK, "OK"),
+        (OUTCOME_FALLBACK, "Fallback"),
+        (OUTCOME_ERROR, "Error"),
+    ]
+
+    # Not a foreign key: timings outlive deleted and archived consultations.
+    consultation_id = models.BigIntegerField()
+    provider = models.CharField(max_length=32)
+    model = models.CharField(max_length=128, blank=True, default="")
+    outcome = models.CharField(max_length=16, choices=OUTCOME_CHOICES)
+    attempt = models.PositiveSmallIntegerField(default=0)
+    queue_ms = models.PositiveIntegerField(null=True, blank=True)
+    fetch_ms = models.PositiveIntegerField(null=True, blank=True)
+    provider_ms = models.PositiveIntegerField(null=True, blank=True)
+    save_ms = models.PositiveIntegerField(null=True, blank=True)
+    total_ms = models.PositiveIntegerField()
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Summary timing"
+        verbose_name_plural = "Summary timings"
+        indexes = [
+            models.Index(fields=["created_at"], name="idx_summary_timing_created"),
+        ]
+
+    def __str__(self):
+        return f"{self.outcome} summary of consultation #{self.consultation_id} in {self.total_ms} ms"
+
+
+class SummaryBatch(models.Model):
+    """
+    A file of summary requests submitted to the provider's batch API
+    (see batch.py).  *consultation_ids* are the consultations it covers.
+    """
+
+    STATUS_SUBMITTED = "submitted"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_SUBMITTED, "Submitted"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    provider = models.CharField(max_length=32)
+    model = models.CharField(max_length=128)
+    remote_id = models.CharField(max_length=128, unique=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_SUBMITTED)
+    # Status reported by the provider on the last poll (e.g. "in_progress").
+    remote_status = models.CharField(max_length=32, blank=True, default="")
+    input_file = models.CharField(max_length=255)
+    consultation_ids = models.JSONField(default=list)
+    applied_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Summary batch"
+        verbose_name_plural = "Summary batches"
+        indexes = [
+            models.Index(fields=["status"], name="idx_summary_batch_status"),
+        ]
+
+    def __str__(self):
+        return f"Batch {self.remote_id} ({self.status}, {len(self.consultation_ids)} consultations)"
+
+
+class SummaryBatchFailure(models.Model):
+    """
+    How many finished batches returned no usable summary for a consultation.
+    Past AI_BATCH_MAX_ATTEMPTS it is no longer batched (see batch.py).
+    """
+
+    consultation = models.OneToOneField(Consultation, on_delete=models.CASCADE, related_name="+")
+    attempts = models.PositiveIntegerField(default=0)
+    last_batch = models.ForeignKey(SummaryBatch, on_delete=models.SET_NULL, null=True, related_name="+")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Summary batch failure"
+        verbose_name_plural = "Summary batch failures"
+
+    def __str__(self):
+        return f"Consultation #{self.consultation_id} failed in {self.attempts} batches"
+
+
+class DailyConsultationCount(models.Model):
+    """Consultations created per day and patient age cohort (see rollups.py)."""
+
+    day = models.DateField()
+    cohort = models.CharField(max_length=16)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day", "cohort"]
+        verbose_name = "Daily consultation count"
+        verbose_name_plural = "Daily consultation counts"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "cohort"], name="uniq_daily_count_day_cohort"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.cohort}: {self.count}"
+
+
+class DiagnosisCount(models.Model):
+    """Consultations per normalised diagnosis (see rollups.py)."""
+
+    diagnosis = models.CharField(max_length=255, unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-count"]
+        verbose_name = "Diagnosis count"
+        verbose_name_plural = "Diagnosis counts"
+        indexes = [
+            # Top-N diagnoses without sorting the table.
+            models.Index(fields=["-count", "diagnosis"], name="idx_diagnosis_count"),
+        ]
+
+    def __str__(self):
+        return f"{self.diagnosis}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """The last consultation folded into the analytics rollups."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} through #{self.last_id}"
+
+
+class ArchivedConsultation(models.Model):
+    """
+    Cold storage for consultations moved out of the hot table by
+    ``manage.py archive_consultations``.
+
+    The consultation row is kept as zlib-compressed JSON (see archive.py).
+    On Postgres the table is range-partitioned by month on ``created_at``,
+    which is why ``created_at`` is part of the primary key.
+    """
+
+    pk = models.CompositePrimaryKey("consultation_id", "created_at")
+    consultation_id = models.BigIntegerField()
+    created_at = models.DateTimeField()
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="archived_consultations",
+    )
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived consultation"
+        verbose_name_plural = "Archived consultations"
+
+    def __str__(self):
+        return f"Archived consultation #{self.consultation_id}"
@@ -0,0 +1,65 @@
+"""
+Transactional outbox for Celery tasks.
+
+Request handlers call ``enqueue()`` instead of ``task.delay()``: that only
+inserts an OutboxTask row, inside the caller's transaction, so the broker
+is never on the request path and a task is never published for a change
+that rolled back.
+
+``dispatch_pending()`` (run in a loop by ``manage.py dispatch_outbox``)
+locks a batch of rows with SKIP LOCKED, publishes them over a single
+producer connection and deletes the published rows in the same
+transaction.  If the process dies between publishing and committing, the
+batch is published again, so delivery is at-least-once; each message
+carries a stable ``outbox-<pk>`` task id that makes such duplicates easy to
+spot.
+"""
+
+import logging
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+
+from .models import OutboxTask
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args, **kwargs) -> OutboxTask:
+    """Record ``task.delay(*args, **kwargs)`` to be published after commit."""
+    return OutboxTask.objects.create(task=task.name, args=list(args), kwargs=kwargs)
+
+
+def dispatch_pending(batch_size: int | None = None) -> int:
+    """
+    Publish up to *batch_size* pending tasks, oldest first.
+
+    Returns the number published.  Stops at the first publish error and
+    leaves the remaining rows for the next run.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        batch = list(OutboxTask.objects.select_for_update(skip_locked=True).order_by("pk")[:batch_size])
+        if not batch:
+            return 0
+
+        published = []
+        try:
+            with current_app.producer_or_acquire() as producer:
+                for row in batch:
+                    current_app.send_task(
+                        row.task,
+                        args=row.args,
+                        kwargs=row.kwargs,
+                        task_id=f"outbox-{row.pk}",
+                        producer=producer,
+                    )
+                    published.append(row.pk)
+        except Exception:
+            logger.exception(
+                "Outbox publish failed after %d of %d tasks; will retry.", len(published), len(batch)
+            )
+
+        OutboxTask.objects.filter(pk__in=published).delete()
+    return len(published)
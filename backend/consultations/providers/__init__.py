@@ -0,0 +1,61 @@
+"""
+Lazy registry of AI providers.
+
+Each provider lives in its own module exposing ``create_client()``, which
+returns a ``(client, model)`` pair, and ``model_name()``, which returns the
+model alone without building a client.  Provider modules — and the OpenAI SDK
+they import — are loaded on first use only, so processes that never call a
+provider (gunicorn web workers) do not pay for them at startup.
+"""
+
+import importlib
+import sys
+
+DEFAULT_PROVIDER = "openai"
+
+_REGISTRY = {
+    "openai": "consultations.providers.openai",
+    "ollama": "consultations.providers.ollama",
+    "mock": "consultations.providers.mock",
+}
+
+
+def register(name: str, module_path: str) -> None:
+    """Register (or replace) the module implementing provider *name*."""
+    _REGISTRY[name] = module_path
+
+
+def available() -> list[str]:
+    return sorted(_REGISTRY)
+
+
+def load(name: str):
+    """Import and return the provider module; unknown names use the default."""
+    return importlib.import_module(_REGISTRY.get(name, _REGISTRY[DEFAULT_PROVIDER]))
+
+
+def get_client_and_model(name: str) -> tuple:
+    return load(name).create_client()
+
+
+def get_model(name: str) -> str:
+    """The model provider *name* would use, without building its client."""
+    return load(name).model_name()
+
+
+def classify_error(exc: Exception) -> str | None:
+    """
+    Return "auth", "rate_limit" or "connection" for OpenAI SDK errors.
+
+    Without the SDK loaded no provider has run, so *exc* cannot be one.
+    """
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return None
+    if isinstance(exc, openai.AuthenticationError):
+        return "auth"
+    if isinstance(exc, openai.RateLimitError):
+        return "rate_limit"
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError)):
+        return "connection"
+    return None
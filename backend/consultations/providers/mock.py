@@ -0,0 +1,241 @@
+"""
+Mock provider: a simulated OpenAI client for load tests.
+
+Only used when an AI_MOCK_* latency / fault setting is enabled; the plain
+mock answers in services.py without a client (see simulation.py).  Batch
+summaries (batch.py) always use it: batch files are processed locally.
+"""
+
+import json
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
+from openai import APITimeoutError, RateLimitError
+
+from consultations.services import count_tokens
+from consultations.simulation import (
+    COMPLETION_TOKENS,
+    RATE_LIMIT,
+    SIMULATED_MODEL,
+    TIMEOUT,
+    LatencyModel,
+    simulated_text,
+)
+
+
+def model_name() -> str:
+    return SIMULATED_MODEL
+
+
+def create_client() -> tuple["SimulatedClient", str]:
+    return SimulatedClient(), SIMULATED_MODEL
+
+
+class SimulatedTimeoutError(APITimeoutError):
+    """An SDK timeout error raised without an underlying HTTP request."""
+
+    def __init__(self):
+        Exception.__init__(self, "Simulated request timeout.")
+        self.message, self.request, self.body = "Simulated request timeout.", None, None
+        self.code = self.param = self.type = None
+
+
+class SimulatedRateLimitError(RateLimitError):
+    """An SDK 429 error raised without an underlying HTTP response."""
+
+    def __init__(self):
+        Exception.__init__(self, "Simulated rate limit.")
+        self.message, self.request, self.response, self.body = "Simulated rate limit.", None, None, None
+        self.code = self.param = self.type = self.request_id = None
+        self.status_code = 429
+
+
+class SimulatedClient:
+    """
+    In-process stand-in for ``openai.OpenAI`` covering the calls this app
+    makes: ``chat.completions.create``, ``embeddings.create``, the batch API
+    (``files.create`` / ``files.content``, ``batches.create`` /
+    ``batches.retrieve``) and ``close``.
+
+    Batch files are kept under AI_BATCH_DIR/simulated.  A batch is processed
+    on its first ``retrieve``, without sleeping; simulated faults become
+    lines of its error file.
+    """
+
+    def __init__(self, latency_model: LatencyModel | None = None):
+        self.latency_model = latency_model or LatencyModel.from_settings()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.embeddings = SimpleNamespace(create=self._create_embedding)
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch)
+
+    def close(self) -> None:
+        pass
+
+    def _simulate(self, prompt_tokens: int, completion_tokens: int) -> None:
+        fault = self.latency_model.fault()
+        if fault == TIMEOUT:
+            time.sleep(settings.AI_REQUEST_TIMEOUT)
+            raise SimulatedTimeoutError()
+        time.sleep(self.latency_model.delay(prompt_tokens, completion_tokens if not fault else 0))
+        if fault == RATE_LIMIT:
+            raise SimulatedRateLimitError()
+
+    def _create_completion(self, model, messages, max_tokens=None, **kwargs):
+        prompt_tokens, completion_tokens = count_completion_tokens(messages, max_tokens)
+        self._simulate(prompt_tokens, completion_tokens)
+        content = _simulated_content(prompt_tokens, completion_tokens, kwargs.get("response_format"))
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def _create_embedding(self, model, input, dimensions=None, **kwargs):
+        from consultations.embeddings import HashingEmbedder
+
+        texts = [input] if isinstance(input, str) else list(input)
+        self._simulate(sum(count_tokens(text) for text in texts), 0)
+        vectors = HashingEmbedder(dimensions or settings.AI_EMBEDDING_DIMENSIONS).embed(texts)
+        return SimpleNamespace(
+            model=model,
+            data=[SimpleNamespace(index=i, embedding=vector.tolist()) for i, vector in enumerate(vectors)],
+        )
+
+    # ── Batch API ────────────────────────────────────────────────────
+    @property
+    def _batch_dir(self) -> Path:
+        path = Path(settings.AI_BATCH_DIR) / "simulated"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _create_file(self, file, purpose, **kwargs):
+        name, content = file if isinstance(file, tuple) else (getattr(file, "name", "upload"), file)
+        if hasattr(content, "read"):
+            content = content.read()
+        if isinstance(content, str):
+            content = content.encode()
+        return self._store_file(Path(str(name)).name, content, purpose)
+
+    def _store_file(self, name: str, content: bytes, purpose: str):
+        file_id = f"file-sim-{uuid.uuid4().hex}"
+        (self._batch_dir / f"{file_id}.jsonl").write_bytes(content)
+        return SimpleNamespace(id=file_id, filename=name, purpose=purpose, bytes=len(content))
+
+    def _file_content(self, file_id, **kwargs):
+        return SimpleNamespace(text=(self._batch_dir / f"{file_id}.jsonl").read_text())
+
+    def _create_batch(self, input_file_id, endpoint, completion_window, **kwargs):
+        batch = {
+            "id": f"batch-sim-{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": endpoint,
+            "completion_window": completion_window,
+            "input_file_id": input_file_id,
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        self._save_batch(batch)
+        return SimpleNamespace(**batch)
+
+    def _retrieve_batch(self, batch_id, **kwargs):
+        path = self._batch_dir / f"{batch_id}.json"
+        batch = json.loads(path.read_text())
+        if batch["status"] == "in_progress":
+            self._process_batch(batch)
+            self._save_batch(batch)
+        return SimpleNamespace(**batch)
+
+    def _save_batch(self, batch: dict) -> None:
+        (self._batch_dir / f"{batch['id']}.json").write_text(json.dumps(batch))
+
+    def _process_batch(self, batch: dict) -> None:
+        outputs, errors = [], []
+        for number, line in enumerate(self._file_content(batch["input_file_id"]).text.splitlines()):
+            if not line.strip():
+                continue
+            line_id = f"batch_req_sim_{number}"
+            try:
+                request = json.loads(line)
+                custom_id, body = request["custom_id"], request["body"]
+            except (ValueError, KeyError, TypeError):
+                errors.append({"id": line_id, "custom_id": None, "response": None,
+                               "error": {"code": "invalid_request", "message": "Malformed request line."}})
+                continue
+            fault = self.latency_model.fault()
+            if fault:
+                errors.append({"id": line_id, "custom_id": custom_id, "response": None,
+                               "error": {"code": fault, "message": f"Simulated {fault}."}})
+                continue
+            outputs.append({
+                "id": line_id,
+                "custom_id": custom_id,
+                "response": {"status_code": 200, "request_id": line_id, "body": completion_body(body)},
+                "error": None,
+            })
+
+        batch["output_file_id"] = self._store_jsonl(outputs)
+        batch["error_file_id"] = self._store_jsonl(errors)
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def _store_jsonl(self, lines: list[dict]) -> str | None:
+        if not lines:
+            return None
+        content = "".join(json.dumps(line) + "\n" for line in lines).encode()
+        return self._store_file("batch_output.jsonl", content, "batch_output").id
+
+
+def count_completion_tokens(messages, max_tokens) -> tuple[int, int]:
+    """Prompt and completion tokens a simulated answer to *messages* reports."""
+    prompt_tokens = sum(count_tokens(str(message.get("content") or "")) for message in messages)
+    return prompt_tokens, min(max_tokens or COMPLETION_TOKENS, COMPLETION_TOKENS)
+
+
+def _simulated_content(prompt_tokens: int, completion_tokens: int, response_format=None) -> str:
+    text = simulated_text(prompt_tokens, completion_tokens)
+    if not response_format:
+        return text
+    # Structured summaries: a JSON object of SUMMARY_SCHEMA.
+    return json.dumps({
+        "chief_complaints": ["simulated complaint"],
+        "assessment": "Simulated assessment.",
+        "summary": text,
+    })
+
+
+def completion_body(request: dict) -> dict:
+    """
+    The JSON body of a simulated chat completion answering *request* (a
+    /v1/chat/completions request body), honouring its response_format.
+    Used for batch output lines and by ``manage.py serve_simulated_llm``.
+    """
+    prompt_tokens, completion_tokens = count_completion_tokens(request.get("messages", []), request.get("max_tokens"))
+    content = _simulated_content(prompt_tokens, completion_tokens, request.get("response_format"))
+    return {
+        "object": "chat.completion",
+        "model": request.get("model", SIMULATED_MODEL),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
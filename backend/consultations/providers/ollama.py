@@ -0,0 +1,23 @@
+"""Local Ollama provider, through its OpenAI-compatible API."""
+
+import logging
+
+from django.conf import settings
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+
+def model_name() -> str:
+    return settings.OLLAMA_MODEL
+
+
+def create_client() -> tuple[OpenAI, str]:
+    logger.info("Using Ollama provider at %s", settings.OLLAMA_BASE_URL)
+    client = OpenAI(
+        base_url=settings.OLLAMA_BASE_URL,
+        api_key="ollama",  # Ollama ignores this, but the SDK requires it
+        timeout=settings.AI_REQUEST_TIMEOUT,
+        max_retries=settings.AI_MAX_RETRIES,
+    )
+    return client, model_name()
@@ -0,0 +1,22 @@
+"""OpenAI cloud provider."""
+
+from django.conf import settings
+from openai import OpenAI
+
+from consultations.services import AIServiceError
+
+
+def model_name() -> str:
+    return settings.OPENAI_MODEL
+
+
+def create_client() -> tuple[OpenAI, str]:
+    if not settings.OPENAI_API_KEY:
+        raise AIServiceError("OPENAI_API_KEY is not configured.")
+    client = OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL or None,
+        timeout=settings.AI_REQUEST_TIMEOUT,
+        max_retries=settings.AI_MAX_RETRIES,
+    )
+    return client, model_name()
@@ -0,0 +1,167 @@
+"""
+Incremental analytics rollups for the consultations dashboard.
+
+``refresh_rollups()`` (run every ROLLUP_INTERVAL seconds by Celery beat)
+folds consultations created since the watermark into two small tables:
+  - DailyConsultationCount — consultations per day and patient age cohort,
+  - DiagnosisCount         — consultations per normalised diagnosis,
+so ``dashboard()`` reads a few dozen rows however large the consultations
+table grows.
+
+The watermark is a consultation pk.  That is safe because consultation
+inserts are serialised on the change-sequence counter (see
+``ChangeCounter.next()``): a pk becomes visible only after every lower one
+has committed or rolled back, so no row can appear behind the watermark.
+
+Rollups count consultations as they were created: later edits to a
+diagnosis, deletions and archiving do not change them.
+``manage.py refresh_consultation_rollups --rebuild`` recomputes them from
+the consultations currently in the hot table.
+"""
+
+import logging
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.utils import timezone
+
+from .models import Consultation, DailyConsultationCount, DiagnosisCount, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "consultation_rollups"
+DIAGNOSIS_MAX_LENGTH = DiagnosisCount._meta.get_field("diagnosis").max_length
+
+# (upper age bound, label) — age at the consultation date.
+AGE_COHORTS = ((18, "0-17"), (40, "18-39"), (65, "40-64"), (None, "65+"))
+
+
+def age_cohort(date_of_birth: date, on: date) -> str:
+    age = on.year - date_of_birth.year - ((on.month, on.day) < (date_of_birth.month, date_of_birth.day))
+    for upper, label in AGE_COHORTS:
+        if upper is None or age < upper:
+            return label
+
+
+def normalise_diagnosis(diagnosis: str) -> str:
+    return " ".join(diagnosis.split()).lower()
+
+
+# ── Refresh ──────────────────────────────────────────────────────────
+def refresh_rollups(batch_size: int | None = None) -> int:
+    """
+    Fold every consultation after the watermark into the rollups, one
+    transaction per batch.  Returns the number of consultations folded.
+    """
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    total = 0
+    while True:
+        folded = _fold_batch(batch_size)
+        total += folded
+        if folded < batch_size:
+            return total
+
+
+def _fold_batch(batch_size: int) -> int:
+    with transaction.atomic():
+        # Locking the watermark makes concurrent refreshes take turns.
+        RollupWatermark.objects.bulk_create([RollupWatermark(name=WATERMARK)], ignore_conflicts=True)
+        watermark = RollupWatermark.objects.select_for_update().get(name=WATERMARK)
+
+        rows = list(
+            Consultation.objects.filter(pk__gt=watermark.last_id)
+            .order_by("pk")
+            .annotate(diagnosis_head=Substr("diagnosis", 1, DIAGNOSIS_MAX_LENGTH))
+            .values_list("pk", "created_at", "patient__date_of_birth", "diagnosis_head")[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        daily, diagnoses = Counter(), Counter()
+        for _, created_at, date_of_birth, diagnosis in rows:
+            day = timezone.localdate(created_at)
+            daily[day, age_cohort(date_of_birth, day)] += 1
+            diagnosis = normalise_diagnosis(diagnosis)
+            if diagnosis:
+                diagnoses[diagnosis] += 1
+
+        _increment(
+            DailyConsultationCount,
+            Q(day__in=list({day for day, _ in daily})),
+            lambda row: (row.day, row.cohort),
+            lambda key: DailyConsultationCount(day=key[0], cohort=key[1]),
+            daily,
+        )
+        _increment(
+            DiagnosisCount,
+            Q(diagnosis__in=list(diagnoses)),
+            lambda row: row.diagnosis,
+            lambda key: DiagnosisCount(diagnosis=key),
+            diagnoses,
+        )
+
+        watermark.last_id = rows[-1][0]
+        watermark.updated_at = timezone.now()
+        watermark.save(update_fields=["last_id", "updated_at"])
+
+    logger.info("Folded %d consultations into the rollups (through #%d).", len(rows), rows[-1][0])
+    return len(rows)
+
+
+def _increment(model, candidates: Q, key_of, new, counts: Counter) -> None:
+    """Add *counts* to the rollup rows keyed by ``key_of(row)``."""
+    if not counts:
+        return
+    existing = {key_of(row): row for row in model.objects.filter(candidates)}
+    created = []
+    for key, count in counts.items():
+        row = existing.get(key)
+        if row is None:
+            row = new(key)
+            created.append(row)
+        row.count += count
+    model.objects.bulk_update([row for key, row in existing.items() if key in counts], ["count"])
+    model.objects.bulk_create(created)
+
+
+def rebuild_rollups(batch_size: int | None = None) -> int:
+    """Clear the rollups and fold every consultation again."""
+    with transaction.atomic():
+        RollupWatermark.objects.update_or_create(
+            name=WATERMARK, defaults={"last_id": 0, "updated_at": None}
+        )
+        DailyConsultationCount.objects.all().delete()
+        DiagnosisCount.objects.all().delete()
+    return refresh_rollups(batch_size)
+
+
+# ── Read side ────────────────────────────────────────────────────────
+def dashboard(days: int, top: int) -> dict:
+    """
+    Consultations per day (total and per cohort) for the last *days* days
+    and the *top* most frequent diagnoses, from the rollup tables only.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+
+    per_day = {start + timedelta(days=offset): {} for offset in range(days)}
+    for row in DailyConsultationCount.objects.filter(day__gte=start, day__lte=today):
+        per_day[row.day][row.cohort] = row.count
+
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    return {
+        "cohorts": [label for _, label in AGE_COHORTS],
+        "daily": [
+            {"date": day, "total": sum(cohorts.values()), "by_cohort": cohorts}
+            for day, cohorts in per_day.items()
+        ],
+        "top_diagnoses": list(
+            DiagnosisCount.objects.order_by("-count", "diagnosis").values("diagnosis", "count")[:top]
+        ),
+        "through_consultation": watermark.last_id if watermark else 0,
+        "refreshed_at": watermark.updated_at if watermark else None,
+    }
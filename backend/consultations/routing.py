@@ -0,0 +1,177 @@
+"""
+Latency-aware routing across AI providers (AI_PROVIDER="auto").
+
+The router keeps a rolling window of latencies and outcomes per provider
+and uses it to:
+  - send short notes to the local Ollama model and longer ones to OpenAI,
+  - demote a provider whose recent error rate is too high,
+  - optionally hedge: if the first provider has not answered within its
+    p90 latency, issue the same request to the other provider and keep
+    whichever answers first.  The loser's client is closed early, which
+    aborts its in-flight HTTP request; every other client is closed once
+    its attempt finishes.
+
+Statistics are kept in memory, so each web / Celery worker process learns
+its own view of provider health.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LOCAL_PROVIDER = "ollama"
+CLOUD_PROVIDER = "openai"
+
+
+class ProviderStats:
+    """Rolling latency / error window for a single provider."""
+
+    def __init__(self, window: int):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def percentile(self, pct: float) -> float | None:
+        """Nearest-rank percentile of successful latencies, in seconds."""
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(latencies)))
+        return latencies[rank - 1]
+
+
+class ProviderRouter:
+    """
+    Choose a provider per request and run the request with optional hedging.
+
+    *client_factory* maps a provider name to a ``(client, model)`` pair and
+    may raise if that provider is not configured.
+    """
+
+    def __init__(self, client_factory: Callable[[str], tuple]):
+        self._client_factory = client_factory
+        self._stats: dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, provider: str) -> ProviderStats:
+        with self._lock:
+            if provider not in self._stats:
+                self._stats[provider] = ProviderStats(settings.AI_ROUTING_WINDOW)
+            return self._stats[provider]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _is_healthy(self, provider: str) -> bool:
+        stats = self.stats(provider)
+        if len(stats) < settings.AI_ROUTING_MIN_SAMPLES:
+            return True
+        return stats.error_rate() <= settings.AI_ROUTING_MAX_ERROR_RATE
+
+    def choose(self, prompt_tokens: int) -> list[str]:
+        """Return providers in the order they should be tried."""
+        if prompt_tokens <= settings.AI_ROUTING_SHORT_NOTE_TOKENS:
+            order = [LOCAL_PROVIDER, CLOUD_PROVIDER]
+        else:
+            order = [CLOUD_PROVIDER, LOCAL_PROVIDER]
+        # Stable sort: healthy providers first, size preference otherwise kept.
+        return sorted(order, key=lambda provider: not self._is_healthy(provider))
+
+    def hedge_delay(self, provider: str) -> float:
+        stats = self.stats(provider)
+        p90 = stats.percentile(90) if len(stats) >= settings.AI_ROUTING_MIN_SAMPLES else None
+        return p90 if p90 is not None else settings.AI_ROUTING_HEDGE_DELAY
+
+    def run(self, work: Callable, prompt_tokens: int) -> tuple[str, str, object]:
+        """
+        Run ``work(client, model)`` on the best provider and return
+        ``(provider, model, result)`` from whichever provider answered.
+
+        Raises the last provider error if every candidate fails.
+        """
+        primary, secondary = self.choose(prompt_tokens)
+        logger.info("Routing %d-token request to %s (fallback %s).", prompt_tokens, primary, secondary)
+
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-route")
+        clients, cancelled = {}, set()
+        try:
+            futures = {pool.submit(self._attempt, primary, work, clients, cancelled): primary}
+            timeout = self.hedge_delay(primary) if settings.AI_ROUTING_HEDGE else None
+            done, _ = wait(futures, timeout=timeout)
+
+            if not done or next(iter(done)).exception() is not None:
+                if not done:
+                    logger.info("%s slower than %.2fs — hedging to %s.", primary, timeout, secondary)
+                futures[pool.submit(self._attempt, secondary, work, clients, cancelled)] = secondary
+
+            last_exc = None
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        self._cancel(pending, futures, clients, cancelled)
+                        return future.result()
+                    last_exc = future.exception()
+            raise last_exc
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _attempt(self, provider: str, work: Callable, clients: dict, cancelled: set):
+        started = time.monotonic()
+        client = None
+        try:
+            client, model = self._client_factory(provider)
+            clients[provider] = client
+            result = work(client, model)
+        except Exception:
+            # A hedge loser fails because we closed its client; that says
+            # nothing about the provider's health.
+            if provider not in cancelled:
+                self.stats(provider).record(time.monotonic() - started, ok=False)
+            raise
+        finally:
+            # A cancelled loser's client was already closed by _cancel().
+            if client is not None and provider not in cancelled:
+                _close(provider, client)
+        self.stats(provider).record(time.monotonic() - started, ok=True)
+        return provider, model, result
+
+    @staticmethod
+    def _cancel(pending: set, futures: dict, clients: dict, cancelled: set) -> None:
+        """Cancel the losing request(s) of a hedge."""
+        for future in pending:
+            cancelled.add(futures[future])
+            future.cancel()
+            client = clients.get(futures[future])
+            if client is not None:
+                _close(futures[future], client)
+
+
+def _close(provider: str, client) -> None:
+    try:
+        client.close()
+    except Exception:  # pragma: no cover - best effort
+        logger.debug("Could not close %s client.", provider)
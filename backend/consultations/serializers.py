@@ -6,18 +6,97 @@ from .models import Consultation, Patient
 class PatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = ["id", "full_name", "date_of_birth", "email"]
-        read_only_fields = ["id"]
+        fields = [
+            "id",
+            "full_name",
+            "date_of_birth",
+            "email",
+            "consultation_count",
+            "last_consultation_at",
+        ]
+        read_only_fields = ["id", "consultation_count", "last_consultation_at"]
 
     def validate_email(self, value):
         """Normalise email to lowercase for consistent uniqueness checks."""
         return value.lower()
 
 
-class ConsultationSerializer(serializers.ModelSerializer):
+class PatientDetailSerializer(PatientSerializer):
+    """Patient with the longitudinal roll-up summary (detail endpoint only)."""
+
+    class Meta(PatientSerializer.Meta):
+        fields = PatientSerializer.Meta.fields + [
+            "longitudinal_summary",
+            "longitudinal_summary_updated_at",
+        ]
+        read_only_fields = fields
+
+
+class TextPreviewField(serializers.ReadOnlyField):
+    """
+    Server-side truncated text.
+
+    Reads the ``<field>_preview`` annotation added by the view (a DB-side
+    SUBSTR of *length* + 1 characters, so the full text is never loaded) and
+    falls back to the full attribute on instances that were not annotated.
+    """
+
+    def __init__(self, length, **kwargs):
+        self.length = length
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        preview = instance.__dict__.get(f"{self.field_name}_preview", serializers.empty)
+        if preview is not serializers.empty:
+            return preview
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if value is None or len(value) <= self.length:
+            return value
+        return value[: self.length].rstrip() + "…"
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Accepts ``fields``, ``omit`` and ``preview`` keyword arguments.
+
+    ``fields`` / ``omit`` restrict the serialised fields; ``preview`` is a
+    length to which the ``preview_fields`` text fields are truncated.
+    """
+
+    preview_fields = ()
+
+    def __init__(self, *args, fields=None, omit=None, preview=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+        if preview:
+            for name in self.preview_fields:
+                if name in self.fields:
+                    field = self.fields[name]
+                    field_kwargs = {"source": field.source} if field.source != name else {}
+                    if field.default is not serializers.empty:
+                        field_kwargs["default"] = field.default
+                    self.fields[name] = TextPreviewField(preview, **field_kwargs)
+
+
+class ConsultationSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     patient_name = serializers.CharField(
         source="patient.full_name", read_only=True
     )
+    ai_summary = serializers.CharField(
+        source="current_summary.text", read_only=True, default=None
+    )
+    # Chief complaints / assessment / summary, with AI_STRUCTURED_SUMMARIES.
+    ai_summary_data = serializers.JSONField(
+        source="current_summary.data", read_only=True, default=None
+    )
+
+    preview_fields = ("symptoms", "diagnosis", "ai_summary")
 
     class Meta:
         model = Consultation
@@ -29,8 +108,9 @@ class ConsultationSerializer(serializers.ModelSerializer):
             "diagnosis",
             "created_at",
             "ai_summary",
+            "ai_summary_data",
         ]
-        read_only_fields = ["id", "created_at", "ai_summary"]
+        read_only_fields = ["id", "created_at"]
 
     def validate_patient(self, value):
         """Ensure the referenced patient exists (handled by FK, but explicit)."""
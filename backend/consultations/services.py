@@ -1,19 +1,47 @@
 """
 Service layer for AI-powered consultation summaries.
 
-Supports three providers controlled by settings.AI_PROVIDER:
+Supports four providers controlled by settings.AI_PROVIDER:
   "openai"  — uses the OpenAI API (cloud)
   "ollama"  — uses a local Ollama instance via its OpenAI-compatible API
-  "mock"    — returns a deterministic mocked summary (for dev / testing)
+  "auto"    — routes each request between Ollama and OpenAI by note length
+              and observed latency, with optional hedging (see routing.py)
+  "mock"    — returns a deterministic mocked summary (for dev / testing);
+              with AI_MOCK_* latency / fault settings it becomes a simulated
+              provider for load tests instead (see simulation.py)
 
 When AI_PROVIDER is *not* "mock", any provider error automatically falls
 back to a mocked response so the endpoint never breaks.
+
+Notes that exceed the active model's prompt budget are summarised in
+map-reduce fashion: the text is split into bounded chunks, each chunk is
+condensed in parallel, and the condensed notes are summarised in a final
+reduce call.  Budgets are configured per model via AI_MODEL_TOKEN_BUDGETS.
+
+summarize_consultations() summarises many consultations at once: short
+notes are packed several to a completion, in id-tagged sections sized to
+the model's context window, which saves the per-request overhead that
+dominates on small local models.
+
+With AI_STRUCTURED_SUMMARIES the model answers with a JSON object matching
+SUMMARY_SCHEMA (chief complaints, assessment, summary).  It is stored
+alongside the summary (ConsultationSummary.data) and the usual markdown is
+rendered from it.
 """
 
+import json
 import logging
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 
 from django.conf import settings
-from openai import APIConnectionError, APITimeoutError, AuthenticationError, OpenAI, RateLimitError
+
+from . import providers
+from .routing import LOCAL_PROVIDER, ProviderRouter
+from .simulation import simulation_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +50,40 @@ class AIServiceError(Exception):
     """Raised when the AI provider returns an unrecoverable error."""
 
 
+@dataclass(frozen=True)
+class SummaryResult:
+    """
+    A generated summary plus the provider / model that produced it and the
+    tokens it used (None when the provider did not report usage).
+    """
+
+    text: str
+    provider: str
+    model: str = ""
+    fallback: bool = False
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    # Structured summary (SUMMARY_SCHEMA) *text* was rendered from, if any.
+    data: dict | None = None
+
+
+@dataclass
+class TokenUsage:
+    """Token counts summed over every completion behind one summary."""
+
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, usage) -> None:
+        """Add a response's ``usage`` (map calls report from several threads)."""
+        if usage is None:
+            return
+        with self._lock:
+            self.prompt_tokens = (self.prompt_tokens or 0) + (usage.prompt_tokens or 0)
+            self.completion_tokens = (self.completion_tokens or 0) + (usage.completion_tokens or 0)
+
+
 # ── Mocked response ─────────────────────────────────────────────────
 def _build_mock_summary(symptoms: str, diagnosis: str) -> str:
     """Return a deterministic, realistic-looking clinical summary."""
@@ -36,29 +98,198 @@ def _build_mock_summary(symptoms: str, diagnosis: str) -> str:
     )
 
 
+def _build_mock_data(symptoms: str, diagnosis: str) -> dict:
+    return validate_summary_data({
+        "chief_complaints": re.split(r"[,;\n]", symptoms),
+        "assessment": diagnosis,
+        "summary": (
+            f"The patient presents with the above symptoms, which are consistent "
+            f"with a clinical assessment of {diagnosis}. Further monitoring and "
+            f"follow-up are recommended to track symptom progression and treatment response."
+        ),
+    })
+
+
+def _mock_result(symptoms: str, diagnosis: str, fallback: bool = False) -> SummaryResult:
+    if not settings.AI_STRUCTURED_SUMMARIES:
+        return SummaryResult(_build_mock_summary(symptoms, diagnosis), provider="mock", fallback=fallback)
+    data = _build_mock_data(symptoms, diagnosis)
+    text = f"{render_summary(data)}\n\n*— This summary was generated by the mock AI provider.*"
+    return SummaryResult(text, provider="mock", fallback=fallback, data=data)
+
+
+def _build_mock_rollup(previous_summary: str | None, entries: list[tuple[str, str]]) -> str:
+    """Append each new consultation to the roll-up as a dated line."""
+    lines = [previous_summary] if previous_summary else []
+    for date, summary in entries:
+        first_line = summary.strip().splitlines()[0] if summary.strip() else ""
+        lines.append(f"**{date}:** {first_line}")
+    return "\n\n".join(lines)
+
+
+# ── Prompts ──────────────────────────────────────────────────────────
+SUMMARY_SYSTEM_PROMPT = (
+    "You are a medical documentation assistant. "
+    "Given a patient's symptoms and diagnosis, produce a concise, "
+    "structured clinical summary in plain English. "
+    "Include the following sections:\n"
+    "1. **Chief Complaints** — a brief list of reported symptoms.\n"
+    "2. **Assessment** — the diagnosis in clinical terms.\n"
+    "3. **Summary** — a 2-3 sentence narrative tying symptoms to the diagnosis.\n"
+    "Keep the output professional and suitable for medical records."
+)
+
+STRUCTURED_SUMMARY_SYSTEM_PROMPT = (
+    "You are a medical documentation assistant. "
+    "Given a patient's symptoms and diagnosis, answer with a JSON object "
+    "with these keys:\n"
+    '- "chief_complaints": the reported symptoms, each a short lowercase phrase;\n'
+    '- "assessment": the diagnosis in clinical terms;\n'
+    '- "summary": a 2-3 sentence narrative tying symptoms to the diagnosis.\n'
+    "Keep the wording professional and suitable for medical records."
+)
+
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "chief_complaints": {"type": "array", "items": {"type": "string"}},
+        "assessment": {"type": "string"},
+        "summary": {"type": "string"},
+    },
+    "required": ["chief_complaints", "assessment", "summary"],
+    "additionalProperties": False,
+}
+
+CONDENSE_SYSTEM_PROMPT = (
+    "You are a medical documentation assistant. "
+    "You will receive one excerpt of a longer set of consultation notes. "
+    "Condense it into terse clinical notes, preserving every symptom, "
+    "finding, measurement, medication and diagnosis it mentions. "
+    "Do not add information that is not in the excerpt."
+)
+
+
+ROLLUP_SYSTEM_PROMPT = (
+    "You are a medical documentation assistant maintaining a longitudinal "
+    "summary of one patient's history. "
+    "You will receive the existing summary and one or more new consultation "
+    "summaries. Return an updated summary that integrates the new findings, "
+    "notes changes over time, and stays under 250 words. "
+    "Keep the output professional and suitable for medical records."
+)
+
+
+PACK_INSTRUCTIONS = (
+    "You will receive several consultations, each introduced by a line "
+    "'=== CONSULTATION <id> ==='. Summarise each consultation on its own. "
+    "Start each summary with the header line of its consultation, copied "
+    "exactly, keep the original order, and write nothing outside these sections."
+)
+
+
+# ── Token budgeting ─────────────────────────────────────────────────
+_CHARS_PER_TOKEN = 4
+_MAX_REDUCE_ROUNDS = 3
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in *text*.
+
+    Uses the common ~4 characters per token approximation, which is close
+    enough for budgeting across both OpenAI and Ollama tokenizers without
+    pulling in a model-specific tokenizer.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def get_token_budget(model: str) -> dict:
+    """
+    Resolve the token budget for *model*.
+
+    Global defaults come from the AI_* settings; entries in
+    AI_MODEL_TOKEN_BUDGETS override them for individual models.
+    """
+    budget = {
+        "max_prompt_tokens": settings.AI_MAX_PROMPT_TOKENS,
+        "chunk_tokens": settings.AI_CHUNK_TOKENS,
+        "max_completion_tokens": settings.AI_SUMMARY_MAX_TOKENS,
+        "condense_max_tokens": settings.AI_CONDENSE_MAX_TOKENS,
+        "context_tokens": settings.AI_CONTEXT_TOKENS,
+    }
+    budget.update(getattr(settings, "AI_MODEL_TOKEN_BUDGETS", {}).get(model, {}))
+    return budget
+
+
+def split_into_chunks(text: str, chunk_tokens: int) -> list[str]:
+    """
+    Split *text* into chunks of at most *chunk_tokens* tokens.
+
+    Paragraph and sentence boundaries are preferred; a single sentence that
+    is longer than the budget is hard-split on character boundaries.
+    """
+    max_chars = max(1, chunk_tokens * _CHARS_PER_TOKEN)
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?])\s+|\n+", text):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if sentence:
+            pieces.append(sentence)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        candidate = f"{current} {piece}" if current else piece
+        if len(candidate) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 # ── Provider resolution ─────────────────────────────────────────────
-def _get_client_and_model() -> tuple[OpenAI, str]:
+def _get_client_and_model(provider: str | None = None) -> tuple:
     """
-    Build an OpenAI client (or Ollama-compatible client) and resolve the
-    model name based on the active AI_PROVIDER setting.
+    Build the client for *provider* (defaulting to the active AI_PROVIDER
+    setting) and resolve its model name.
+
+    Provider modules are loaded lazily from the registry in providers/, so
+    the OpenAI SDK is only imported by processes that call a provider.
     """
-    provider = getattr(settings, "AI_PROVIDER", "openai").lower()
+    provider = (provider or getattr(settings, "AI_PROVIDER", "openai")).lower()
+    return providers.get_client_and_model(provider)
 
-    if provider == "ollama":
-        logger.info("Using Ollama provider at %s", settings.OLLAMA_BASE_URL)
-        client = OpenAI(
-            base_url=settings.OLLAMA_BASE_URL,
-            api_key="ollama",  # Ollama ignores this, but the SDK requires it
-        )
-        model = settings.OLLAMA_MODEL
-    else:
-        # Default: OpenAI cloud
-        if not settings.OPENAI_API_KEY:
-            raise AIServiceError("OPENAI_API_KEY is not configured.")
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        model = settings.OPENAI_MODEL
 
-    return client, model
+router = ProviderRouter(_get_client_and_model)
+
+
+def _is_instant_mock(provider: str) -> bool:
+    """True for the plain mock provider (no simulated latency or faults)."""
+    return provider == "mock" and not simulation_enabled()
+
+
+def _run_on_provider(work, prompt_tokens: int) -> tuple[str, str, object]:
+    """
+    Run ``work(client, model)`` on the configured provider and return
+    ``(provider, model, result)``.
+
+    With AI_PROVIDER="auto" the router picks (and possibly hedges across)
+    providers; otherwise the single configured provider is used.
+    """
+    provider = getattr(settings, "AI_PROVIDER", "openai").lower()
+    if provider == "auto":
+        return router.run(work, prompt_tokens)
+    client, model = _get_client_and_model()
+    try:
+        return provider, model, work(client, model)
+    finally:
+        client.close()
 
 
 # ── Public API ───────────────────────────────────────────────────────
@@ -68,59 +299,441 @@ def generate_consultation_summary(symptoms: str, diagnosis: str) -> str:
     a structured clinical summary.
 
     If AI_PROVIDER is "mock", a deterministic mocked summary is returned
-    immediately.  For "openai" / "ollama", any provider failure is caught
-    and a mocked response is returned as a fallback (with a logged warning).
+    immediately.  For "openai" / "ollama" / "auto", any provider failure is
+    caught and a mocked response is returned as a fallback (with a logged
+    warning).
+    """
+    return summarize_consultation(symptoms, diagnosis).text
+
+
+def summarize_consultation(symptoms: str, diagnosis: str) -> SummaryResult:
+    """
+    Like generate_consultation_summary(), but also report which provider
+    and model produced the summary (``"mock"`` with ``fallback=True`` for
+    mocked fallbacks).
     """
     provider = getattr(settings, "AI_PROVIDER", "openai").lower()
 
     # ── Fast path: mock provider ─────────────────────────────────────
-    if provider == "mock":
+    if _is_instant_mock(provider):
         logger.info("Using mock AI provider.")
-        return _build_mock_summary(symptoms, diagnosis)
+        return _mock_result(symptoms, diagnosis)
 
     # ── Real provider call ───────────────────────────────────────────
+    def summarize(client, model):
+        # Per attempt: a losing hedge must not add to the winner's usage.
+        usage = TokenUsage()
+        budget = get_token_budget(model)
+        prompt_symptoms, prompt_diagnosis = symptoms, diagnosis
+        if count_tokens(symptoms) + count_tokens(diagnosis) > budget["max_prompt_tokens"]:
+            prompt_symptoms, prompt_diagnosis = _condense_notes(
+                client, model, symptoms, diagnosis, budget, usage
+            )
+
+        system_prompt, options = _summary_prompt()
+        text = _complete(
+            client,
+            model,
+            system_prompt,
+            _build_user_prompt(prompt_symptoms, prompt_diagnosis),
+            max_tokens=budget["max_completion_tokens"],
+            usage=usage,
+            **options,
+        )
+        return text, usage
+
     try:
-        client, model = _get_client_and_model()
+        provider, model, (answer, usage) = _run_on_provider(
+            summarize, count_tokens(symptoms) + count_tokens(diagnosis)
+        )
+        text, data = parse_summary(answer)
+        return SummaryResult(
+            text,
+            provider=provider,
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            data=data,
+        )
+
     except AIServiceError:
         logger.warning("AI provider setup failed — falling back to mock response.")
-        return _build_mock_summary(symptoms, diagnosis)
-
-    system_prompt = (
-        "You are a medical documentation assistant. "
-        "Given a patient's symptoms and diagnosis, produce a concise, "
-        "structured clinical summary in plain English. "
-        "Include the following sections:\n"
-        "1. **Chief Complaints** — a brief list of reported symptoms.\n"
-        "2. **Assessment** — the diagnosis in clinical terms.\n"
-        "3. **Summary** — a 2-3 sentence narrative tying symptoms to the diagnosis.\n"
-        "Keep the output professional and suitable for medical records."
+    except Exception as exc:
+        _log_provider_error(exc, "falling back to mock response")
+
+    # Any exception above falls through here
+    return _mock_result(symptoms, diagnosis, fallback=True)
+
+
+def summarize_consultations(items: list[tuple]) -> dict:
+    """
+    Summarise several consultations; *items* are ``(key, symptoms,
+    diagnosis)`` tuples and the result maps each key to a SummaryResult.
+
+    Notes of up to AI_PACK_SHORT_NOTE_TOKENS are packed into shared
+    completions (see plan_packs()).  Items of a pack that fails, or whose
+    section is missing or malformed in the answer, and longer notes are
+    summarised one by one with summarize_consultation(), including its
+    mock fallback.  Token usage of a pack is shared evenly by its items.
+    """
+    provider = getattr(settings, "AI_PROVIDER", "openai").lower()
+    if _is_instant_mock(provider):
+        return {key: _mock_result(symptoms, diagnosis) for key, symptoms, diagnosis in items}
+
+    results = {}
+    short = [item for item in items if _note_tokens(item) <= settings.AI_PACK_SHORT_NOTE_TOKENS]
+    if len(short) > 1:
+        try:
+            packs = plan_packs(short, _packing_budget(provider))
+        except AIServiceError:
+            logger.warning("AI provider setup failed — summarising consultations one by one.")
+            packs = []
+        for pack in packs:
+            if len(pack) > 1:
+                results.update(_summarize_pack(pack))
+
+    for key, symptoms, diagnosis in items:
+        if key not in results:
+            results[key] = summarize_consultation(symptoms, diagnosis)
+    return results
+
+
+def plan_packs(items: list[tuple], budget: dict) -> list[list[tuple]]:
+    """
+    Group *items* into packs, in order, whose packed prompt plus
+    AI_PACK_ITEM_MAX_TOKENS of answer per item fits the model's context
+    window (``budget["context_tokens"]``), with at most AI_PACK_MAX_ITEMS
+    items per pack.
+    """
+    room = budget["context_tokens"] - count_tokens(_packed_system_prompt())
+    packs, current, used = [], [], 0
+    for item in items:
+        cost = count_tokens(_packed_section(*item)) + settings.AI_PACK_ITEM_MAX_TOKENS
+        if current and (used + cost > room or len(current) >= settings.AI_PACK_MAX_ITEMS):
+            packs.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def parse_packed_summaries(text: str, keys: list) -> dict:
+    """
+    Split a packed answer into ``{key: summary}``.  Sections that are
+    empty, repeated or tagged with an unknown id are dropped.
+    """
+    by_tag = {str(key): key for key in keys}
+    headers = list(_PACK_HEADER_RE.finditer(text))
+    sections: dict[str, list[str]] = {}
+    for header, following in zip(headers, [*headers[1:], None]):
+        end = following.start() if following else len(text)
+        sections.setdefault(header.group(1), []).append(text[header.end():end].strip())
+    return {
+        by_tag[tag]: bodies[0]
+        for tag, bodies in sections.items()
+        if tag in by_tag and len(bodies) == 1 and bodies[0]
+    }
+
+
+def summary_request(symptoms: str, diagnosis: str, model: str) -> dict | None:
+    """
+    Chat completion parameters that summarise a consultation in one call —
+    the request summarize_consultation() sends — for batch submission.
+
+    Returns None when the notes exceed *model*'s prompt budget: those need
+    the map-reduce path and cannot be summarised by a single request.
+    """
+    budget = get_token_budget(model)
+    if count_tokens(symptoms) + count_tokens(diagnosis) > budget["max_prompt_tokens"]:
+        return None
+    system_prompt, options = _summary_prompt()
+    return _chat_request(
+        model,
+        system_prompt,
+        _build_user_prompt(symptoms, diagnosis),
+        max_tokens=budget["max_completion_tokens"],
+        **options,
     )
 
+
+# ── Structured summaries ────────────────────────────────────────────
+def validate_summary_data(data) -> dict:
+    """
+    Check *data* against SUMMARY_SCHEMA and return it normalised; raises
+    ValueError.  Complaints are lowercased with whitespace collapsed (and
+    de-duplicated) so they can be matched exactly when filtering.
+    """
+    if not isinstance(data, dict) or set(data) != set(SUMMARY_SCHEMA["required"]):
+        raise ValueError(f"expected the keys {SUMMARY_SCHEMA['required']}")
+    complaints = data["chief_complaints"]
+    if not isinstance(complaints, list) or not all(isinstance(item, str) for item in complaints):
+        raise ValueError("chief_complaints must be a list of strings")
+    if not isinstance(data["assessment"], str) or not isinstance(data["summary"], str):
+        raise ValueError("assessment and summary must be strings")
+    normalised = (" ".join(item.split()).lower() for item in complaints)
+    return {
+        "chief_complaints": list(dict.fromkeys(item for item in normalised if item)),
+        "assessment": data["assessment"].strip(),
+        "summary": data["summary"].strip(),
+    }
+
+
+def render_summary(data: dict) -> str:
+    """The markdown summary (as in SUMMARY_SYSTEM_PROMPT) of structured *data*."""
+    return (
+        f"**Chief Complaints:** {', '.join(data['chief_complaints'])}\n\n"
+        f"**Assessment:** {data['assessment']}\n\n"
+        f"**Summary:** {data['summary']}"
+    )
+
+
+def parse_summary(answer: str) -> tuple[str, dict | None]:
+    """
+    Markdown text and structured data of a summary answer.
+
+    JSON answers are validated and rendered to markdown; anything else — a
+    markdown-mode answer, or a model that ignored the format — is kept as
+    is, without data.
+    """
+    body = _CODE_FENCE_RE.sub("", answer.strip())
+    if not body.startswith("{"):
+        return answer, None
+    try:
+        data = validate_summary_data(json.loads(body))
+    except ValueError as exc:
+        logger.warning("Structured summary does not match the schema (%s) — keeping the raw answer.", exc)
+        return answer, None
+    return render_summary(data), data
+
+
+def fold_patient_summary(previous_summary: str | None, entries: list[tuple[str, str]]) -> str:
+    """
+    Fold newly summarised consultations into a patient's roll-up summary.
+
+    *entries* is a list of ``(date, ai_summary)`` pairs in chronological
+    order.  Only the previous roll-up and the new summaries are sent, so the
+    cost of an update does not grow with the patient's history.
+
+    Unlike consultation summaries, provider failures raise AIServiceError
+    instead of falling back to the mock: a mocked fold would be persisted
+    and carried into every later roll-up.
+    """
+    provider = getattr(settings, "AI_PROVIDER", "openai").lower()
+
+    if _is_instant_mock(provider):
+        return _build_mock_rollup(previous_summary, entries)
+
+    new_notes = "\n\n".join(f"Consultation on {date}:\n{summary}" for date, summary in entries)
     user_prompt = (
-        f"Symptoms:\n{symptoms}\n\n"
-        f"Diagnosis:\n{diagnosis}"
+        f"Existing patient summary:\n{previous_summary or '(none yet)'}\n\n"
+        f"New consultation summaries:\n{new_notes}"
     )
 
+    def fold(client, model):
+        return _complete(
+            client, model, ROLLUP_SYSTEM_PROMPT, user_prompt,
+            max_tokens=settings.AI_ROLLUP_MAX_TOKENS,
+        )
+
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.3,
-            max_tokens=512,
+        _, _, rollup = _run_on_provider(fold, count_tokens(user_prompt))
+        return rollup
+    except AIServiceError:
+        raise
+    except Exception as exc:
+        _log_provider_error(exc, "patient summary not updated")
+        raise AIServiceError(str(exc)) from exc
+
+
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+SUMMARY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "consultation_summary", "strict": True, "schema": SUMMARY_SCHEMA},
+}
+
+
+def _summary_prompt() -> tuple[str, dict]:
+    """System prompt and extra request parameters of the summary format in use."""
+    if settings.AI_STRUCTURED_SUMMARIES:
+        return STRUCTURED_SUMMARY_SYSTEM_PROMPT, {"response_format": SUMMARY_RESPONSE_FORMAT}
+    return SUMMARY_SYSTEM_PROMPT, {}
+
+
+# ── Packing helpers ─────────────────────────────────────────────────
+_PACK_HEADER = "=== CONSULTATION {} ==="
+_PACK_HEADER_RE = re.compile(r"^[ \t]*=== CONSULTATION (\S+) ===[ \t]*$", re.MULTILINE)
+
+
+def _note_tokens(item: tuple) -> int:
+    _, symptoms, diagnosis = item
+    return count_tokens(symptoms) + count_tokens(diagnosis)
+
+
+def _packed_section(key, symptoms: str, diagnosis: str) -> str:
+    return f"{_PACK_HEADER.format(key)}\n{_build_user_prompt(symptoms, diagnosis)}"
+
+
+def _packed_system_prompt() -> str:
+    # No response_format: a packed answer as a whole is not one JSON object.
+    if settings.AI_STRUCTURED_SUMMARIES:
+        return f"{STRUCTURED_SUMMARY_SYSTEM_PROMPT}\n\n{PACK_INSTRUCTIONS} Each section holds only its JSON object."
+    return f"{SUMMARY_SYSTEM_PROMPT}\n\n{PACK_INSTRUCTIONS}"
+
+
+def _packing_budget(provider: str) -> dict:
+    """Budget packs are planned with; "auto" routes short notes to Ollama."""
+    return get_token_budget(providers.get_model(LOCAL_PROVIDER if provider == "auto" else provider))
+
+
+def _summarize_pack(pack: list[tuple]) -> dict:
+    """SummaryResults of the items of *pack* answered in well-formed sections."""
+    user_prompt = "\n\n".join(_packed_section(*item) for item in pack)
+    keys = [key for key, _, _ in pack]
+
+    def summarize(client, model):
+        usage = TokenUsage()
+        text = _complete(
+            client,
+            model,
+            _packed_system_prompt(),
+            user_prompt,
+            max_tokens=settings.AI_PACK_ITEM_MAX_TOKENS * len(pack),
+            usage=usage,
         )
-        return response.choices[0].message.content.strip()
-
-    except AuthenticationError:
-        logger.error("AI authentication failed — falling back to mock response.")
-    except RateLimitError:
-        logger.warning("AI rate limit exceeded — falling back to mock response.")
-    except (APIConnectionError, APITimeoutError):
-        logger.error("AI connection/timeout error — falling back to mock response.")
+        return parse_packed_summaries(text, keys), usage
+
+    try:
+        provider, model, (summaries, usage) = _run_on_provider(
+            summarize, max(_note_tokens(item) for item in pack)
+        )
+    except AIServiceError:
+        logger.warning("AI provider setup failed — summarising the pack one by one.")
+        return {}
     except Exception as exc:
-        logger.exception("Unexpected AI error: %s — falling back to mock response.", exc)
+        _log_provider_error(exc, "summarising the pack one by one")
+        return {}
 
-    # Any exception above falls through here
-    return _build_mock_summary(symptoms, diagnosis)
+    results = {}
+    for key, answer in summaries.items():
+        text, data = parse_summary(answer)
+        if settings.AI_STRUCTURED_SUMMARIES and data is None:
+            continue
+        results[key] = SummaryResult(
+            text,
+            provider=provider,
+            model=model,
+            prompt_tokens=_share(usage.prompt_tokens, len(pack)),
+            completion_tokens=_share(usage.completion_tokens, len(pack)),
+            data=data,
+        )
+    if len(results) < len(pack):
+        logger.info(
+            "%d of %d packed summaries missing or malformed — summarising them one by one.",
+            len(pack) - len(results), len(pack),
+        )
+    return results
+
+
+def _share(tokens: int | None, items: int) -> int | None:
+    return None if tokens is None else round(tokens / items)
+
+
+# ── Helpers ──────────────────────────────────────────────────────────
+def _log_provider_error(exc: Exception, consequence: str) -> None:
+    kind = providers.classify_error(exc)
+    if kind == "auth":
+        logger.error("AI authentication failed — %s.", consequence)
+    elif kind == "rate_limit":
+        logger.warning("AI rate limit exceeded — %s.", consequence)
+    elif kind == "connection":
+        logger.error("AI connection/timeout error — %s.", consequence)
+    else:
+        logger.exception("Unexpected AI error: %s — %s.", exc, consequence)
+
+
+def _build_user_prompt(symptoms: str, diagnosis: str) -> str:
+    return (
+        f"Symptoms:\n{symptoms}\n\n"
+        f"Diagnosis:\n{diagnosis}"
+    )
+
+
+def _chat_request(model: str, system_prompt: str, user_prompt: str, max_tokens: int, **options) -> dict:
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+        **options,
+    }
+
+
+def _complete(
+    client, model: str, system_prompt: str, user_prompt: str, max_tokens: int,
+    usage: TokenUsage | None = None, **options,
+) -> str:
+    """
+    Run a single chat completion and return the stripped text, adding the
+    response's token usage to *usage* if given.  *options* are extra request
+    parameters (e.g. ``response_format``).
+    """
+    response = client.chat.completions.create(
+        **_chat_request(model, system_prompt, user_prompt, max_tokens, **options)
+    )
+    if usage is not None:
+        usage.add(getattr(response, "usage", None))
+    return response.choices[0].message.content.strip()
+
+
+def _condense_notes(
+    client, model: str, symptoms: str, diagnosis: str, budget: dict,
+    usage: TokenUsage | None = None,
+) -> tuple[str, str]:
+    """
+    Map step of the map-reduce mode.
+
+    Each field is split into bounded chunks which are condensed in parallel.
+    Rounds repeat until the condensed notes fit the prompt budget (bounded
+    by _MAX_REDUCE_ROUNDS so a model that refuses to shorten cannot loop).
+    """
+    fields = {"Symptoms": symptoms, "Diagnosis": diagnosis}
+
+    for round_number in range(1, _MAX_REDUCE_ROUNDS + 1):
+        jobs = []
+        for label, text in fields.items():
+            chunks = split_into_chunks(text, budget["chunk_tokens"])
+            jobs.extend(
+                (label, index, chunk, len(chunks))
+                for index, chunk in enumerate(chunks, start=1)
+            )
+        logger.info(
+            "Notes exceed %s tokens for %s — condensing %d chunks (round %d).",
+            budget["max_prompt_tokens"], model, len(jobs), round_number,
+        )
+
+        def condense(job):
+            label, index, chunk, total = job
+            user_prompt = f"{label} notes, part {index} of {total}:\n{chunk}"
+            return label, _complete(
+                client, model, CONDENSE_SYSTEM_PROMPT, user_prompt,
+                max_tokens=budget["condense_max_tokens"],
+                usage=usage,
+            )
+
+        with ThreadPoolExecutor(max_workers=settings.AI_MAP_CONCURRENCY) as pool:
+            results = list(pool.map(condense, jobs))
+
+        fields = {
+            label: "\n".join(text for result_label, text in results if result_label == label)
+            for label in fields
+        }
+        if sum(count_tokens(text) for text in fields.values()) <= budget["max_prompt_tokens"]:
+            break
+
+    return fields["Symptoms"], fields["Diagnosis"]
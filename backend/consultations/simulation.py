@@ -0,0 +1,103 @@
+"""
+Simulated AI provider for load testing.
+
+With any AI_MOCK_* latency or fault setting enabled, AI_PROVIDER="mock"
+stops answering instantly and goes through the same code path as a real
+provider, backed by ``providers.mock.SimulatedClient``:
+  - each call sleeps for a base latency drawn from a fixed, uniform or
+    lognormal distribution, plus a per-token cost for the prompt and the
+    completion,
+  - a configurable share of calls fail with a timeout (after
+    AI_REQUEST_TIMEOUT seconds) or a 429 rate-limit error, raised as
+    subclasses of the OpenAI SDK's exception types.
+
+The same model drives the OpenAI-compatible stand-in server
+(``manage.py serve_simulated_llm``), which exercises the real HTTP client,
+its timeouts and retries.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+
+from django.conf import settings
+
+SIMULATED_MODEL = "simulated"
+
+# Completion length reported for simulated answers, capped by max_tokens.
+COMPLETION_TOKENS = 150
+
+TIMEOUT = "timeout"
+RATE_LIMIT = "rate_limit"
+
+
+@dataclass
+class LatencyModel:
+    """Latency distribution and fault rates of a simulated provider."""
+
+    latency: float = 0.0
+    distribution: str = "fixed"
+    jitter: float = 0.0
+    seconds_per_prompt_token: float = 0.0
+    seconds_per_completion_token: float = 0.0
+    timeout_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "LatencyModel":
+        return cls(
+            latency=settings.AI_MOCK_LATENCY,
+            distribution=settings.AI_MOCK_LATENCY_DISTRIBUTION,
+            jitter=settings.AI_MOCK_LATENCY_JITTER,
+            seconds_per_prompt_token=settings.AI_MOCK_SECONDS_PER_PROMPT_TOKEN,
+            seconds_per_completion_token=settings.AI_MOCK_SECONDS_PER_COMPLETION_TOKEN,
+            timeout_rate=settings.AI_MOCK_TIMEOUT_RATE,
+            rate_limit_rate=settings.AI_MOCK_RATE_LIMIT_RATE,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            (
+                self.latency,
+                self.seconds_per_prompt_token,
+                self.seconds_per_completion_token,
+                self.timeout_rate,
+                self.rate_limit_rate,
+            )
+        )
+
+    def base_latency(self, rng=random) -> float:
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(self.latency - self.jitter, self.latency + self.jitter))
+        if self.distribution == "lognormal":
+            # *latency* is the median; *jitter* is sigma of the underlying normal.
+            return self.latency * math.exp(rng.gauss(0.0, self.jitter)) if self.latency else 0.0
+        return self.latency
+
+    def delay(self, prompt_tokens: int, completion_tokens: int, rng=random) -> float:
+        return (
+            self.base_latency(rng)
+            + prompt_tokens * self.seconds_per_prompt_token
+            + completion_tokens * self.seconds_per_completion_token
+        )
+
+    def fault(self, rng=random) -> str | None:
+        """Return TIMEOUT, RATE_LIMIT or None for a successful call."""
+        roll = rng.random()
+        if roll < self.timeout_rate:
+            return TIMEOUT
+        if roll < self.timeout_rate + self.rate_limit_rate:
+            return RATE_LIMIT
+        return None
+
+
+def simulation_enabled() -> bool:
+    return LatencyModel.from_settings().enabled
+
+
+def simulated_text(prompt_tokens: int, completion_tokens: int) -> str:
+    return (
+        f"**Summary:** Simulated response to a {prompt_tokens}-token prompt "
+        f"({completion_tokens} completion tokens)."
+    )
@@ -1,23 +1,33 @@
 import logging
 
 from celery import shared_task
-from django.db import transaction
+from django.conf import settings
+from django.utils import timezone
 
-from .models import Consultation
-from .services import AIServiceError, generate_consultation_summary
+from .embeddings import embed_consultations
+from .models import Consultation, Patient, SummaryTiming
+from .rollups import refresh_rollups
+from .services import AIServiceError, fold_patient_summary, summarize_consultation
+from .timings import StageTimer, queue_wait_ms, record_summary_timing
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3)
-def generate_summary_task(self, consultation_id):
+def generate_summary_task(self, consultation_id, enqueued_at=None):
     """
     Background task to generate an AI summary for a consultation.
+
+    *enqueued_at* is the ``time.time()`` at which the request enqueued the
+    task; with it the queue wait is recorded alongside the stage timings
+    (see timings.py).
     """
+    timer = StageTimer()
     try:
-        consultation = Consultation.objects.select_related("patient").get(
-            pk=consultation_id
-        )
+        with timer.stage("fetch_ms"):
+            consultation = Consultation.objects.select_related("patient").get(
+                pk=consultation_id
+            )
     except Consultation.DoesNotExist:
         logger.error(f"Consultation {consultation_id} not found.")
         return
@@ -26,23 +36,144 @@ def generate_summary_task(self, consultation_id):
         logger.warning(f"Consultation {consultation_id} has empty symptoms.")
         return
 
+    result = None
     try:
-        summary = generate_consultation_summary(
-            symptoms=consultation.symptoms,
-            diagnosis=consultation.diagnosis,
-        )
+        with timer.stage("provider_ms"):
+            result = summarize_consultation(
+                symptoms=consultation.symptoms,
+                diagnosis=consultation.diagnosis,
+            )
 
-        with transaction.atomic():
-            consultation.ai_summary = summary
-            consultation.save(update_fields=["ai_summary"])
+        with timer.stage("save_ms"):
+            consultation.set_summary(
+                result.text, provider=result.provider, model=result.model, data=result.data
+            )
 
         logger.info(f"Summary generated successfully for consultation {consultation_id}")
+        update_patient_summary_task.delay(consultation.patient_id)
+        _record_timing(self, consultation_id, timer, enqueued_at, result)
         return f"Summary for {consultation_id} completed."
 
     except AIServiceError as exc:
         logger.error(f"AI Service error for consultation {consultation_id}: {exc}")
+        _record_timing(self, consultation_id, timer, enqueued_at, result, failed=True)
         # Retry with exponential backoff
         raise self.retry(exc=exc, countdown=2**self.request.retries)
     except Exception as exc:
         logger.exception(f"Unexpected error for consultation {consultation_id}: {exc}")
+        _record_timing(self, consultation_id, timer, enqueued_at, result, failed=True)
         raise self.retry(exc=exc, countdown=2**self.request.retries)
+
+
+def _record_timing(task, consultation_id, timer, enqueued_at, result, failed=False):
+    if failed:
+        outcome = SummaryTiming.OUTCOME_ERROR
+    elif result.fallback:
+        outcome = SummaryTiming.OUTCOME_FALLBACK
+    else:
+        outcome = SummaryTiming.OUTCOME_OK
+    record_summary_timing(
+        consultation_id,
+        timer,
+        provider=result.provider if result else settings.AI_PROVIDER,
+        model=result.model if result else "",
+        outcome=outcome,
+        attempt=task.request.retries or 0,
+        queue_ms=queue_wait_ms(enqueued_at),
+        prompt_tokens=result.prompt_tokens if result else None,
+        completion_tokens=result.completion_tokens if result else None,
+    )
+
+
+@shared_task(bind=True, max_retries=3)
+def update_patient_summary_task(self, patient_id):
+    """
+    Fold consultation summaries created since the last run into the
+    patient's longitudinal summary.
+
+    Only current summaries after the ``longitudinal_summary_seq`` watermark
+    (a ``ConsultationSummary.seq``) are sent, together with the previous
+    roll-up, so each update is a single small LLM call.  Keying on the
+    summary rather than the consultation folds summaries that finish out of
+    order, and folds a regenerated summary again; keying on the serialised
+    seq rather than the pk never skips a summary that committed late.  The watermark is
+    advanced with a conditional UPDATE; if another worker advanced it first,
+    the task retries from the new state.
+    """
+    try:
+        patient = Patient.objects.only(
+            "longitudinal_summary", "longitudinal_summary_seq"
+        ).get(pk=patient_id)
+    except Patient.DoesNotExist:
+        logger.error(f"Patient {patient_id} not found.")
+        return
+
+    through_seq = patient.longitudinal_summary_seq
+    pending = (
+        Consultation.objects.filter(patient_id=patient_id, current_summary__isnull=False)
+        .exclude(current_summary__text="")
+        .select_related("current_summary")
+        .order_by("current_summary__seq")
+        .only("pk", "created_at", "current_summary__text", "current_summary__seq")
+    )
+    if through_seq is not None:
+        pending = pending.filter(current_summary__seq__gt=through_seq)
+    pending = list(pending[: settings.AI_ROLLUP_BATCH_SIZE])
+
+    if not pending:
+        return
+
+    try:
+        rollup = fold_patient_summary(
+            patient.longitudinal_summary,
+            [(c.created_at.date().isoformat(), c.ai_summary) for c in pending],
+        )
+    except AIServiceError as exc:
+        logger.error(f"AI Service error for patient {patient_id} summary: {exc}")
+        raise self.retry(exc=exc, countdown=2**self.request.retries)
+
+    updated = Patient.objects.filter(
+        pk=patient_id, longitudinal_summary_seq=through_seq
+    ).update(
+        longitudinal_summary=rollup,
+        longitudinal_summary_seq=pending[-1].current_summary.seq,
+        longitudinal_summary_updated_at=timezone.now(),
+    )
+    if not updated:
+        logger.info(f"Patient {patient_id} summary advanced concurrently — retrying.")
+        raise self.retry(countdown=1)
+
+    if len(pending) == settings.AI_ROLLUP_BATCH_SIZE:
+        # More summaries may be waiting behind this batch.
+        update_patient_summary_task.delay(patient_id)
+
+    logger.info(f"Patient {patient_id} summary updated through summary seq {pending[-1].current_summary.seq}")
+
+
+@shared_task(bind=True, max_retries=3)
+def embed_consultation_task(self, consultation_id):
+    """
+    Store the embedding of a newly created consultation so it shows up in
+    similar-consultation lookups.
+    """
+    consultation = Consultation.objects.filter(pk=consultation_id).only("symptoms", "diagnosis").first()
+    if consultation is None:
+        logger.error(f"Consultation {consultation_id} not found.")
+        return
+
+    try:
+        embed_consultations([consultation])
+    except AIServiceError as exc:
+        logger.error(f"Embedding failed for consultation {consultation_id}: {exc}")
+        raise self.retry(exc=exc, countdown=2**self.request.retries)
+
+
+@shared_task(ignore_result=True)
+def refresh_rollups_task():
+    """
+    Fold newly created consultations into the analytics rollups.
+    Scheduled by Celery beat every ROLLUP_INTERVAL seconds.
+    """
+    folded = refresh_rollups()
+    if folded:
+        logger.info(f"Rollups refreshed with {folded} new consultations.")
@@ -1,12 +1,86 @@
+import json
+import os
+import pstats
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import MagicMock, patch
 
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from .models import Consultation, Patient
-from .services import AIServiceError
+from core import profiling
+
+from . import batch, providers, rollups, urls, warmup
+from .filters import ConsultationFilter
+from .embeddings import (
+    HashingEmbedder,
+    ProviderEmbedder,
+    SimilarityIndex,
+    embed_consultations,
+    preload_similarity_index,
+    similarity_index,
+    vector_from_bytes,
+    vector_to_bytes,
+)
+from .models import (
+    EMBEDDING_CHANGES,
+    ArchivedConsultation,
+    ChangeCounter,
+    Consultation,
+    ConsultationEmbedding,
+    ConsultationSummary,
+    DailyConsultationCount,
+    DiagnosisCount,
+    OutboxTask,
+    Patient,
+    SummaryBatch,
+    SummaryBatchFailure,
+    SummaryTiming,
+)
+from .outbox import dispatch_pending, enqueue
+from .routing import ProviderRouter
+from .services import (
+    SUMMARY_RESPONSE_FORMAT,
+    SUMMARY_SYSTEM_PROMPT,
+    AIServiceError,
+    count_tokens,
+    fold_patient_summary,
+    generate_consultation_summary,
+    parse_packed_summaries,
+    parse_summary,
+    plan_packs,
+    render_summary,
+    split_into_chunks,
+    summarize_consultation,
+    summarize_consultations,
+)
+from .management.commands.serve_simulated_llm import SimulatedLLMHandler
+from .providers.mock import SimulatedClient
+from .simulation import LatencyModel
+from .views import ConsultationListCreateView, PatientAutocompleteView
+from .timings import timing_stats
+from .tasks import embed_consultation_task, generate_summary_task, update_patient_summary_task
 
 
 # =================================================================
@@ -292,7 +366,7 @@ class GenerateSummaryViewTests(TestCase):
     # 200 — mocked OpenAI response
     # -----------------------------------------------------------------
     @override_settings(OPENAI_API_KEY="test-key")
-    @patch("consultations.services.OpenAI")
+    @patch("consultations.providers.openai.OpenAI")
     def test_generate_summary_success(self, mock_openai_cls):
         """AI summary is generated, stored, and returned."""
         mock_summary = (
@@ -366,11 +440,10 @@ class GenerateSummaryViewTests(TestCase):
     # Idempotency — regenerating overwrites previous summary
     # -----------------------------------------------------------------
     @override_settings(OPENAI_API_KEY="test-key")
-    @patch("consultations.services.OpenAI")
+    @patch("consultations.providers.openai.OpenAI")
     def test_generate_summary_overwrites_existing(self, mock_openai_cls):
         """Calling generate-summary again replaces the old ai_summary."""
-        self.consultation.ai_summary = "Old summary"
-        self.consultation.save()
+        self.consultation.set_summary("Old summary")
 
         new_summary = "Updated clinical summary after re-evaluation."
         mock_client = MagicMock()
@@ -446,3 +519,2025 @@ class ConsultationFilterTests(TestCase):
         response = self.client.get(self.url, {"patient": 9999})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["count"], 0)
+
+
+# =================================================================
+# Map-reduce summarisation for long notes
+# =================================================================
+@override_settings(
+    AI_PROVIDER="openai",
+    OPENAI_API_KEY="test-key",
+    OPENAI_MODEL="gpt-test",
+    AI_MAX_PROMPT_TOKENS=100,
+    AI_CHUNK_TOKENS=50,
+    AI_MODEL_TOKEN_BUDGETS={},
+)
+class MapReduceSummaryTests(TestCase):
+    """Tests for token budgeting and chunked summarisation."""
+
+    def _mock_client(self, mock_openai_cls, content="Condensed."):
+        mock_client = MagicMock()
+        mock_openai_cls.return_value = mock_client
+        mock_choice = MagicMock()
+        mock_choice.message.content = content
+        mock_client.chat.completions.create.return_value = MagicMock(
+            choices=[mock_choice]
+        )
+        return mock_client
+
+    def test_count_tokens(self):
+        """Token estimate is ~4 characters per token."""
+        self.assertEqual(count_tokens(""), 0)
+        self.assertEqual(count_tokens("abcd"), 1)
+        self.assertEqual(count_tokens("abcde"), 2)
+
+    def test_split_into_chunks_respects_budget(self):
+        """Every chunk fits the budget and no text is lost."""
+        text = " ".join(f"Sentence number {i} about pain." for i in range(40))
+        chunks = split_into_chunks(text, chunk_tokens=20)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 20)
+        self.assertEqual(" ".join(chunks), text)
+
+    def test_split_into_chunks_hard_splits_long_sentence(self):
+        """A single sentence longer than the budget is split on characters."""
+        chunks = split_into_chunks("x" * 500, chunk_tokens=25)
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual("".join(chunks), "x" * 500)
+
+    @patch("consultations.providers.openai.OpenAI")
+    def test_short_notes_use_single_call(self, mock_openai_cls):
+        """Notes within budget are summarised in one completion."""
+        mock_client = self._mock_client(mock_openai_cls, "Summary.")
+        result = generate_consultation_summary("Cough", "Cold")
+        self.assertEqual(result, "Summary.")
+        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+
+    @patch("consultations.providers.openai.OpenAI")
+    def test_long_notes_are_mapped_then_reduced(self, mock_openai_cls):
+        """Long notes are condensed per chunk, then summarised once."""
+        mock_client = self._mock_client(mock_openai_cls)
+        symptoms = " ".join(f"Symptom detail {i} noted." for i in range(60))
+
+        generate_consultation_summary(symptoms, "Migraine")
+
+        calls = mock_client.chat.completions.create.call_args_list
+        chunk_count = len(split_into_chunks(symptoms, 50)) + 1  # + diagnosis
+        self.assertEqual(len(calls), chunk_count + 1)
+        reduce_prompt = calls[-1].kwargs["messages"][1]["content"]
+        self.assertIn("Condensed.", reduce_prompt)
+        self.assertEqual(calls[-1].kwargs["max_tokens"], 512)
+
+    @override_settings(AI_MODEL_TOKEN_BUDGETS={"gpt-test": {"max_prompt_tokens": 10_000}})
+    @patch("consultations.providers.openai.OpenAI")
+    def test_per_model_budget_override(self, mock_openai_cls):
+        """A per-model budget override disables chunking for that model."""
+        mock_client = self._mock_client(mock_openai_cls)
+        symptoms = " ".join(f"Symptom detail {i} noted." for i in range(60))
+
+        generate_consultation_summary(symptoms, "Migraine")
+
+        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+
+
+# =================================================================
+# Patient longitudinal summary
+# =================================================================
+@override_settings(AI_PROVIDER="mock", AI_ROLLUP_BATCH_SIZE=5)
+class PatientLongitudinalSummaryTests(TestCase):
+    """Tests for the incrementally maintained patient roll-up summary."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe",
+            date_of_birth="1990-05-15",
+            email="jane@example.com",
+        )
+
+    def _consult(self, summary):
+        consultation = Consultation.objects.create(patient=self.patient, symptoms="Cough")
+        if summary is not None:
+            consultation.set_summary(summary)
+        return consultation
+
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_folds_only_new_consultations(self, _mock_delay):
+        """Each run folds consultations after the watermark, once."""
+        self._consult("First visit")
+        update_patient_summary_task.apply(args=[self.patient.pk])
+        self.patient.refresh_from_db()
+        self.assertIn("First visit", self.patient.longitudinal_summary)
+
+        second = self._consult("Second visit")
+        with patch("consultations.tasks.fold_patient_summary", return_value="Rolled") as mock_fold:
+            update_patient_summary_task.apply(args=[self.patient.pk])
+
+        previous, entries = mock_fold.call_args.args
+        self.assertIn("First visit", previous)
+        self.assertEqual([summary for _, summary in entries], ["Second visit"])
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.longitudinal_summary, "Rolled")
+        self.assertEqual(self.patient.longitudinal_summary_seq, second.current_summary.seq)
+
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_folds_summaries_completed_out_of_order(self, _mock_delay):
+        """A consultation summarised after a later one is still folded."""
+        first = self._consult(None)
+        self._consult("Summary two")
+        update_patient_summary_task.apply(args=[self.patient.pk])
+
+        first.set_summary("Summary one")
+        with patch("consultations.tasks.fold_patient_summary", return_value="Rolled") as mock_fold:
+            update_patient_summary_task.apply(args=[self.patient.pk])
+
+        previous, entries = mock_fold.call_args.args
+        self.assertIn("Summary two", previous)
+        self.assertEqual([summary for _, summary in entries], ["Summary one"])
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.longitudinal_summary_seq, first.current_summary.seq)
+
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_folds_summary_committed_out_of_pk_order(self, _mock_delay):
+        """A summary whose pk was taken first but which committed last is still folded."""
+        first, second = self._consult(None), self._consult(None)
+
+        def commit_summary(consultation, pk, text):
+            # An explicit pk stands in for the sequence value a concurrent
+            # transaction took before this one committed.
+            consultation.current_summary = ConsultationSummary.objects.create(
+                pk=pk, consultation=consultation, version=1, text=text
+            )
+            consultation.save(update_fields=["current_summary"])
+
+        commit_summary(second, 1000, "Summary two")
+        update_patient_summary_task.apply(args=[self.patient.pk])
+        commit_summary(first, 999, "Summary one")
+        with patch("consultations.tasks.fold_patient_summary", return_value="Rolled") as mock_fold:
+            update_patient_summary_task.apply(args=[self.patient.pk])
+
+        _, entries = mock_fold.call_args.args
+        self.assertEqual([summary for _, summary in entries], ["Summary one"])
+
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_folds_regenerated_summary(self, _mock_delay):
+        """Regenerating a folded consultation's summary folds the new version."""
+        consultation = self._consult("Original")
+        update_patient_summary_task.apply(args=[self.patient.pk])
+
+        consultation.set_summary("Regenerated")
+        with patch("consultations.tasks.fold_patient_summary", return_value="Rolled") as mock_fold:
+            update_patient_summary_task.apply(args=[self.patient.pk])
+
+        _, entries = mock_fold.call_args.args
+        self.assertEqual([summary for _, summary in entries], ["Regenerated"])
+
+    def test_skips_consultations_without_summary(self):
+        """Consultations that have not been summarised are not folded."""
+        self._consult(None)
+        with patch("consultations.tasks.fold_patient_summary") as mock_fold:
+            update_patient_summary_task.apply(args=[self.patient.pk])
+        mock_fold.assert_not_called()
+
+    @override_settings(AI_ROLLUP_BATCH_SIZE=2)
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_requeues_when_batch_is_full(self, mock_delay):
+        """A full batch schedules a follow-up run for the remainder."""
+        for i in range(3):
+            self._consult(f"Visit {i}")
+        update_patient_summary_task.apply(args=[self.patient.pk])
+        mock_delay.assert_called_once_with(self.patient.pk)
+
+    def test_detail_endpoint_exposes_summary(self):
+        """GET /api/patients/{id}/ includes the roll-up; the list does not."""
+        self.patient.longitudinal_summary = "Chronic migraine, improving."
+        self.patient.save()
+
+        url = reverse("consultations:patient-detail", kwargs={"pk": self.patient.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["longitudinal_summary"], "Chronic migraine, improving.")
+
+        response = self.client.get(reverse("consultations:patient-list"))
+        self.assertNotIn("longitudinal_summary", response.data["results"][0])
+
+
+# =================================================================
+# Provider routing & hedged requests (AI_PROVIDER="auto")
+# =================================================================
+@override_settings(
+    AI_ROUTING_SHORT_NOTE_TOKENS=100,
+    AI_ROUTING_HEDGE=True,
+    AI_ROUTING_HEDGE_DELAY=0.05,
+    AI_ROUTING_WINDOW=50,
+    AI_ROUTING_MIN_SAMPLES=5,
+    AI_ROUTING_MAX_ERROR_RATE=0.5,
+)
+class ProviderRouterTests(TestCase):
+    """Tests for latency-aware routing across providers."""
+
+    def setUp(self):
+        self.clients = {"ollama": MagicMock(), "openai": MagicMock()}
+        self.router = ProviderRouter(lambda name: (self.clients[name], f"{name}-model"))
+
+    def test_short_notes_prefer_local_model(self):
+        self.assertEqual(self.router.choose(50), ["ollama", "openai"])
+        self.assertEqual(self.router.choose(500), ["openai", "ollama"])
+
+    def test_unhealthy_provider_is_demoted(self):
+        """A provider above the error-rate threshold is tried last."""
+        for _ in range(5):
+            self.router.stats("ollama").record(1.0, ok=False)
+        self.assertEqual(self.router.choose(50), ["openai", "ollama"])
+
+    def test_hedge_delay_uses_p90(self):
+        """Once enough samples exist, the hedge fires at the p90 latency."""
+        self.assertEqual(self.router.hedge_delay("openai"), 0.05)
+        for latency in range(1, 11):
+            self.router.stats("openai").record(float(latency), ok=True)
+        self.assertEqual(self.router.hedge_delay("openai"), 9.0)
+
+    def test_fails_over_when_primary_errors(self):
+        """If the first provider raises, the other provider answers."""
+        def work(client, model):
+            if model == "ollama-model":
+                raise ConnectionError("down")
+            return "from openai"
+
+        self.assertEqual(
+            self.router.run(work, prompt_tokens=10), ("openai", "openai-model", "from openai")
+        )
+        self.assertEqual(self.router.stats("ollama").error_rate(), 1.0)
+
+    def test_closes_every_attempted_client(self):
+        """The winner's client and a failed primary's client are both closed."""
+        def work(client, model):
+            if model == "ollama-model":
+                raise ConnectionError("down")
+            return "from openai"
+
+        self.router.run(work, prompt_tokens=10)
+
+        self.clients["ollama"].close.assert_called_once()
+        self.clients["openai"].close.assert_called_once()
+
+    def test_hedges_slow_primary_and_cancels_loser(self):
+        """A slow primary is hedged; the faster answer wins and the loser is closed."""
+        release = threading.Event()
+
+        def work(client, model):
+            if model == "ollama-model":
+                release.wait(5)
+                raise ConnectionError("closed")
+            return "from openai"
+
+        self.clients["ollama"].close.side_effect = release.set
+        provider, _, result = self.router.run(work, prompt_tokens=10)
+
+        self.assertEqual((provider, result), ("openai", "from openai"))
+        self.clients["ollama"].close.assert_called_once()
+        # The cancelled loser does not count against the provider's health.
+        release.wait(1)
+        self.assertEqual(self.router.stats("ollama").error_rate(), 0.0)
+
+    @override_settings(AI_PROVIDER="auto", OPENAI_API_KEY="test-key")
+    @patch("consultations.providers.openai.OpenAI")
+    def test_generate_summary_routes_through_router(self, mock_openai_cls):
+        """generate_consultation_summary uses the router in auto mode."""
+        mock_choice = MagicMock()
+        mock_choice.message.content = "Routed summary."
+        mock_openai_cls.return_value.chat.completions.create.return_value = MagicMock(
+            choices=[mock_choice]
+        )
+        router = ProviderRouter(lambda name: (mock_openai_cls(), f"{name}-model"))
+        with patch("consultations.services.router", router):
+            self.assertEqual(generate_consultation_summary("Cough", "Cold"), "Routed summary.")
+        self.assertEqual(len(router.stats("ollama")), 1)
+
+
+# =================================================================
+# Denormalised patient consultation stats
+# =================================================================
+class PatientConsultationStatsTests(TestCase):
+    """Tests for consultation_count / last_consultation_at on Patient."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("consultations:patient-list")
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe",
+            date_of_birth="1990-05-15",
+            email="jane@example.com",
+        )
+        self.other = Patient.objects.create(
+            full_name="John Smith",
+            date_of_birth="1985-03-20",
+            email="john@example.com",
+        )
+
+    def test_create_increments_counters(self):
+        """Creating a consultation through the API updates the patient."""
+        self.client.post(
+            reverse("consultations:consultation-list"),
+            {"patient": self.patient.pk, "symptoms": "Cough"},
+            format="json",
+        )
+        latest = Consultation.objects.create(patient=self.patient, symptoms="Fever")
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.consultation_count, 2)
+        self.assertEqual(self.patient.last_consultation_at, latest.created_at)
+
+    def test_bulk_create_updates_counters(self):
+        """bulk_create refreshes the counters of every affected patient."""
+        Consultation.objects.bulk_create(
+            [Consultation(patient=self.patient, symptoms=f"S{i}") for i in range(3)]
+            + [Consultation(patient=self.other, symptoms="S")]
+        )
+        self.patient.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.patient.consultation_count, 3)
+        self.assertEqual(self.other.consultation_count, 1)
+        self.assertIsNotNone(self.other.last_consultation_at)
+
+    def test_delete_recomputes_counters(self):
+        """Single and queryset deletes keep counts and last visit correct."""
+        first = Consultation.objects.create(patient=self.patient, symptoms="A")
+        second = Consultation.objects.create(patient=self.patient, symptoms="B")
+        Consultation.objects.create(patient=self.other, symptoms="C")
+
+        second.delete()
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.consultation_count, 1)
+        self.assertEqual(self.patient.last_consultation_at, first.created_at)
+
+        Consultation.objects.all().delete()
+        self.patient.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.patient.consultation_count, 0)
+        self.assertIsNone(self.patient.last_consultation_at)
+        self.assertEqual(self.other.consultation_count, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        """reconcile_patient_stats recomputes counters from scratch."""
+        Consultation.objects.create(patient=self.patient, symptoms="A")
+        Patient.objects.update(consultation_count=42, last_consultation_at=None)
+
+        call_command("reconcile_patient_stats", batch_size=1, stdout=StringIO())
+
+        self.patient.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.patient.consultation_count, 1)
+        self.assertIsNotNone(self.patient.last_consultation_at)
+        self.assertEqual(self.other.consultation_count, 0)
+
+    def test_list_ordering_and_filtering(self):
+        """The patient list can be sorted and filtered by the counters."""
+        for _ in range(2):
+            Consultation.objects.create(patient=self.other, symptoms="A")
+        Consultation.objects.create(patient=self.patient, symptoms="B")
+
+        response = self.client.get(self.url, {"ordering": "-consultation_count"})
+        names = [p["full_name"] for p in response.data["results"]]
+        self.assertEqual(names, ["John Smith", "Jane Doe"])
+        self.assertEqual(response.data["results"][0]["consultation_count"], 2)
+
+        response = self.client.get(self.url, {"min_consultations": 2})
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["full_name"], "John Smith")
+
+
+# =================================================================
+# Patient autocomplete — GET /api/patients/autocomplete/
+# =================================================================
+@override_settings(PATIENT_AUTOCOMPLETE_LIMIT=3, PATIENT_AUTOCOMPLETE_CACHE_SECONDS=30)
+class PatientAutocompleteViewTests(TestCase):
+    """Tests for the patient typeahead endpoint (SQLite prefix fallback)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("consultations:patient-autocomplete")
+        for name, email in [
+            ("Jane Doe", "jane@example.com"),
+            ("Janet Smith", "jsmith@example.com"),
+            ("John Janeway", "captain@example.com"),
+            ("Mary Major", "janitor@example.com"),
+        ]:
+            Patient.objects.create(full_name=name, date_of_birth="1990-01-01", email=email)
+
+    def test_prefix_matches_name_and_email(self):
+        """Matches name or email prefixes, case-insensitively, ordered by name."""
+        response = self.client.get(self.url, {"q": "jan"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [p["full_name"] for p in response.data],
+            ["Jane Doe", "Janet Smith", "Mary Major"],
+        )
+
+    def test_compact_payload(self):
+        """Each result carries only id, full_name and email; no pagination."""
+        response = self.client.get(self.url, {"q": "Jane D"})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(set(response.data[0]), {"id", "full_name", "email"})
+
+    def test_short_query_returns_nothing(self):
+        """Queries below the minimum length do not hit the database."""
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"q": "j"})
+        self.assertEqual(response.data, [])
+
+    def test_limit_is_capped(self):
+        """?limit cannot exceed PATIENT_AUTOCOMPLETE_LIMIT."""
+        response = self.client.get(self.url, {"q": "ja", "limit": 100})
+        self.assertEqual(len(response.data), 3)
+        response = self.client.get(self.url, {"q": "ja", "limit": 1})
+        self.assertEqual(len(response.data), 1)
+
+    def test_response_is_cacheable(self):
+        """Responses carry a private Cache-Control max-age."""
+        response = self.client.get(self.url, {"q": "jan"})
+        self.assertIn("max-age=30", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+
+
+# =================================================================
+# Consultation date-range filtering
+# =================================================================
+class ConsultationDateRangeFilterTests(TestCase):
+    """Tests for ?created_after / ?created_before on GET /api/consultations/."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("consultations:consultation-list")
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.other = Patient.objects.create(
+            full_name="John Smith", date_of_birth="1985-03-20", email="john@example.com"
+        )
+        self.now = timezone.now()
+        for patient, days_ago in [(self.patient, 1), (self.patient, 20), (self.other, 2)]:
+            consultation = Consultation.objects.create(patient=patient, symptoms="Cough")
+            Consultation.objects.filter(pk=consultation.pk).update(
+                created_at=self.now - timedelta(days=days_ago)
+            )
+
+    def test_created_after(self):
+        """Only consultations on/after the bound are returned."""
+        since = (self.now - timedelta(days=7)).isoformat()
+        response = self.client.get(self.url, {"created_after": since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_created_before_accepts_dates(self):
+        """created_before is exclusive and accepts a plain date."""
+        until = (self.now - timedelta(days=7)).date().isoformat()
+        response = self.client.get(self.url, {"created_before": until})
+        self.assertEqual(response.data["count"], 1)
+
+    def test_range_combined_with_patient(self):
+        """Range filters combine with ?patient."""
+        since = (self.now - timedelta(days=7)).isoformat()
+        response = self.client.get(self.url, {"patient": self.patient.pk, "created_after": since})
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["patient"], self.patient.pk)
+
+    def test_invalid_date_returns_400(self):
+        response = self.client.get(self.url, {"created_after": "last week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_benchmark_command_shows_index_usage(self):
+        """The benchmark prints plans using the composite index."""
+        out = StringIO()
+        call_command(
+            "benchmark_consultation_filters", seed=400, days=40, repeat=1, stdout=out
+        )
+        self.assertIn("idx_patient_created", out.getvalue())
+        self.assertIn("daily counts, 90 to 30 days ago", out.getvalue())
+
+
+# =================================================================
+# Cold-data archival
+# =================================================================
+class ConsultationArchiveTests(TestCase):
+    """Tests for archive_consultations and archived detail reads."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.old = Consultation.objects.create(
+            patient=self.patient,
+            symptoms="Chronic cough " * 50,
+            diagnosis="Bronchitis",
+        )
+        self.old.set_summary("Old summary")
+        Consultation.objects.filter(pk=self.old.pk).update(
+            created_at=timezone.now() - timedelta(days=400)
+        )
+        self.recent = Consultation.objects.create(patient=self.patient, symptoms="Fever")
+
+    def test_archives_only_old_consultations(self):
+        """Old rows move to the compressed archive; recent rows stay hot."""
+        call_command("archive_consultations", older_than_days=365, stdout=StringIO())
+
+        self.assertEqual(list(Consultation.objects.values_list("pk", flat=True)), [self.recent.pk])
+        archived = ArchivedConsultation.objects.get(consultation_id=self.old.pk)
+        self.assertLess(len(bytes(archived.payload)), len(self.old.symptoms))
+
+    def test_dry_run_moves_nothing(self):
+        out = StringIO()
+        call_command("archive_consultations", older_than_days=365, dry_run=True, stdout=out)
+        self.assertIn("1 consultations", out.getvalue())
+        self.assertEqual(ArchivedConsultation.objects.count(), 0)
+
+    def test_patient_stats_include_archived(self):
+        """Archiving does not change the patient's consultation count."""
+        call_command("archive_consultations", older_than_days=365, stdout=StringIO())
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.consultation_count, 2)
+
+    def test_detail_endpoint_reads_archive(self):
+        """GET /api/consultations/{id}/ still serves archived consultations."""
+        call_command("archive_consultations", older_than_days=365, stdout=StringIO())
+
+        url = reverse("consultations:consultation-detail", kwargs={"pk": self.old.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["symptoms"], self.old.symptoms)
+        self.assertEqual(response.data["ai_summary"], "Old summary")
+        self.assertEqual(response.data["patient_name"], "Jane Doe")
+
+        list_response = self.client.get(reverse("consultations:consultation-list"))
+        self.assertEqual(list_response.data["count"], 1)
+
+    def test_detail_endpoint_404_when_missing_everywhere(self):
+        url = reverse("consultations:consultation-detail", kwargs={"pk": 99999})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+# =================================================================
+# Sparse fieldsets & previews on consultation endpoints
+# =================================================================
+@override_settings(CONSULTATION_PREVIEW_LENGTH=10)
+class ConsultationSparseFieldsetTests(TestCase):
+    """Tests for ?fields=, ?omit= and ?preview= on list and detail."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("consultations:consultation-list")
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.consultation = Consultation.objects.create(
+            patient=self.patient,
+            symptoms="Persistent headache for three weeks",
+            diagnosis="Tension headache",
+        )
+        self.consultation.set_summary("Short")
+        self.detail_url = reverse(
+            "consultations:consultation-detail", kwargs={"pk": self.consultation.pk}
+        )
+
+    def test_fields_restricts_keys_and_columns(self):
+        """?fields= returns only those keys and defers other columns."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {"fields": "id,created_at"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data["results"][0]), {"id", "created_at"})
+        select = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn("symptoms", select)
+        self.assertNotIn("consultations_patient", select)
+
+    def test_omit_drops_fields(self):
+        response = self.client.get(self.detail_url, {"omit": "symptoms,diagnosis"})
+        self.assertNotIn("symptoms", response.data)
+        self.assertNotIn("diagnosis", response.data)
+        self.assertEqual(response.data["patient_name"], "Jane Doe")
+
+    def test_patient_name_keeps_join(self):
+        """Requesting patient_name still loads it in a single query."""
+        with self.assertNumQueries(2):  # COUNT + page
+            response = self.client.get(self.url, {"fields": "id,patient_name"})
+        self.assertEqual(response.data["results"][0]["patient_name"], "Jane Doe")
+
+    def test_preview_truncates_server_side(self):
+        """?preview=true truncates long text in SQL and leaves short text alone."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {"preview": "true"})
+        item = response.data["results"][0]
+        self.assertEqual(item["symptoms"], "Persistent…")
+        self.assertEqual(item["ai_summary"], "Short")
+        self.assertIn("SUBSTR", ctx.captured_queries[-1]["sql"].upper())
+
+    def test_preview_keeps_missing_summary_as_null(self):
+        Consultation.objects.create(patient=self.patient, symptoms="Fever")
+        response = self.client.get(self.url, {"preview": "true"})
+        self.assertIsNone(response.data["results"][1]["ai_summary"])
+
+    def test_preview_custom_length(self):
+        response = self.client.get(self.detail_url, {"preview": "16"})
+        self.assertEqual(response.data["diagnosis"], "Tension headache")
+        self.assertEqual(response.data["symptoms"], "Persistent heada…")
+
+    def test_unknown_field_returns_400(self):
+        response = self.client.get(self.url, {"fields": "id,secret"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("secret", str(response.data["fields"]))
+
+    def test_post_ignores_sparse_params(self):
+        """Creating a consultation always returns the full representation."""
+        response = self.client.post(
+            f"{self.url}?fields=id",
+            {"patient": self.patient.pk, "symptoms": "Cough"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("symptoms", response.data)
+
+
+# =================================================================
+# Versioned summaries
+# =================================================================
+class ConsultationSummaryVersionTests(TestCase):
+    """Tests for the ConsultationSummary side table and current pointer."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.consultation = Consultation.objects.create(patient=self.patient, symptoms="Cough")
+
+    def test_versions_increment_and_pointer_moves(self):
+        """Each new summary is a new version; the row points at the latest."""
+        first = self.consultation.set_summary("First", provider="ollama", model="llama3.2")
+        second = self.consultation.set_summary("Second", provider="openai", model="gpt-4o-mini")
+
+        self.assertEqual((first.version, second.version), (1, 2))
+        self.consultation.refresh_from_db()
+        self.assertEqual(self.consultation.current_summary_id, second.pk)
+        self.assertEqual(self.consultation.ai_summary, "Second")
+        self.assertEqual(
+            list(self.consultation.summaries.order_by("version").values_list("provider", flat=True)),
+            ["ollama", "openai"],
+        )
+
+    def test_endpoints_serve_current_text(self):
+        """ai_summary in list and detail comes from the current version."""
+        self.consultation.set_summary("Old")
+        self.consultation.set_summary("New")
+
+        detail = self.client.get(
+            reverse("consultations:consultation-detail", kwargs={"pk": self.consultation.pk})
+        )
+        self.assertEqual(detail.data["ai_summary"], "New")
+        with self.assertNumQueries(2):  # COUNT + page, summary joined
+            listing = self.client.get(reverse("consultations:consultation-list"))
+        self.assertEqual(listing.data["results"][0]["ai_summary"], "New")
+
+    @override_settings(AI_PROVIDER="mock")
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_task_records_provenance(self, _mock_delay):
+        generate_summary_task.apply(args=[self.consultation.pk])
+
+        summary = ConsultationSummary.objects.get(consultation=self.consultation)
+        self.assertEqual(summary.provider, "mock")
+        self.assertEqual(summary.version, 1)
+        self.assertTrue(summary.text)
+
+
+# =================================================================
+# Similar consultations (embeddings + vector index)
+# =================================================================
+@override_settings(AI_EMBEDDING_PROVIDER="hashing", AI_EMBEDDING_DIMENSIONS=64)
+class SimilarConsultationTests(TestCase):
+    """Tests for consultation embeddings and GET /consultations/{id}/similar/."""
+
+    def setUp(self):
+        similarity_index.reset()
+        self.client = APIClient()
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        texts = [
+            ("Persistent dry cough and wheezing at night", "Asthma"),
+            ("Night time wheezing with a dry cough", "Suspected asthma"),
+            ("Sprained left ankle after a fall", "Ankle sprain"),
+        ]
+        self.consultations = []
+        for symptoms, diagnosis in texts:
+            consultation = Consultation.objects.create(
+                patient=self.patient, symptoms=symptoms, diagnosis=diagnosis
+            )
+            embed_consultation_task.apply(args=[consultation.pk])
+            self.consultations.append(consultation)
+
+    def _url(self, consultation):
+        return reverse("consultations:consultation-similar", kwargs={"pk": consultation.pk})
+
+    def test_hashing_embedder_is_deterministic_and_normalised(self):
+        first, second = HashingEmbedder(64).embed(["Dry cough", "Dry cough"])
+        self.assertTrue((first == second).all())
+        self.assertAlmostEqual(float((first**2).sum()), 1.0, places=5)
+
+    @patch("consultations.embeddings.providers.get_client_and_model")
+    def test_provider_embedder_closes_its_client(self, mock_get_client):
+        """The provider client is closed whether the request succeeds or fails."""
+        client = MagicMock()
+        client.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[3.0, 4.0])])
+        mock_get_client.return_value = (client, "model")
+        embedder = ProviderEmbedder("ollama", "nomic-embed-text", 2)
+
+        vector = embedder.embed(["Dry cough"])[0]
+        self.assertAlmostEqual(float(vector[0]), 0.6, places=5)
+        client.embeddings.create.side_effect = ConnectionError("down")
+        with self.assertRaises(AIServiceError):
+            embedder.embed(["Dry cough"])
+        self.assertEqual(client.close.call_count, 2)
+
+    def test_embedding_stored_as_float32(self):
+        embedding = ConsultationEmbedding.objects.get(consultation=self.consultations[0])
+        self.assertEqual(embedding.embedder, "hashing-64")
+        self.assertEqual(len(bytes(embedding.vector)), 64 * 4)
+        self.assertEqual(vector_from_bytes(embedding.vector).shape, (64,))
+
+    def test_returns_nearest_first_without_self(self):
+        response = self.client.get(self._url(self.consultations[0]), {"k": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in response.data]
+        self.assertEqual(ids, [self.consultations[1].pk, self.consultations[2].pk])
+        self.assertGreater(response.data[0]["similarity"], response.data[1]["similarity"])
+
+    def test_index_is_built_incrementally(self):
+        """New embeddings are loaded on the next lookup, without a rebuild."""
+        url = self._url(self.consultations[0])
+        self.client.get(url, {"k": 5})
+        self.assertEqual(len(similarity_index), 3)
+
+        extra = Consultation.objects.create(
+            patient=self.patient, symptoms="Wheezing and dry cough", diagnosis="Asthma"
+        )
+        embed_consultation_task.apply(args=[extra.pk])
+        with self.assertNumQueries(3):  # new rows, empty tail, in_bulk
+            response = self.client.get(url, {"k": 5})
+        self.assertEqual(len(similarity_index), 4)
+        self.assertIn(extra.pk, [item["id"] for item in response.data])
+
+    def test_sync_loads_rows_committed_out_of_pk_order(self):
+        """A row whose pk was allocated early but committed late is still loaded."""
+        # The late row's pk sits below the rows already loaded, as when a
+        # concurrent transaction took the sequence value first and committed last.
+        ConsultationEmbedding.objects.update(id=F("id") + 100)
+        self.client.get(self._url(self.consultations[0]))
+        late = Consultation.objects.create(patient=self.patient, symptoms="Wheezing", diagnosis="Asthma")
+        ConsultationEmbedding.objects.create(
+            pk=1,
+            consultation=late,
+            embedder="hashing-64",
+            vector=vector_to_bytes(HashingEmbedder(64).embed(["Wheezing"])[0]),
+            seq=ChangeCounter.next(EMBEDDING_CHANGES),
+        )
+
+        self.assertEqual(similarity_index.sync("hashing-64"), 1)
+        self.assertIsNotNone(similarity_index.vector(late.pk))
+
+    def test_preload_loads_index(self):
+        preload_similarity_index()
+        self.assertEqual(len(similarity_index), 3)
+
+    def test_deleted_consultations_are_dropped(self):
+        url = self._url(self.consultations[0])
+        self.client.get(url)
+        self.consultations[1].delete()
+
+        response = self.client.get(url)
+        self.assertNotIn(self.consultations[1].pk, [item["id"] for item in response.data])
+        self.assertEqual(len(similarity_index), 2)
+
+    def test_missing_consultation_returns_404(self):
+        url = reverse("consultations:consultation-similar", kwargs={"pk": 99999})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(AI_EMBEDDING_PROVIDER="openai")
+    def test_unembedded_consultation_never_calls_provider(self):
+        """With a provider embedder, lookups only use stored vectors."""
+        with patch("consultations.providers.openai.OpenAI") as mock_openai_cls:
+            response = self.client.get(self._url(self.consultations[0]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        mock_openai_cls.assert_not_called()
+
+    def test_index_top_k_matches_brute_force(self):
+        index = SimilarityIndex()
+        vectors = HashingEmbedder(32).embed([f"note {i} cough fever" for i in range(50)])
+        index.add(range(50), vectors)
+        index.remove([10])
+
+        matches = index.search(vectors[3], 5, exclude={3})
+        expected = sorted(
+            (i for i in range(50) if i not in (3, 10)),
+            key=lambda i: -float(vectors[i] @ vectors[3]),
+        )[:5]
+        self.assertEqual(
+            [round(score, 5) for _, score in matches],
+            [round(float(vectors[i] @ vectors[3]), 5) for i in expected],
+        )
+        self.assertNotIn(10, [i for i, _ in matches])
+
+
+# =================================================================
+# Simulated provider & load generator
+# =================================================================
+@override_settings(AI_PROVIDER="mock")
+@patch("consultations.providers.mock.time.sleep")
+class SimulatedProviderTests(TestCase):
+    """Tests for the AI_MOCK_* latency / fault simulation."""
+
+    def test_plain_mock_stays_instant(self, mock_sleep):
+        result = summarize_consultation("Cough", "Flu")
+        self.assertEqual((result.provider, result.model, result.fallback), ("mock", "", False))
+        mock_sleep.assert_not_called()
+
+    @override_settings(AI_MOCK_LATENCY=0.5, AI_MOCK_SECONDS_PER_PROMPT_TOKEN=0.01)
+    def test_latency_is_token_proportional(self, mock_sleep):
+        result = summarize_consultation("Cough " * 100, "Flu")
+
+        self.assertEqual(result.model, "simulated")
+        self.assertFalse(result.fallback)
+        (delay,), _ = mock_sleep.call_args
+        self.assertGreater(delay, 0.5 + 100 * 0.01)
+
+    @override_settings(AI_MOCK_RATE_LIMIT_RATE=1.0)
+    def test_rate_limit_errors_take_the_provider_error_path(self, _mock_sleep):
+        """Injected 429s fall back for summaries and fail roll-ups."""
+        with self.assertLogs("consultations.services", "WARNING") as logs:
+            result = summarize_consultation("Cough", "Flu")
+        self.assertTrue(result.fallback)
+        self.assertIn("rate limit", logs.output[0])
+        with self.assertRaises(AIServiceError), self.assertLogs("consultations.services"):
+            fold_patient_summary(None, [("2026-01-01", "Cough")])
+
+    @override_settings(AI_MOCK_TIMEOUT_RATE=1.0, AI_REQUEST_TIMEOUT=7.0)
+    def test_timeouts_wait_for_the_client_timeout(self, mock_sleep):
+        from openai import APITimeoutError
+
+        client = SimulatedClient()
+        with self.assertRaises(APITimeoutError):
+            client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+        mock_sleep.assert_called_once_with(7.0)
+
+    def test_latency_distributions(self, _mock_sleep):
+        rng = random.Random(0)
+        uniform = LatencyModel(latency=1.0, distribution="uniform", jitter=0.25)
+        samples = [uniform.base_latency(rng) for _ in range(200)]
+        self.assertTrue(all(0.75 <= sample <= 1.25 for sample in samples))
+
+        lognormal = LatencyModel(latency=1.0, distribution="lognormal", jitter=0.5)
+        samples = sorted(lognormal.base_latency(rng) for _ in range(1001))
+        self.assertAlmostEqual(samples[500], 1.0, delta=0.1)  # median
+        self.assertGreater(samples[-1], 2.0)  # long tail
+
+    @override_settings(AI_MOCK_LATENCY=0.1)
+    def test_loadtest_reports_each_configuration(self, _mock_sleep):
+        out = StringIO()
+        with self.assertLogs("consultations.services", "WARNING"):
+            call_command(
+                "loadtest_summaries",
+                count=10,
+                concurrency=2,
+                config=["instant:AI_MOCK_LATENCY=0", "faulty:AI_MOCK_RATE_LIMIT_RATE=1"],
+                stdout=out,
+            )
+        lines = out.getvalue().splitlines()
+        instant = next(line for line in lines if line.startswith("instant")).split()
+        faulty = next(line for line in lines if line.startswith("faulty")).split()
+        self.assertEqual(instant[1:5], ["10", "10", "0", "0"])  # n ok fallback error
+        self.assertEqual(faulty[1:5], ["10", "0", "10", "0"])
+
+    def test_loadtest_rejects_unknown_settings(self, _mock_sleep):
+        with self.assertRaises(CommandError):
+            call_command("loadtest_summaries", count=1, config=["x:NOT_A_SETTING=1"], stdout=StringIO())
+
+    def test_stand_in_server_honours_response_format(self, _mock_sleep):
+        """serve_simulated_llm answers structured requests with JSON, like SimulatedClient."""
+        handler = type(
+            "Handler", (SimulatedLLMHandler,), {"latency_model": LatencyModel(), "hang_seconds": 0, "retry_after": 1}
+        )
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        def complete(**extra):
+            body = {"model": "m", "messages": [{"role": "user", "content": "Cough"}], **extra}
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{server.server_port}/v1/chat/completions",
+                data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read())["choices"][0]["message"]["content"]
+
+        text, data = parse_summary(complete(response_format=SUMMARY_RESPONSE_FORMAT))
+        self.assertEqual(data["chief_complaints"], ["simulated complaint"])
+        self.assertEqual(text, render_summary(data))
+        self.assertIsNone(parse_summary(complete())[1])
+
+
+# =================================================================
+# Transactional outbox
+# =================================================================
+@patch("celery.app.task.Task.apply_async")
+class OutboxTests(TestCase):
+    """Tests for outbox writes on the request path and batched dispatch."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.consultation = Consultation.objects.create(patient=self.patient, symptoms="Cough")
+
+    def test_generate_summary_writes_outbox_not_broker(self, mock_apply_async):
+        url = reverse(
+            "consultations:consultation-generate-summary", kwargs={"pk": self.consultation.pk}
+        )
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_apply_async.assert_not_called()
+        row = OutboxTask.objects.get()
+        self.assertEqual((row.task, row.args), (generate_summary_task.name, [self.consultation.pk]))
+
+    def test_consultation_create_enqueues_embedding(self, mock_apply_async):
+        response = self.client.post(
+            reverse("consultations:consultation-list"),
+            {"patient": self.patient.pk, "symptoms": "Fever"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(OutboxTask.objects.values_list("task", "args")),
+            [(embed_consultation_task.name, [response.data["id"]])],
+        )
+        mock_apply_async.assert_not_called()
+
+    def test_rolled_back_changes_enqueue_nothing(self, _mock_apply_async):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enqueue(generate_summary_task, self.consultation.pk)
+            raise RuntimeError
+        self.assertFalse(OutboxTask.objects.exists())
+
+    def test_dispatch_publishes_batch_over_one_producer(self, _mock_apply_async):
+        for _ in range(3):
+            enqueue(generate_summary_task, self.consultation.pk)
+        first_pk = OutboxTask.objects.first().pk
+
+        with patch("consultations.outbox.current_app") as mock_app:
+            producer = mock_app.producer_or_acquire.return_value.__enter__.return_value
+            self.assertEqual(dispatch_pending(batch_size=2), 2)
+
+        mock_app.producer_or_acquire.assert_called_once()
+        calls = mock_app.send_task.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(c.kwargs["producer"] is producer for c in calls))
+        self.assertEqual(calls[0].kwargs["task_id"], f"outbox-{first_pk}")
+        self.assertEqual(OutboxTask.objects.count(), 1)
+
+    def test_publish_failure_keeps_unsent_rows(self, _mock_apply_async):
+        for _ in range(3):
+            enqueue(generate_summary_task, self.consultation.pk)
+
+        with patch("consultations.outbox.current_app") as mock_app, self.assertLogs(
+            "consultations.outbox", "ERROR"
+        ):
+            mock_app.send_task.side_effect = [None, ConnectionError("broker down")]
+            self.assertEqual(dispatch_pending(), 1)
+        self.assertEqual(OutboxTask.objects.count(), 2)
+
+    def test_dispatch_command_drains_once(self, _mock_apply_async):
+        for _ in range(5):
+            enqueue(generate_summary_task, self.consultation.pk)
+        out = StringIO()
+        with patch("consultations.outbox.current_app"):
+            call_command("dispatch_outbox", once=True, batch_size=2, stdout=out)
+        self.assertIn("Published 5", out.getvalue())
+        self.assertFalse(OutboxTask.objects.exists())
+
+
+# =================================================================
+# Lazy provider registry
+# =================================================================
+class ProviderRegistryTests(TestCase):
+    """Tests for consultations.providers."""
+
+    def test_web_process_does_not_import_openai(self):
+        """Loading the URLconf (views, tasks, services) leaves the SDK unloaded."""
+        code = (
+            "import sys, django; django.setup(); import core.urls; "
+            "sys.exit('openai' in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "core.settings"},
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    @override_settings(OPENAI_API_KEY="test-key", OPENAI_MODEL="gpt-test")
+    def test_unknown_provider_uses_openai(self):
+        with patch("consultations.providers.openai.OpenAI") as mock_openai_cls:
+            client, model = providers.get_client_and_model("does-not-exist")
+        self.assertIs(client, mock_openai_cls.return_value)
+        self.assertEqual(model, "gpt-test")
+
+    def test_register_custom_provider(self):
+        providers.register("custom", "consultations.providers.mock")
+        self.addCleanup(providers._REGISTRY.pop, "custom")
+        client, model = providers.get_client_and_model("custom")
+        self.assertIsInstance(client, SimulatedClient)
+        self.assertIn("custom", providers.available())
+
+
+# =================================================================
+# Request profiling — core.profiling
+# =================================================================
+class ProfilingMiddlewareTests(TestCase):
+    """Tests for ProfilingMiddleware and the /admin/profiles/ views."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=tmp.name, PROFILING_SAMPLE_RATE=0.0)
+        override.enable()
+        self.addCleanup(override.disable)
+        Patient.objects.create(full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com")
+        self.url = reverse("consultations:patient-list")
+
+    def test_unprofiled_request_writes_nothing(self):
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_signed_header_writes_pstats_and_metadata(self):
+        response = self.client.get(self.url, headers={"X-Profile": profiling.make_token("cprofile")})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response["X-Profile-Id"]
+        pstats.Stats(str(self.dir / f"{profile_id}.pstats"))
+
+        [metadata] = profiling.list_profiles()
+        self.assertEqual(metadata["id"], profile_id)
+        self.assertEqual(metadata["route"], "/api/patients/")
+        self.assertEqual(metadata["status"], 200)
+        self.assertGreater(metadata["query_count"], 0)
+
+    def test_sampling_mode_writes_speedscope(self):
+        response = self.client.get(self.url, headers={"X-Profile": profiling.make_token("sampling")})
+        data = json.loads((self.dir / f"{response['X-Profile-Id']}.speedscope.json").read_text())
+        self.assertEqual(data["profiles"][0]["type"], "sampled")
+
+    def test_forged_header_is_ignored(self):
+        with self.assertLogs("core.profiling", level="WARNING"):
+            response = self.client.get(self.url, headers={"X-Profile": "cprofile:forged:signature"})
+        self.assertNotIn("X-Profile-Id", response)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_ignores_header(self):
+        response = self.client.get(self.url, headers={"X-Profile": profiling.make_token()})
+        self.assertNotIn("X-Profile-Id", response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MODE="cprofile", PROFILING_MAX_FILES=2)
+    def test_sampled_requests_keep_newest_profiles(self):
+        ids = [self.client.get(self.url)["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual(len(list(self.dir.iterdir())), 4)
+        self.assertNotIn(min(ids), {p["id"] for p in profiling.list_profiles()})
+
+    def test_admin_views_are_staff_only(self):
+        profile_id = self.client.get(self.url, headers={"X-Profile": profiling.make_token()})["X-Profile-Id"]
+        list_url = reverse("profile-list")
+        download_url = reverse("profile-download", kwargs={"profile_id": profile_id})
+        self.assertEqual(self.client.get(list_url).status_code, status.HTTP_302_FOUND)
+        self.assertEqual(self.client.get(download_url).status_code, status.HTTP_302_FOUND)
+
+        staff = User.objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_login(staff)
+        listing = self.client.get(list_url).json()
+        self.assertEqual(listing["profiles"][0]["id"], profile_id)
+        self.assertIn("X-Profile", listing["headers"]["sampling"])
+
+        response = self.client.get(download_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(f'filename="{profile_id}.pstats"', response["Content-Disposition"])
+        missing = reverse("profile-download", kwargs={"profile_id": "20000101T000000-00000000"})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+
+# =================================================================
+# Summary timings — generate_summary_task stages + stats endpoint
+# =================================================================
+class SummaryTimingTests(TestCase):
+    """Tests for SummaryTiming records and GET /api/summary-timings/stats/."""
+
+    def setUp(self):
+        self.client = APIClient()
+        patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.consultation = Consultation.objects.create(
+            patient=patient, symptoms="Cough and fever", diagnosis="Influenza"
+        )
+        self.url = reverse("consultations:summary-timing-stats")
+
+    def _timing(self, minutes_ago, provider_ms, provider="openai", model="gpt-test", outcome="ok"):
+        return SummaryTiming.objects.create(
+            consultation_id=self.consultation.pk,
+            provider=provider,
+            model=model,
+            outcome=outcome,
+            provider_ms=provider_ms,
+            total_ms=provider_ms + 10,
+            prompt_tokens=100,
+            completion_tokens=50,
+            created_at=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    @override_settings(AI_PROVIDER="mock", AI_MOCK_LATENCY=0.5)
+    @patch("consultations.providers.mock.time.sleep")
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_task_records_stages_and_usage(self, _mock_delay, _mock_sleep):
+        generate_summary_task.apply(args=[self.consultation.pk], kwargs={"enqueued_at": time.time() - 2})
+
+        timing = SummaryTiming.objects.get()
+        self.assertEqual((timing.provider, timing.model, timing.outcome), ("mock", "simulated", "ok"))
+        self.assertEqual(timing.consultation_id, self.consultation.pk)
+        self.assertGreaterEqual(timing.queue_ms, 2000)
+        for stage in ("fetch_ms", "provider_ms", "save_ms", "total_ms"):
+            self.assertIsNotNone(getattr(timing, stage), stage)
+        self.assertGreater(timing.prompt_tokens, 0)
+        self.assertGreater(timing.completion_tokens, 0)
+
+    @override_settings(AI_PROVIDER="openai", OPENAI_API_KEY="")
+    @patch("consultations.tasks.update_patient_summary_task.delay")
+    def test_fallback_is_recorded_without_tokens(self, _mock_delay):
+        with self.assertLogs("consultations.services", level="WARNING"):
+            generate_summary_task.apply(args=[self.consultation.pk])
+
+        timing = SummaryTiming.objects.get()
+        self.assertEqual((timing.provider, timing.outcome), ("mock", "fallback"))
+        self.assertIsNone(timing.queue_ms)
+        self.assertIsNone(timing.prompt_tokens)
+
+    def test_generate_summary_enqueues_with_timestamp(self):
+        self.client.post(
+            reverse("consultations:consultation-generate-summary", kwargs={"pk": self.consultation.pk})
+        )
+        self.assertAlmostEqual(OutboxTask.objects.get().kwargs["enqueued_at"], time.time(), delta=60)
+
+    def test_stats_percentiles_per_provider_and_model(self):
+        for provider_ms in (100, 200, 300, 400):
+            self._timing(5, provider_ms)
+        self._timing(5, 50, provider="ollama", model="llama3", outcome="error")
+        self._timing(60 * 25, 9999)  # outside the default 24h window
+
+        results = self.client.get(self.url).data["results"]
+
+        self.assertEqual(
+            [(r["provider"], r["model"], r["count"], r["errors"]) for r in results],
+            [("ollama", "llama3", 1, 1), ("openai", "gpt-test", 4, 0)],
+        )
+        openai = results[1]
+        self.assertEqual(openai["ms"]["provider"], {"p50": 200, "p95": 400})
+        self.assertEqual(openai["ms"]["queue"], {"p50": None, "p95": None})
+        self.assertEqual((openai["prompt_tokens"], openai["completion_tokens"]), (400, 200))
+
+    def test_stats_buckets(self):
+        self._timing(30, 100)
+        self._timing(90, 300)
+        self._timing(100, 500)
+
+        response = self.client.get(self.url, {"window": "PT3H", "bucket": "3600"})
+
+        self.assertEqual(response.data["bucket_seconds"], 3600)
+        self.assertEqual(
+            [(r["count"], r["ms"]["provider"]["p50"]) for r in response.data["results"]],
+            [(2, 300), (1, 100)],
+        )
+
+    def test_stats_are_aggregated_in_the_database(self):
+        """Totals (and on Postgres percentiles) come from one grouped query; rows at *now* fall in the last bucket."""
+        now = timezone.now()
+        for minutes_ago, outcome in ((0, "fallback"), (30, "ok"), (150, "ok")):
+            timing = self._timing(0, 100, outcome=outcome)
+            SummaryTiming.objects.filter(pk=timing.pk).update(created_at=now - timedelta(minutes=minutes_ago))
+        SummaryTiming.objects.filter(created_at=now).update(prompt_tokens=None, completion_tokens=None)
+
+        with self.assertNumQueries(1 if connection.vendor == "postgresql" else 2):
+            results = timing_stats(timedelta(hours=3), timedelta(hours=1), now=now)
+
+        self.assertEqual(
+            [(r["bucket_start"], r["count"], r["fallbacks"], r["prompt_tokens"]) for r in results],
+            [(now - timedelta(hours=3), 1, 0, 100), (now - timedelta(hours=1), 2, 1, 100)],
+        )
+        self.assertEqual(results[1]["ms"]["provider"], {"p50": 100, "p95": 100})
+
+    def test_stats_rejects_invalid_durations(self):
+        for params in ({"window": "soon"}, {"bucket": "0"}, {"window": "P1D", "bucket": "1"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_prune_command_keeps_recent_timings(self):
+        self._timing(5, 100)
+        self._timing(60 * 24 * 40, 100)
+        call_command("prune_summary_timings", stdout=StringIO())
+        self.assertEqual(SummaryTiming.objects.count(), 1)
+
+
+# =================================================================
+# Django admin changelists — consultations.admin_utils
+# =================================================================
+@override_settings(
+    STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+)
+class AdminChangelistTests(TestCase):
+    """Tests for the consultation / patient admin changelists."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+        self.url = reverse("admin:consultations_consultation_changelist")
+        self.patients = [
+            Patient.objects.create(
+                full_name=name, date_of_birth="1990-05-15", email=f"{name.split()[0].lower()}@example.com"
+            )
+            for name in ("Alice Smith", "Bob Jones", "Carol Smith")
+        ]
+        self.consultations = Consultation.objects.bulk_create(
+            Consultation(patient=self.patients[i % 3], symptoms=f"Cough {i} " + "x" * 100, diagnosis="Flu")
+            for i in range(12)
+        )
+
+    def test_patient_column_does_not_query_per_row(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        Consultation.objects.bulk_create(
+            Consultation(patient=patient, symptoms="Fever", diagnosis="Flu") for patient in self.patients * 5
+        )
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(few), len(many))
+        self.assertContains(response, "Cough 11 " + "x" * 71 + "…")
+
+    @patch("django.contrib.admin.ModelAdmin.list_per_page", 5)
+    def test_keyset_link_continues_after_last_row(self):
+        response = self.client.get(self.url)
+        ids = [c.pk for c in response.context["cl"].result_list]
+        self.assertEqual(ids, sorted((c.pk for c in self.consultations), reverse=True)[:5])
+        keyset_url = response.context["cl"].keyset_url
+        self.assertEqual(keyset_url, f"?id__lt={ids[-1]}")
+
+        response = self.client.get(self.url + keyset_url)
+        self.assertEqual(response.context["cl"].result_list[0].pk, ids[-1] - 1)
+        self.assertContains(response, "Older entries")
+
+    def test_search_matches_name_prefix_and_id_only(self):
+        search = lambda q: {c.pk for c in self.client.get(self.url, {"q": q}).context["cl"].result_list}
+        self.assertEqual(len(search("bo")), 4)
+        self.assertEqual(len(search("smith")), 0)
+        self.assertEqual(search(str(self.consultations[0].pk)), {self.consultations[0].pk})
+        self.assertEqual(search("Cough"), set())
+
+    def test_date_hierarchy_lists_periods_from_bounds(self):
+        old = self.consultations[0]
+        Consultation.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=800))
+        queryset = self.client.get(self.url).context["cl"].queryset
+        with self.assertNumQueries(1):
+            years = queryset.datetimes("created_at", "year")
+        first_year = timezone.localtime(timezone.now() - timedelta(days=800)).year
+        self.assertEqual([year.year for year in years], list(range(first_year, timezone.localtime().year + 1)))
+
+        response = self.client.get(self.url, {"created_at__year": str(years[0].year)})
+        self.assertEqual([c.pk for c in response.context["cl"].result_list], [old.pk])
+
+    def test_patient_changelist_and_autocomplete(self):
+        response = self.client.get(reverse("admin:consultations_patient_changelist"), {"q": "carol@"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.patients[2]])
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {"app_label": "consultations", "model_name": "consultation", "field_name": "patient", "term": "bob"},
+        )
+        self.assertEqual([r["text"] for r in response.json()["results"]], ["Bob Jones"])
+
+
+# =================================================================
+# Changes feed — GET /api/consultations/changes/?since=<cursor>
+# =================================================================
+class ConsultationChangesTests(TestCase):
+    """Tests for Consultation.change_seq and the delta-sync feed."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("consultations:consultation-changes")
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", date_of_birth="1990-05-15", email="jane@example.com"
+        )
+        self.first = Consultation.objects.create(patient=self.patient, symptoms="Cough", diagnosis="Cold")
+        self.second = Consultation.objects.create(patient=self.patient, symptoms="Fever", diagnosis="Flu")
+
+    def _sync(self, since=None, **params):
+        if since is not None:
+            params["since"] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_writes_take_increasing_change_seq(self):
+        self.assertLess(self.first.change_seq, self.second.change_seq)
+        bulk = Consultation.objects.bulk_create(
+            Consultation(patient=self.patient, symptoms=f"Rash {i}") for i in range(3)
+        )
+        self.assertEqual(
+            [c.change_seq for c in bulk], list(range(self.second.change_seq + 1, self.second.change_seq + 4))
+        )
+        self.first.set_summary("Summary")
+        self.first.refresh_from_db()
+        self.assertGreater(self.first.change_seq, bulk[-1].change_seq)
+
+    def test_full_sync_then_only_new_changes(self):
+        data = self._sync()
+        self.assertEqual([c["id"] for c in data["results"]], [self.first.pk, self.second.pk])
+        self.assertFalse(data["has_more"])
+
+        self.assertEqual(self._sync(data["next"])["results"], [])
+
+        self.first.set_summary("Newly completed")
+        third = Consultation.objects.create(patient=self.patient, symptoms="Headache")
+        changes = self._sync(data["next"])["results"]
+        self.assertEqual([c["id"] for c in changes], [self.first.pk, third.pk])
+        self.assertEqual(changes[0]["ai_summary"], "Newly completed")
+
+    def test_pages_with_limit(self):
+        page = self._sync(limit=1)
+        self.assertEqual([c["id"] for c in page["results"]], [self.first.pk])
+        self.assertTrue(page["has_more"])
+        page = self._sync(page["next"], limit=1)
+        self.assertEqual([c["id"] for c in page["results"]], [self.second.pk])
+        self.assertFalse(page["has_more"])
+
+    def test_feed_query_count_is_constant(self):
+        Consultation.objects.bulk_create(
+            Consultation(patient=self.patient, symptoms=f"Rash {i}") for i in range(10)
+        )
+        with self.assertNumQueries(1):
+            self._sync()
+
+    def test_rejects_tampered_cursor(self):
+        cursor = self._sync()["next"]
+        response = self.client.get(self.url, {"since": cursor[:-2] + "xx"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# =================================================================
+# Analytics rollups — GET /api/analytics/dashboard/
+# =================================================================
+class AnalyticsRollupTests(TestCase):
+    """Tests for rollups.refresh_rollups() and the dashboard endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("consultations:analytics-dashboard")
+        today = timezone.localdate()
+        self.child = Patient.objects.create(
+            full_name="Kid", date_of_birth=today.replace(year=today.year - 10), email="kid@example.com"
+        )
+        self.adult = Patient.objects.create(
+            full_name="Adult", date_of_birth=today.replace(year=today.year - 50), email="adult@example.com"
+        )
+
+    def _consult(self, patient, diagnosis, days_ago=0):
+        consultation = Consultation.objects.create(patient=patient, symptoms="Cough", diagnosis=diagnosis)
+        if days_ago:
+            Consultation.objects.filter(pk=consultation.pk).update(
+                created_at=timezone.now() - timedelta(days=days_ago)
+            )
+        return consultation
+
+    def test_refresh_folds_only_new_consultations(self):
+        self._consult(self.child, "Asthma")
+        self._consult(self.adult, "  asthma ")
+        self._consult(self.adult, "Influenza", days_ago=1)
+        self.assertEqual(rollups.refresh_rollups(), 3)
+        self.assertEqual(rollups.refresh_rollups(), 0)
+
+        self._consult(self.adult, "Asthma")
+        self.assertEqual(rollups.refresh_rollups(batch_size=1), 1)
+
+        today = timezone.localdate()
+        self.assertEqual(
+            set(DailyConsultationCount.objects.values_list("day", "cohort", "count")),
+            {(today, "0-17", 1), (today, "40-64", 2), (today - timedelta(days=1), "40-64", 1)},
+        )
+        self.assertEqual(
+            list(DiagnosisCount.objects.values_list("diagnosis", "count")),
+            [("asthma", 3), ("influenza", 1)],
+        )
+
+    def test_rebuild_recomputes_from_scratch(self):
+        self._consult(self.adult, "Asthma")
+        rollups.refresh_rollups()
+        DiagnosisCount.objects.update(count=99)
+        call_command("refresh_consultation_rollups", "--rebuild", stdout=StringIO())
+        self.assertEqual(DiagnosisCount.objects.get().count, 1)
+
+    def test_task_is_scheduled_by_beat(self):
+        self.assertIn(
+            "consultations.tasks.refresh_rollups_task",
+            [entry["task"] for entry in settings.CELERY_BEAT_SCHEDULE.values()],
+        )
+
+    def test_dashboard_reads_rollups_only(self):
+        for _ in range(3):
+            self._consult(self.adult, "Asthma")
+        self._consult(self.child, "Otitis", days_ago=2)
+        rollups.refresh_rollups()
+        self._consult(self.adult, "Not yet folded")
+
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url, {"days": 3, "top": 1}).data
+
+        self.assertEqual([day["total"] for day in data["daily"]], [1, 0, 3])
+        self.assertEqual(data["daily"][0]["by_cohort"], {"0-17": 1})
+        self.assertEqual(data["top_diagnoses"], [{"diagnosis": "asthma", "count": 3}])
+
+    def test_dashboard_rejects_non_integer_params(self):
+        response = self.client.get(self.url, {"days": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# =================================================================
+# Batch summaries — consultations/batch.py
+# =================================================================
+class BatchSummaryTests(TestCase):
+    """Tests for the batch summary pipeline against the simulated batch API."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.batch_dir = Path(tmp.name)
+        override = override_settings(AI_PROVIDER="mock", AI_BATCH_DIR=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.patient = Patient.objects.create(
+            full_name="Batch Patient", date_of_birth="1980-01-01", email="batch@example.com"
+        )
+        self.pending = [
+            Consultation.objects.create(patient=self.patient, symptoms=f"Cough for {day} days", diagnosis="Cold")
+            for day in range(3)
+        ]
+        self.summarised = Consultation.objects.create(patient=self.patient, symptoms="Fever", diagnosis="Flu")
+        self.summarised.set_summary("Existing summary.")
+        Consultation.objects.create(patient=self.patient, symptoms="   ")
+
+    def test_submit_poll_and_apply(self):
+        submitted = batch.submit_batch()
+        self.assertEqual(submitted.consultation_ids, [c.pk for c in self.pending])
+        lines = [json.loads(line) for line in Path(submitted.input_file).read_text().splitlines()]
+        self.assertEqual(lines[0]["custom_id"], f"consultation-{self.pending[0].pk}")
+        self.assertEqual(lines[0]["url"], "/v1/chat/completions")
+        self.assertEqual(lines[0]["body"]["messages"][0]["role"], "system")
+
+        # Consultations in a submitted batch are not submitted again.
+        self.assertIsNone(batch.submit_batch())
+
+        seqs = dict(Consultation.objects.values_list("pk", "change_seq"))
+        finished = batch.poll_batches()
+        self.assertEqual(len(finished), 1)
+        submitted.refresh_from_db()
+        self.assertEqual(submitted.status, SummaryBatch.STATUS_COMPLETED)
+        self.assertEqual((submitted.applied_count, submitted.failed_count), (3, 0))
+
+        for consultation in self.pending:
+            consultation.refresh_from_db()
+            self.assertTrue(consultation.ai_summary)
+            self.assertEqual(consultation.current_summary.version, 1)
+            self.assertEqual(consultation.current_summary.provider, "mock")
+            self.assertGreater(consultation.change_seq, seqs[consultation.pk])
+        self.summarised.refresh_from_db()
+        self.assertEqual(self.summarised.ai_summary, "Existing summary.")
+        self.assertEqual(
+            list(OutboxTask.objects.values_list("task", "args")),
+            [(update_patient_summary_task.name, [self.patient.pk])],
+        )
+        self.assertTrue(Path(submitted.input_file).with_suffix(".output.jsonl").exists())
+        self.assertEqual(batch.poll_batches(), [])
+
+    def test_failed_requests_stay_pending(self):
+        with patch("consultations.providers.mock.LatencyModel.from_settings", return_value=LatencyModel(timeout_rate=1.0)):
+            submitted = batch.submit_batch(limit=2)
+            batch.poll_batches()
+        submitted.refresh_from_db()
+        self.assertEqual((submitted.applied_count, submitted.failed_count), (0, 2))
+        self.assertFalse(ConsultationSummary.objects.filter(consultation__in=self.pending).exists())
+
+        # The failed consultations are submitted again.
+        self.assertEqual(batch.submit_batch().consultation_ids, [c.pk for c in self.pending])
+
+    @override_settings(AI_BATCH_MAX_ATTEMPTS=2)
+    def test_repeatedly_failing_requests_leave_the_batch_path(self):
+        """After AI_BATCH_MAX_ATTEMPTS failed batches a consultation goes to generate_summary_task."""
+        failing = self.pending[:2]
+        with patch("consultations.providers.mock.LatencyModel.from_settings", return_value=LatencyModel(timeout_rate=1.0)):
+            for _ in range(2):
+                self.assertEqual(batch.submit_batch(limit=2).consultation_ids, [c.pk for c in failing])
+                batch.poll_batches()
+
+        self.assertEqual(
+            sorted(SummaryBatchFailure.objects.values_list("consultation_id", "attempts")),
+            [(c.pk, 2) for c in failing],
+        )
+        self.assertEqual(
+            list(OutboxTask.objects.filter(task=generate_summary_task.name).values_list("args", flat=True)),
+            [[c.pk] for c in failing],
+        )
+        # New work is no longer queued behind them.
+        self.assertEqual(batch.submit_batch().consultation_ids, [self.pending[2].pk])
+
+    def test_results_for_summarised_consultations_are_skipped(self):
+        submitted = batch.submit_batch()
+        self.pending[0].set_summary("Regenerated meanwhile.")
+        batch.poll_batches()
+        submitted.refresh_from_db()
+        self.assertEqual(submitted.applied_count, 2)
+        self.pending[0].refresh_from_db()
+        self.assertEqual(self.pending[0].ai_summary, "Regenerated meanwhile.")
+
+    def test_parse_results_counts_unusable_lines(self):
+        ok = {"custom_id": "consultation-7", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "Summary"}}]}}}
+        error = {"custom_id": "consultation-8", "response": {"status_code": 500, "body": {}}}
+        text = "\n".join([json.dumps(ok), json.dumps(error), "not json"])
+        with self.assertLogs("consultations.batch", "WARNING"):
+            self.assertEqual(batch.parse_results(text), ({7: "Summary"}, 2))
+
+    @override_settings(AI_PROVIDER="ollama")
+    def test_ollama_has_no_batch_api(self):
+        with self.assertRaises(CommandError):
+            call_command("batch_summaries", stdout=StringIO())
+
+    def test_command_waits_for_batches(self):
+        out = StringIO()
+        call_command("batch_summaries", "--wait", "--interval", "0", stdout=out)
+        self.assertIn("3 summaries applied", out.getvalue())
+        self.assertFalse(SummaryBatch.objects.filter(status=SummaryBatch.STATUS_SUBMITTED).exists())
+
+
+# =================================================================
+# Packed summaries — several short notes per completion
+# =================================================================
+@override_settings(AI_PROVIDER="openai", OPENAI_API_KEY="test-key", AI_PACK_MAX_ITEMS=3)
+class PackedSummaryTests(TestCase):
+    """Tests for summarize_consultations() and its prompt packing."""
+
+    def _answer(self, drop=()):
+        """A fake completion answering every packed section except *drop*."""
+
+        def create(model, messages, **kwargs):
+            prompt = messages[-1]["content"]
+            tags = re.findall(r"^=== CONSULTATION (\S+) ===$", prompt, re.MULTILINE)
+            if tags:
+                content = "\n".join(f"=== CONSULTATION {tag} ===\nSummary {tag}" for tag in tags if tag not in drop)
+            else:
+                content = "Single summary"
+            choice = MagicMock()
+            choice.message.content = content
+            return MagicMock(choices=[choice], usage=MagicMock(prompt_tokens=300, completion_tokens=90))
+
+        return create
+
+    @patch("consultations.providers.openai.OpenAI")
+    def test_short_notes_share_completions(self, mock_openai_cls):
+        create = mock_openai_cls.return_value.chat.completions.create
+        create.side_effect = self._answer()
+        items = [(pk, f"Cough {pk}", "Cold") for pk in range(1, 6)]
+
+        results = summarize_consultations(items)
+
+        self.assertEqual(create.call_count, 2)  # packs of 3 and 2
+        self.assertEqual({key: result.text for key, result in results.items()}, {pk: f"Summary {pk}" for pk in range(1, 6)})
+        self.assertEqual((results[1].provider, results[1].prompt_tokens, results[1].completion_tokens), ("openai", 100, 30))
+        self.assertEqual(create.call_args_list[0].kwargs["max_tokens"], 3 * settings.AI_PACK_ITEM_MAX_TOKENS)
+
+    @patch("consultations.providers.openai.OpenAI")
+    def test_every_client_is_closed(self, mock_openai_cls):
+        """Planning packs builds no client; each completion's client is closed."""
+        create = mock_openai_cls.return_value.chat.completions.create
+        create.side_effect = self._answer()
+
+        summarize_consultations([(pk, f"Cough {pk}", "Cold") for pk in range(1, 6)])
+
+        self.assertEqual(mock_openai_cls.call_count, create.call_count)
+        self.assertEqual(mock_openai_cls.return_value.close.call_count, create.call_count)
+
+    @patch("consultations.providers.openai.OpenAI")
+    def test_malformed_and_long_items_summarised_alone(self, mock_openai_cls):
+        create = mock_openai_cls.return_value.chat.completions.create
+        create.side_effect = self._answer(drop={"2"})
+        long_note = "word " * (settings.AI_PACK_SHORT_NOTE_TOKENS * 4)
+        items = [(1, "Cough", "Cold"), (2, "Fever", "Flu"), (3, long_note, "Unclear"), (4, "Rash", "Eczema")]
+
+        results = summarize_consultations(items)
+
+        self.assertEqual(create.call_count, 3)  # one pack of 1, 2 and 4, then 2 and 3 alone
+        self.assertEqual(results[1].text, "Summary 1")
+        self.assertEqual(results[2].text, "Single summary")
+        self.assertEqual(results[3].text, "Single summary")
+        self.assertEqual(results[4].text, "Summary 4")
+
+    @patch("consultations.providers.openai.OpenAI")
+    def test_failed_pack_falls_back_per_item(self, mock_openai_cls):
+        mock_openai_cls.return_value.chat.completions.create.side_effect = RuntimeError("boom")
+        with self.assertLogs("consultations.services", "ERROR"):
+            results = summarize_consultations([(1, "Cough", "Cold"), (2, "Fever", "Flu")])
+        self.assertTrue(all(result.fallback for result in results.values()))
+
+    def test_pack_size_follows_context_window(self):
+        items = [(pk, "Cough " * 40, "Cold") for pk in range(10)]
+        small = plan_packs(items, {"context_tokens": 1024})
+        large = plan_packs(items, {"context_tokens": 100000})
+        self.assertGreater(len(small), len(large))
+        self.assertTrue(all(len(pack) <= 3 for pack in large))
+        self.assertEqual([item for pack in small for item in pack], items)
+
+    def test_parse_drops_duplicate_and_unknown_sections(self):
+        text = (
+            "=== CONSULTATION 1 ===\nFirst\n"
+            "=== CONSULTATION 2 ===\nSecond\n=== CONSULTATION 2 ===\nAgain\n"
+            "=== CONSULTATION 9 ===\nUnknown\n=== CONSULTATION 3 ===\n"
+        )
+        self.assertEqual(parse_packed_summaries(text, [1, 2, 3]), {1: "First"})
+
+    @override_settings(AI_PROVIDER="mock")
+    def test_pack_summaries_command(self):
+        patient = Patient.objects.create(full_name="Pack Patient", date_of_birth="1990-01-01", email="pack@example.com")
+        for day in range(4):
+            Consultation.objects.create(patient=patient, symptoms=f"Cough for {day} days", diagnosis="Cold")
+        out = StringIO()
+        call_command("pack_summaries", "--chunk-size", "3", stdout=out)
+        self.assertIn("Summarised 4 consultations", out.getvalue())
+        self.assertFalse(Consultation.objects.filter(current_summary__isnull=True).exists())
+
+
+# =================================================================
+# Worker warm-up and Ollama keep-alive — consultations/warmup.py
+# =================================================================
+@override_settings(
+    AI_PROVIDER="ollama",
+    OLLAMA_BASE_URL="http://ollama:11434/v1",
+    OLLAMA_MODEL="tiny",
+    OLLAMA_KEEP_ALIVE="10m",
+)
+class WorkerWarmupTests(TestCase):
+    """Tests for the warm-up run at worker start and the keep-alive pings."""
+
+    @patch("consultations.warmup.urllib.request.urlopen")
+    @patch("consultations.providers.ollama.OpenAI")
+    def test_warm_up_loads_and_primes_model(self, mock_openai_cls, mock_urlopen):
+        warmup.warm_up()
+
+        request = mock_urlopen.call_args.args[0]
+        self.assertEqual(request.full_url, "http://ollama:11434/api/generate")
+        self.assertEqual(json.loads(request.data), {"model": "tiny", "keep_alive": "10m"})
+        create = mock_openai_cls.return_value.chat.completions.create
+        self.assertEqual(create.call_args.kwargs["max_tokens"], 1)
+        self.assertEqual(create.call_args.kwargs["messages"][0]["content"], SUMMARY_SYSTEM_PROMPT)
+        mock_openai_cls.return_value.close.assert_called_once()
+
+    @patch("consultations.warmup.urllib.request.urlopen", side_effect=OSError("connection refused"))
+    @patch("consultations.providers.ollama.OpenAI")
+    def test_warm_up_never_raises(self, mock_openai_cls, _mock_urlopen):
+        with self.assertLogs("consultations.warmup", "WARNING"):
+            warmup.warm_up()
+        mock_openai_cls.return_value.chat.completions.create.assert_not_called()
+
+    def test_providers_to_warm(self):
+        self.assertEqual(warmup.warmup_providers(), ["ollama"])
+        with override_settings(AI_PROVIDER="auto"):
+            self.assertEqual(warmup.warmup_providers(), ["ollama", "openai"])
+        with override_settings(AI_PROVIDER="mock"):
+            self.assertEqual(warmup.warmup_providers(), [])
+
+    @patch("consultations.warmup.keep_model_loaded")
+    def test_keep_alive_pings_only_while_tasks_are_queued(self, mock_keep_loaded):
+        keep_alive = warmup.KeepAlive(app=MagicMock(), interval=60)
+        with patch("consultations.warmup.queued_tasks", return_value=0):
+            self.assertFalse(keep_alive.tick())
+        mock_keep_loaded.assert_not_called()
+        with patch("consultations.warmup.queued_tasks", return_value=3):
+            self.assertTrue(keep_alive.tick())
+        mock_keep_loaded.assert_called_once()
+
+    @override_settings(AI_PROVIDER="auto")
+    @patch("consultations.warmup.urllib.request.urlopen")
+    @patch("consultations.providers.openai.OpenAI")
+    @patch("consultations.providers.ollama.OpenAI")
+    def test_benchmark_times_the_local_model_only(self, mock_ollama_cls, mock_openai_cls, _mock_urlopen):
+        """Under "auto" the cold / warm summaries still go to Ollama, not the router."""
+        call_command("benchmark_warmup", runs=1, stdout=StringIO())
+
+        # Cold and warm summaries, plus the warm-up's priming request.
+        self.assertEqual(mock_ollama_cls.return_value.chat.completions.create.call_count, 3)
+        mock_openai_cls.return_value.chat.completions.create.assert_not_called()
+
+
+# =================================================================
+# Structured summaries — JSON output in ConsultationSummary.data
+# =================================================================
+@override_settings(AI_STRUCTURED_SUMMARIES=True)
+class StructuredSummaryTests(TestCase):
+    """Tests for the structured-output mode and the complaint filter."""
+
+    ANSWER = {
+        "chief_complaints": ["Dry  Cough", "fever", "dry cough"],
+        "assessment": "Viral bronchitis",
+        "summary": "Cough and fever consistent with viral bronchitis.",
+    }
+
+    @override_settings(AI_PROVIDER="openai", OPENAI_API_KEY="test-key")
+    @patch("consultations.providers.openai.OpenAI")
+    def test_json_answer_is_validated_and_rendered(self, mock_openai_cls):
+        create = mock_openai_cls.return_value.chat.completions.create
+        choice = MagicMock()
+        choice.message.content = "```json\n" + json.dumps(self.ANSWER) + "\n```"
+        create.return_value = MagicMock(choices=[choice])
+
+        result = summarize_consultation("Cough, fever", "Bronchitis")
+
+        self.assertEqual(create.call_args.kwargs["response_format"]["json_schema"]["name"], "consultation_summary")
+        self.assertEqual(result.data["chief_complaints"], ["dry cough", "fever"])
+        self.assertEqual(
+            result.text,
+            "**Chief Complaints:** dry cough, fever\n\n**Assessment:** Viral bronchitis\n\n"
+            "**Summary:** Cough and fever consistent with viral bronchitis.",
+        )
+
+    def test_invalid_answers_are_kept_as_text(self):
+        self.assertEqual(parse_summary("**Assessment:** Flu"), ("**Assessment:** Flu", None))
+        with self.assertLogs("consultations.services", "WARNING"):
+            self.assertEqual(parse_summary('{"assessment": "Flu"}'), ('{"assessment": "Flu"}', None))
+
+    @override_settings(AI_PROVIDER="mock")
+    def test_task_stores_data_and_api_filters_by_complaint(self):
+        patient = Patient.objects.create(full_name="Json Patient", date_of_birth="1980-01-01", email="json@example.com")
+        cough = Consultation.objects.create(patient=patient, symptoms="Dry cough; fever", diagnosis="Bronchitis")
+        rash = Consultation.objects.create(patient=patient, symptoms="Rash", diagnosis="Eczema")
+        with patch("consultations.tasks.update_patient_summary_task.delay"):
+            generate_summary_task.apply(args=[cough.pk])
+            generate_summary_task.apply(args=[rash.pk])
+
+        cough.refresh_from_db()
+        self.assertEqual(cough.current_summary.data["chief_complaints"], ["dry cough", "fever"])
+        self.assertIn("**Chief Complaints:** dry cough, fever", cough.ai_summary)
+
+        url = reverse("consultations:consultation-list")
+        response = APIClient().get(url, {"complaint": "  Dry Cough "})
+        self.assertEqual([row["id"] for row in response.data["results"]], [cough.pk])
+        self.assertEqual(response.data["results"][0]["ai_summary_data"]["assessment"], "Bronchitis")
+        response = APIClient().get(url, {"complaint": "cough"})
+        self.assertEqual(response.data["results"], [])
+
+    @override_settings(AI_PROVIDER="openai", OPENAI_API_KEY="test-key")
+    @patch("consultations.providers.openai.OpenAI")
+    def test_packed_sections_must_be_valid_json(self, mock_openai_cls):
+        def create(model, messages, **kwargs):
+            choice = MagicMock()
+            if "=== CONSULTATION" in messages[-1]["content"]:
+                choice.message.content = (
+                    f"=== CONSULTATION 1 ===\n{json.dumps(self.ANSWER)}\n=== CONSULTATION 2 ===\nNot JSON"
+                )
+            else:
+                choice.message.content = json.dumps({**self.ANSWER, "assessment": "Single"})
+            return MagicMock(choices=[choice])
+
+        mock_openai_cls.return_value.chat.completions.create.side_effect = create
+        results = summarize_consultations([(1, "Cough", "Cold"), (2, "Fever", "Flu")])
+        self.assertEqual(results[1].data["assessment"], "Viral bronchitis")
+        self.assertEqual(results[2].data["assessment"], "Single")
+
+
+# =================================================================
+# Query budgets — exact query counts per endpoint and page size
+# =================================================================
+@override_settings(AI_PROVIDER="mock", AI_EMBEDDING_PROVIDER="hashing", AI_EMBEDDING_DIMENSIONS=64)
+class QueryBudgetTests(TestCase):
+    """
+    Every view in consultations.urls runs a fixed number of queries, however
+    many rows it returns: a new N+1 fails here.  Counts are steady-state
+    (after one request warmed per-process caches such as the similarity
+    index).  Raise a budget only together with the change that needs it.
+    """
+
+    # url name → (method, url kwargs, query strings, queries per request)
+    BUDGETS = {
+        "patient-list": ("get", {}, ["page_size=1", "page_size=10", "page_size=50", "ordering=-consultation_count"], 2),
+        "patient-autocomplete": ("get", {}, ["q=Budget&limit=1", "q=Budget&limit=10"], 1),
+        "patient-detail": ("get", {"pk": "patient"}, [""], 1),
+        "consultation-list": (
+            "get",
+            {},
+            ["page_size=1", "page_size=10", "page_size=50", "patient={patient}&page_size=50",
+             "fields=id,patient_name,ai_summary&page_size=50", "preview=true&page_size=50",
+             "complaint=cough&page_size=50"],
+            2,
+        ),
+        "consultation-changes": ("get", {}, ["limit=1", "limit=10", "limit=100"], 1),
+        "consultation-detail": ("get", {"pk": "consultation"}, ["", "fields=id,symptoms"], 1),
+        "consultation-similar": ("get", {"pk": "consultation"}, ["k=1", "k=10", "k=50"], 2),
+        "consultation-generate-summary": ("post", {"pk": "consultation"}, [""], 2),
+        "analytics-dashboard": ("get", {}, ["days=1&top=1", "days=30&top=10", "days=366&top=100"], 3),
+        # Postgres computes the percentiles in the grouped query; SQLite streams them.
+        "summary-timing-stats": (
+            "get", {}, ["window=P1D", "window=P7D&bucket=PT1H"], 1 if connection.vendor == "postgresql" else 2
+        ),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        patients = Patient.objects.bulk_create(
+            Patient(full_name=f"Budget Patient {i}", date_of_birth="1970-01-01", email=f"budget{i}@example.com")
+            for i in range(5)
+        )
+        consultations = Consultation.objects.bulk_create(
+            Consultation(patient=patients[i % 5], symptoms=f"Dry cough, day {i}", diagnosis=f"Diagnosis {i % 7}")
+            for i in range(60)
+        )
+        summaries = ConsultationSummary.objects.bulk_create(
+            ConsultationSummary(
+                consultation=consultation,
+                version=1,
+                text=f"Summary {consultation.pk}",
+                data={"chief_complaints": ["cough"], "assessment": "Cold", "summary": "Cough."},
+            )
+            for consultation in consultations
+        )
+        for consultation, summary in zip(consultations, summaries):
+            consultation.current_summary = summary
+        Consultation.objects.bulk_update(consultations, ["current_summary"])
+        embed_consultations(consultations)
+        SummaryTiming.objects.bulk_create(
+            SummaryTiming(consultation_id=consultation.pk, provider="mock", outcome="ok", total_ms=i)
+            for i, consultation in enumerate(consultations)
+        )
+        rollups.refresh_rollups()
+        cls.patient, cls.consultation = patients[0], consultations[0]
+
+    def setUp(self):
+        similarity_index.reset()
+        self.client = APIClient()
+
+    def _request(self, name, method, kwargs, query):
+        kwargs = {key: getattr(self, value).pk for key, value in kwargs.items()}
+        url = reverse(f"consultations:{name}", kwargs=kwargs)
+        query = query.format(patient=self.patient.pk)
+        response = getattr(self.client, method)(f"{url}?{query}" if query else url)
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    def test_every_endpoint_has_a_budget(self):
+        self.assertEqual({pattern.name for pattern in urls.urlpatterns}, set(self.BUDGETS))
+
+    def test_query_counts(self):
+        for name, (method, kwargs, queries, budget) in self.BUDGETS.items():
+            self._request(name, method, kwargs, queries[0])  # warm per-process caches
+            for query in queries:
+                with self.subTest(endpoint=name, query=query), self.assertNumQueries(budget):
+                    self._request(name, method, kwargs, query)
+
+    def test_create_budgets(self):
+        with self.assertNumQueries(2):
+            self.client.post(
+                reverse("consultations:patient-list"),
+                {"full_name": "New", "date_of_birth": "1990-01-01", "email": "new@example.com"},
+                format="json",
+            )
+        # Patient check, change_seq, insert, patient counters, outbox row, savepoints.
+        with self.assertNumQueries(11):
+            self.client.post(
+                reverse("consultations:consultation-list"),
+                {"patient": self.patient.pk, "symptoms": "Cough", "diagnosis": ""},
+                format="json",
+            )
+
+
+# =================================================================
+# Query plans — list and filter queries use their indexes
+# =================================================================
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the list and filter queries the views run, on a dataset large
+    and spread enough (ANALYZEd) that the planner picks an index only when
+    it helps, and assert it picks the intended one.  Trigram and JSONB
+    indexes exist on Postgres only; those checks are skipped elsewhere.
+    """
+
+    PATIENTS = 100
+    CONSULTATIONS = 5000
+    DAYS = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        patients = Patient.objects.bulk_create(
+            Patient(full_name=f"Plan Patient {i:03d}", date_of_birth="1970-01-01", email=f"plan{i}@example.com")
+            for i in range(cls.PATIENTS)
+        )
+        consultations = Consultation.objects.bulk_create(
+            Consultation(patient=patients[i % cls.PATIENTS], symptoms=f"Symptoms {i}", diagnosis=f"Diagnosis {i % 500}")
+            for i in range(cls.CONSULTATIONS)
+        )
+        # created_at is auto_now_add: spread the rows over DAYS days afterwards.
+        now = timezone.now()
+        per_day = cls.CONSULTATIONS // cls.DAYS
+        for day in range(cls.DAYS):
+            ids = [consultation.pk for consultation in consultations[day * per_day : (day + 1) * per_day]]
+            Consultation.objects.filter(pk__in=ids).update(created_at=now - timedelta(days=cls.DAYS - day))
+        summaries = ConsultationSummary.objects.bulk_create(
+            ConsultationSummary(
+                consultation=consultation,
+                version=1,
+                text="Summary",
+                data={"chief_complaints": [f"complaint {consultation.pk % 200}"], "assessment": "", "summary": ""},
+            )
+            for consultation in consultations
+        )
+        for consultation, summary in zip(consultations, summaries):
+            consultation.current_summary = summary
+        Consultation.objects.bulk_update(consultations, ["current_summary"], batch_size=500)
+        SummaryTiming.objects.bulk_create(
+            SummaryTiming(
+                consultation_id=consultation.pk,
+                provider="mock",
+                outcome="ok",
+                total_ms=1,
+                created_at=now - timedelta(minutes=30 * i),
+            )
+            for i, consultation in enumerate(consultations)
+        )
+        rollups.refresh_rollups()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.patient = patients[0]
+        cls.now = now
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, f"{index} not used:\n{plan}")
+
+    def consultations(self, **params):
+        return ConsultationFilter(params, queryset=ConsultationListCreateView.queryset.all()).qs
+
+    def test_patient_filter_uses_patient_created_index(self):
+        self.assertUsesIndex(self.consultations(patient=self.patient.pk), "idx_patient_created")
+        self.assertUsesIndex(
+            self.consultations(patient=self.patient.pk, created_after=self.now - timedelta(days=10)),
+            "idx_patient_created",
+        )
+
+    def test_created_after_uses_created_index(self):
+        plan = self.consultations(created_after=self.now - timedelta(days=2)).explain()
+        self.assertRegex(plan, r"idx_consultation_created(_brin)?\b")
+
+    def test_changes_feed_uses_change_seq_index(self):
+        since = Consultation.objects.order_by("-change_seq").values_list("change_seq", flat=True)[100]
+        plan = (
+            Consultation.objects.filter(change_seq__gt=since)
+            .select_related("patient", "current_summary")
+            .order_by("change_seq")[:101]
+            .explain()
+        )
+        # The unique constraint's index: named after the column on Postgres,
+        # an unnamed autoindex searched on the column on SQLite.
+        self.assertRegex(plan, r"(?i)index scan using \S*change_seq\S*|using index \S+ \(change_seq>\?\)")
+
+    def test_top_diagnoses_use_diagnosis_count_index(self):
+        self.assertUsesIndex(
+            DiagnosisCount.objects.order_by("-count", "diagnosis").values("diagnosis", "count")[:10],
+            "idx_diagnosis_count",
+        )
+
+    def test_timing_window_uses_timing_created_index(self):
+        self.assertUsesIndex(
+            SummaryTiming.objects.filter(created_at__gt=self.now - timedelta(days=1), created_at__lte=self.now)
+            .order_by(),
+            "idx_summary_timing_created",
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "trigram indexes are Postgres only")
+    def test_autocomplete_uses_trigram_indexes(self):
+        plan = PatientAutocompleteView()._search("PATIENT 042").explain()
+        self.assertIn("idx_patient_name_trgm", plan)
+        self.assertIn("idx_patient_email_trgm", plan)
+
+    @skipUnless(connection.vendor == "postgresql", "the JSONB GIN index is Postgres only")
+    def test_complaint_filter_uses_gin_index(self):
+        self.assertUsesIndex(self.consultations(complaint="complaint 7"), "idx_summary_data_gin")
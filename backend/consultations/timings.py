@@ -0,0 +1,207 @@
+"""
+Per-stage timings of summary generation.
+
+``generate_summary_task`` times its stages with a ``StageTimer`` and stores
+one SummaryTiming row per run: queue wait, DB fetch, provider call, save,
+total, and the prompt / completion tokens reported by the provider.
+
+``timing_stats()`` aggregates the rows of a time window into p50 / p95 per
+provider and model, optionally split into fixed-size buckets; it backs
+``GET /api/summary-timings/stats/``.  Everything is computed by the
+database on Postgres (PERCENTILE_DISC for the percentiles).  SQLite has no
+percentile aggregate: there the stage columns are streamed, one (bucket,
+provider, model) group at a time, and the percentiles computed in Python.
+"""
+
+import logging
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from django.db import DatabaseError, connection
+from django.db.models import Aggregate, Count, Func, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from .models import SummaryTiming
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("queue_ms", "fetch_ms", "provider_ms", "save_ms", "total_ms")
+
+
+class StageTimer:
+    """Wall-clock milliseconds per named stage, plus the total since creation."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.stages: dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = _ms(time.perf_counter() - started)
+
+    @property
+    def total_ms(self) -> int:
+        return _ms(time.perf_counter() - self._started)
+
+
+def _ms(seconds: float) -> int:
+    return max(0, round(seconds * 1000))
+
+
+def queue_wait_ms(enqueued_at: float | None) -> int | None:
+    """Milliseconds since *enqueued_at* (a ``time.time()`` value)."""
+    return _ms(time.time() - enqueued_at) if enqueued_at is not None else None
+
+
+def record_summary_timing(
+    consultation_id: int,
+    timer: StageTimer,
+    *,
+    provider: str,
+    outcome: str,
+    model: str = "",
+    attempt: int = 0,
+    queue_ms: int | None = None,
+    prompt_tokens: int | None = None,
+    completion_tokens: int | None = None,
+) -> SummaryTiming | None:
+    """
+    Store the timings of one run.  Failing to record is logged, never
+    raised, so it cannot fail or retry the summary itself.
+    """
+    try:
+        return SummaryTiming.objects.create(
+            consultation_id=consultation_id,
+            provider=provider,
+            model=model,
+            outcome=outcome,
+            attempt=attempt,
+            queue_ms=queue_ms,
+            total_ms=timer.total_ms,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            **timer.stages,
+        )
+    except DatabaseError:
+        logger.exception("Could not record summary timing for consultation %s.", consultation_id)
+        return None
+
+
+# ── Aggregation ──────────────────────────────────────────────────────
+def percentile(sorted_values: list, pct: float):
+    """Nearest-rank percentile of an ascending list (None when empty)."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(1, math.ceil(pct / 100 * len(sorted_values))) - 1]
+
+
+class BucketIndex(Func):
+    """Index of the *bucket*-sized slot after *since* that a datetime falls in."""
+
+    output_field = IntegerField()
+
+    def __init__(self, expression, since: datetime, bucket: timedelta):
+        super().__init__(expression, Value(since), Value(bucket.total_seconds()))
+
+    def _compile(self, compiler, connection, template):
+        sql, params = [], []
+        for expression in self.get_source_expressions():
+            expression_sql, expression_params = compiler.compile(expression)
+            sql.append(expression_sql)
+            params.extend(expression_params)
+        return template.format(*sql), params
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return self._compile(
+            compiler, connection, "CAST(FLOOR(EXTRACT(EPOCH FROM ({0} - {1})) / {2}) AS INTEGER)"
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self._compile(
+            compiler, connection, "CAST((JULIANDAY({0}) - JULIANDAY({1})) * 86400.0 / {2} AS INTEGER)"
+        )
+
+
+class PercentileDisc(Aggregate):
+    """Nearest-rank percentile (*fraction* 0..1) of a column; Postgres only."""
+
+    function = "PERCENTILE_DISC"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = IntegerField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def timing_stats(window: timedelta, bucket: timedelta | None = None, now: datetime | None = None) -> list[dict]:
+    """
+    Aggregate the SummaryTiming rows of the last *window*.
+
+    Returns one entry per (bucket, provider, model) — a single bucket
+    spanning the whole window when *bucket* is None — with run and outcome
+    counts, the token totals and, under ``"ms"``, p50 / p95 of every stage,
+    oldest bucket first.
+    """
+    now = now or timezone.now()
+    since = now - window
+    bucket = bucket or window
+    rows = (
+        SummaryTiming.objects.filter(created_at__gt=since, created_at__lte=now)
+        .order_by()
+        # Rows at exactly *now* belong to the last bucket, not one past it.
+        .annotate(bucket=Least(BucketIndex("created_at", since, bucket), Value(math.ceil(window / bucket) - 1)))
+    )
+
+    in_database = connection.vendor == "postgresql"
+    percentiles = (
+        {f"{name}_p{pct}": PercentileDisc(name, pct / 100) for name in STAGES for pct in (50, 95)}
+        if in_database
+        else {}
+    )
+    totals = rows.values("bucket", "provider", "model").annotate(
+        count=Count("pk"),
+        fallbacks=Count("pk", filter=Q(outcome=SummaryTiming.OUTCOME_FALLBACK)),
+        errors=Count("pk", filter=Q(outcome=SummaryTiming.OUTCOME_ERROR)),
+        prompt_tokens=Coalesce(Sum("prompt_tokens"), 0),
+        completion_tokens=Coalesce(Sum("completion_tokens"), 0),
+        **percentiles,
+    )
+    entries = {
+        (row["bucket"], row["provider"], row["model"]): {
+            "bucket_start": since + row["bucket"] * bucket,
+            "provider": row["provider"],
+            "model": row["model"],
+            "count": row["count"],
+            "fallbacks": row["fallbacks"],
+            "errors": row["errors"],
+            "prompt_tokens": row["prompt_tokens"],
+            "completion_tokens": row["completion_tokens"],
+            "ms": {
+                name.removesuffix("_ms"): {"p50": row[f"{name}_p50"], "p95": row[f"{name}_p95"]}
+                for name in STAGES
+            }
+            if in_database
+            else {},
+        }
+        for row in totals
+    }
+    if in_database:
+        return [entries[key] for key in sorted(entries)]
+
+    # Ordered by time within each provider and model, so every group is
+    # contiguous and only one is held in memory.
+    stages = rows.order_by("provider", "model", "created_at").values_list("provider", "model", "bucket", *STAGES)
+    for (provider, model, index), group in groupby(stages.iterator(chunk_size=2000), key=lambda row: row[:3]):
+        entry = entries[(index, provider, model)]
+        for name, column in zip(STAGES, zip(*(row[3:] for row in group))):
+            values = sorted(value for value in column if value is not None)
+            entry["ms"][name.removesuffix("_ms")] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+    return [entries[key] for key in sorted(entries)]
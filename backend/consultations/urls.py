@@ -6,19 +6,45 @@ app_name = "consultations"
 
 urlpatterns = [
     path("patients/", views.PatientListCreateView.as_view(), name="patient-list"),
+    path(
+        "patients/autocomplete/",
+        views.PatientAutocompleteView.as_view(),
+        name="patient-autocomplete",
+    ),
+    path("patients/<int:pk>/", views.PatientRetrieveView.as_view(), name="patient-detail"),
     path(
         "consultations/",
         views.ConsultationListCreateView.as_view(),
         name="consultation-list",
     ),
+    path(
+        "consultations/changes/",
+        views.ConsultationChangesView.as_view(),
+        name="consultation-changes",
+    ),
     path(
         "consultations/<int:pk>/",
         views.ConsultationRetrieveView.as_view(),
         name="consultation-detail",
     ),
+    path(
+        "consultations/<int:pk>/similar/",
+        views.SimilarConsultationsView.as_view(),
+        name="consultation-similar",
+    ),
     path(
         "consultations/<int:pk>/generate-summary/",
         views.GenerateSummaryView.as_view(),
         name="consultation-generate-summary",
     ),
+    path(
+        "analytics/dashboard/",
+        views.AnalyticsDashboardView.as_view(),
+        name="analytics-dashboard",
+    ),
+    path(
+        "summary-timings/stats/",
+        views.SummaryTimingStatsView.as_view(),
+        name="summary-timing-stats",
+    ),
 ]
@@ -1,10 +1,28 @@
-from rest_framework import generics, status
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core import signing
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Greatest, Substr, Upper
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_duration
+from rest_framework import generics, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .archive import get_archived_consultation
+from .embeddings import consultation_text, get_embedder, similarity_index
+from .filters import ConsultationFilter, PatientFilter
 from .models import Consultation, Patient
-from .serializers import ConsultationSerializer, PatientSerializer
-from .tasks import generate_summary_task
+from .outbox import enqueue
+from .rollups import dashboard
+from .serializers import ConsultationSerializer, PatientDetailSerializer, PatientSerializer
+from .tasks import embed_consultation_task, generate_summary_task
+from .timings import timing_stats
 
 ################################################################
 # For Implementing meaningful error handling (400, 404, etc.)
@@ -14,41 +32,293 @@ from .tasks import generate_summary_task
 class PatientListCreateView(generics.ListCreateAPIView):
     """
     GET  /api/patients/  → list all patients
+                           (?ordering=-last_consultation_at, ?min_consultations=N, ...)
     POST /api/patients/  → create a new patient
     """
 
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
+    filterset_class = PatientFilter
+
+
+class PatientRetrieveView(generics.RetrieveAPIView):
+    """
+    GET /api/patients/{id}/  → patient details, including the longitudinal
+                               summary across all of their consultations
+    """
 
+    queryset = Patient.objects.all()
+    serializer_class = PatientDetailSerializer
 
-from .filters import ConsultationFilter
 
-class ConsultationListCreateView(generics.ListCreateAPIView):
+class PatientAutocompleteView(APIView):
+    """
+    GET /api/patients/autocomplete/?q=<text>[&limit=N]
+
+    Typeahead for the patient picker.  Returns a compact, unpaginated list
+    of ``{id, full_name, email}`` matching *q* by name/email prefix and, on
+    Postgres, by trigram similarity (served by the pg_trgm GIN indexes).
+    SQLite falls back to prefix matching only.
+    """
+
+    MIN_QUERY_LENGTH = 2
+    TRIGRAM_MIN_QUERY_LENGTH = 3
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", settings.PATIENT_AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = settings.PATIENT_AUTOCOMPLETE_LIMIT
+        limit = max(1, min(limit, settings.PATIENT_AUTOCOMPLETE_LIMIT))
+
+        results = []
+        if len(query) >= self.MIN_QUERY_LENGTH:
+            rows = self._search(query).values("id", "full_name", "email")[:limit]
+            results = list(rows)
+
+        response = Response(results)
+        patch_cache_control(
+            response, private=True, max_age=settings.PATIENT_AUTOCOMPLETE_CACHE_SECONDS
+        )
+        return response
+
+    def _search(self, query):
+        prefix = Q(full_name__istartswith=query) | Q(email__istartswith=query)
+
+        if connection.vendor != "postgresql" or len(query) < self.TRIGRAM_MIN_QUERY_LENGTH:
+            return Patient.objects.filter(prefix).order_by("full_name")
+
+        needle = query.upper()
+        return (
+            Patient.objects.alias(name_upper=Upper("full_name"), email_upper=Upper("email"))
+            .filter(
+                prefix
+                | Q(name_upper__trigram_similar=needle)
+                | Q(email_upper__trigram_similar=needle)
+            )
+            .annotate(
+                rank=Greatest(
+                    TrigramSimilarity(Upper("full_name"), needle),
+                    TrigramSimilarity(Upper("email"), needle),
+                )
+            )
+            .order_by("-rank", "full_name")
+        )
+
+
+class SparseFieldsetMixin:
+    """
+    Adds ``?fields=a,b``, ``?omit=c`` and ``?preview=true|<chars>`` to GET.
+
+    The selection is pushed down to the queryset: unrequested columns are
+    left out with ``.only()`` (dropping the patient join when no patient
+    field is requested), and in preview mode the serializer's
+    ``preview_fields`` are fetched as a DB-side SUBSTR instead of in full.
+    """
+
+    def get_sparse_fieldset(self):
+        if hasattr(self, "_sparse_fieldset"):
+            return self._sparse_fieldset
+
+        params = self.request.query_params
+        available = set(self.get_serializer_class()().fields)
+
+        def parse(name):
+            if name not in params:
+                return None
+            values = [v.strip() for v in params[name].split(",") if v.strip()]
+            unknown = set(values) - available
+            if unknown:
+                raise serializers.ValidationError(
+                    {name: f"Unknown field(s): {', '.join(sorted(unknown))}."}
+                )
+            return values
+
+        preview = params.get("preview")
+        if preview is None or preview.lower() in ("", "false", "0"):
+            preview = None
+        elif preview.lower() == "true":
+            preview = settings.CONSULTATION_PREVIEW_LENGTH
+        elif preview.isdigit():
+            preview = min(int(preview), settings.CONSULTATION_PREVIEW_MAX_LENGTH)
+        else:
+            raise serializers.ValidationError({"preview": "Expected 'true' or a length."})
+
+        self._sparse_fieldset = {"fields": parse("fields"), "omit": parse("omit"), "preview": preview}
+        return self._sparse_fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == "GET":
+            kwargs.update(self.get_sparse_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != "GET":
+            return queryset
+
+        sparse = self.get_sparse_fieldset()
+        if sparse["fields"] is None and sparse["omit"] is None and not sparse["preview"]:
+            return queryset
+
+        serializer = self.get_serializer()
+        columns, previews = {queryset.model._meta.pk.name}, {}
+        for name, field in serializer.fields.items():
+            lookup = field.source.replace(".", "__")
+            if sparse["preview"] and name in serializer.preview_fields:
+                previews[f"{name}_preview"] = Substr(lookup, 1, sparse["preview"] + 1)
+            else:
+                columns.add(lookup)
+
+        related = {lookup.split("__")[0] for lookup in columns if "__" in lookup}
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns, *related).annotate(**previews)
+
+
+class ConsultationListCreateView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     GET  /api/consultations/  → list all consultations
+                                (?fields=, ?omit=, ?preview=true|<chars>)
     POST /api/consultations/  → create a new consultation
     """
 
-    queryset = Consultation.objects.select_related("patient").all()
+    queryset = Consultation.objects.select_related("patient", "current_summary").all()
     serializer_class = ConsultationSerializer
     filterset_class = ConsultationFilter
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            consultation = serializer.save()
+            enqueue(embed_consultation_task, consultation.pk)
 
-class ConsultationRetrieveView(generics.RetrieveAPIView):
+
+class ConsultationRetrieveView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     GET /api/consultations/{id}/  → get details of a single consultation
+                                    (falls back to the cold archive;
+                                    ?fields=, ?omit=, ?preview= supported)
     """
 
-    queryset = Consultation.objects.select_related("patient").all()
+    queryset = Consultation.objects.select_related("patient", "current_summary").all()
     serializer_class = ConsultationSerializer
 
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            consultation = get_archived_consultation(self.kwargs["pk"])
+            if consultation is None:
+                raise
+            return consultation
+
+
+class ConsultationChangesView(APIView):
+    """
+    GET /api/consultations/changes/[?since=<cursor>][&limit=N]
+
+    Delta sync: consultations created or updated (including a new current
+    summary) after *since*, in change order, plus the cursor to send next
+    time.  Omit *since* to start from the beginning.  ``has_more`` means
+    another page is available right away; otherwise poll later with
+    ``next``.  Deletions and archiving are not reported.
+    """
+
+    CURSOR_SALT = "consultations.changes"
+
+    def get(self, request):
+        since = 0
+        if "since" in request.query_params:
+            try:
+                since = int(signing.loads(request.query_params["since"], salt=self.CURSOR_SALT))
+            except (signing.BadSignature, TypeError, ValueError):
+                return Response({"since": ["Invalid cursor."]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get("limit", settings.CONSULTATION_CHANGES_PAGE_SIZE))
+        except ValueError:
+            return Response({"limit": ["Must be an integer."]}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.CONSULTATION_CHANGES_MAX_PAGE_SIZE))
+
+        changes = list(
+            Consultation.objects.filter(change_seq__gt=since)
+            .select_related("patient", "current_summary")
+            .order_by("change_seq")[: limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            since = changes[-1].change_seq
+
+        return Response(
+            {
+                "results": ConsultationSerializer(changes, many=True).data,
+                "next": signing.dumps(since, salt=self.CURSOR_SALT),
+                "has_more": has_more,
+            }
+        )
+
+
+class SimilarConsultationsView(APIView):
+    """
+    GET /api/consultations/{id}/similar/[?k=N]
+
+    The *k* consultations whose text is most similar to this one, best
+    first, each with a ``similarity`` score (cosine, -1..1).  Served from
+    the in-process vector index using the consultation's stored embedding,
+    so no AI provider is called.  Text fields are returned as previews.
+    """
+
+    def get(self, request, pk):
+        try:
+            k = int(request.query_params.get("k", settings.SIMILAR_CONSULTATIONS_LIMIT))
+        except ValueError:
+            return Response({"k": ["Must be an integer."]}, status=status.HTTP_400_BAD_REQUEST)
+        k = max(1, min(k, settings.SIMILAR_CONSULTATIONS_MAX_LIMIT))
+
+        embedder = get_embedder()
+        similarity_index.sync(embedder.name)
+        vector = similarity_index.vector(pk)
+        if vector is None:
+            consultation = Consultation.objects.filter(pk=pk).only("symptoms", "diagnosis").first()
+            if consultation is None:
+                return Response(
+                    {"detail": "Consultation not found."},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            if not embedder.local:
+                return Response(
+                    {"detail": "Consultation has not been embedded yet."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            vector = embedder.embed([consultation_text(consultation)])[0]
+
+        matches = similarity_index.search(vector, k, exclude={pk})
+        consultations = Consultation.objects.select_related("patient", "current_summary").in_bulk(
+            [consultation_id for consultation_id, _ in matches]
+        )
+        # Deleted or archived since they were indexed.
+        similarity_index.remove(
+            consultation_id for consultation_id, _ in matches if consultation_id not in consultations
+        )
+
+        results = []
+        for consultation_id, score in matches:
+            if consultation_id in consultations:
+                data = ConsultationSerializer(
+                    consultations[consultation_id], preview=settings.CONSULTATION_PREVIEW_LENGTH
+                ).data
+                results.append({**data, "similarity": round(score, 4)})
+        return Response(results)
+
 
 class GenerateSummaryView(APIView):
     """
     POST /api/consultations/{id}/generate-summary/
 
     Retrieves a consultation's symptoms and diagnosis, sends them
-    to OpenAI, stores the structured summary in ai_summary, and
+    to OpenAI, stores the structured summary as a new summary version, and
     returns the updated consultation object.
     """
 
@@ -69,10 +339,75 @@ class GenerateSummaryView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # 3. Trigger background task
-        generate_summary_task.delay(consultation.id)
+        # 3. Trigger background task (published by the outbox dispatcher)
+        enqueue(generate_summary_task, consultation.id, enqueued_at=time.time())
 
         return Response(
             {"detail": "Summary generation started in background."},
             status=status.HTTP_202_ACCEPTED,
         )
+
+
+class SummaryTimingStatsView(APIView):
+    """
+    GET /api/summary-timings/stats/[?window=P1D][&bucket=PT1H]
+
+    p50 / p95 of the queue wait, fetch, provider, save and total durations
+    (ms) of summary generation per provider and model, plus run, fallback,
+    error and token counts.  *window* (default 24 hours) and *bucket*
+    (default: one bucket for the whole window) are ISO 8601 durations or
+    seconds.
+    """
+
+    def get(self, request):
+        durations = {}
+        for name, default in (("window", timedelta(days=1)), ("bucket", None)):
+            raw = request.query_params.get(name)
+            value = parse_duration(raw) if raw else default
+            if raw and (value is None or value <= timedelta(0)):
+                return Response(
+                    {name: ["Must be a positive ISO 8601 duration or number of seconds."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            durations[name] = value
+
+        window, bucket = durations["window"], durations["bucket"]
+        if window > timedelta(days=settings.SUMMARY_TIMING_RETENTION_DAYS):
+            window = timedelta(days=settings.SUMMARY_TIMING_RETENTION_DAYS)
+        if bucket and window / bucket > settings.SUMMARY_TIMING_MAX_BUCKETS:
+            return Response(
+                {"bucket": [f"At most {settings.SUMMARY_TIMING_MAX_BUCKETS} buckets per window."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "window_seconds": window.total_seconds(),
+                "bucket_seconds": (bucket or window).total_seconds(),
+                "results": timing_stats(window, bucket),
+            }
+        )
+
+
+class AnalyticsDashboardView(APIView):
+    """
+    GET /api/analytics/dashboard/[?days=N][&top=N]
+
+    Consultations per day (total and per patient age cohort) for the last
+    *days* days and the *top* most frequent diagnoses.  Served from the
+    rollup tables (see rollups.py), so the cost does not grow with the
+    consultations table; figures lag by up to ROLLUP_INTERVAL seconds.
+    """
+
+    def get(self, request):
+        params = {}
+        for name, default, maximum in (
+            ("days", settings.ANALYTICS_DASHBOARD_DAYS, settings.ANALYTICS_DASHBOARD_MAX_DAYS),
+            ("top", settings.ANALYTICS_TOP_DIAGNOSES, settings.ANALYTICS_MAX_TOP_DIAGNOSES),
+        ):
+            try:
+                value = int(request.query_params.get(name, default))
+            except ValueError:
+                return Response({name: ["Must be an integer."]}, status=status.HTTP_400_BAD_REQUEST)
+            params[name] = max(1, min(value, maximum))
+        return Response(dashboard(**params))
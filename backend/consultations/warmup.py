@@ -0,0 +1,152 @@
+"""
+Worker warm-up and Ollama keep-alive.
+
+The first summary after a worker starts pays for importing the provider SDK
+and building its client and, on Ollama, for loading the model (often many
+seconds).  Ollama also unloads a model after OLLAMA_KEEP_ALIVE without
+requests.  The Celery signal handlers in core/celery.py use:
+  - ``warm_up()`` in every worker process: loads the provider modules and
+    builds their clients, then loads the Ollama model and sends a one-token
+    priming request with the summary system prompt, so the model is resident
+    and the prompt prefix is cached before the first task,
+  - ``KeepAlive`` in the worker's main process: while the task queue has
+    messages, pings Ollama every AI_KEEP_ALIVE_INTERVAL seconds so the model
+    is not unloaded between tasks.
+
+Clients stay per call — the router closes them to cancel hedged requests —
+so every task still opens its own connection.  What the warm-up saves is
+the SDK import and, on Ollama, the model load and the prompt-prefix
+processing; the clients it builds are closed again.
+
+``manage.py benchmark_warmup`` reports cold vs warm first-summary latency.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+
+from . import providers
+from .routing import CLOUD_PROVIDER, LOCAL_PROVIDER
+from .services import summary_request
+from .simulation import simulation_enabled
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_providers() -> list[str]:
+    """Providers the configured AI_PROVIDER may call."""
+    provider = settings.AI_PROVIDER.lower()
+    if provider == "auto":
+        return [LOCAL_PROVIDER, CLOUD_PROVIDER]
+    if provider == "mock" and not simulation_enabled():
+        return []
+    return [provider]
+
+
+def warm_up(prime_in_background: bool = False) -> None:
+    """
+    Build the clients of every provider in use and prime Ollama.
+
+    With *prime_in_background* the model load and priming request run in a
+    daemon thread, so a worker process does not outlive Celery's start-up
+    timeout waiting for them.  Failures are logged, never raised: a worker
+    must start even when a provider is down.
+    """
+    for name in warmup_providers():
+        started = time.perf_counter()
+        try:
+            client, model = providers.get_client_and_model(name)
+        except Exception as exc:
+            logger.warning("Warm-up: could not build the %s client: %s", name, exc)
+            continue
+        logger.info("Warm-up: %s client ready in %.0f ms.", name, (time.perf_counter() - started) * 1000)
+
+        if name != LOCAL_PROVIDER:
+            client.close()
+        elif prime_in_background:
+            threading.Thread(target=_prime, args=(client, model), name="ollama-warmup", daemon=True).start()
+        else:
+            _prime(client, model)
+
+
+def _prime(client, model: str) -> None:
+    started = time.perf_counter()
+    try:
+        keep_model_loaded()
+        client.chat.completions.create(**{**summary_request("", "", model), "max_tokens": 1})
+    except Exception as exc:
+        logger.warning("Warm-up: priming %s failed: %s", model, exc)
+    else:
+        logger.info("Warm-up: %s loaded and primed in %.0f ms.", model, (time.perf_counter() - started) * 1000)
+    finally:
+        client.close()
+
+
+# ── Ollama model residency ───────────────────────────────────────────
+def _ollama_request(keep_alive) -> None:
+    # The native API, not the OpenAI-compatible one: only it takes
+    # keep_alive, and a request without a prompt just loads (or unloads)
+    # the model.
+    base_url = settings.OLLAMA_BASE_URL.rstrip("/").removesuffix("/v1")
+    request = urllib.request.Request(
+        f"{base_url}/api/generate",
+        data=json.dumps({"model": settings.OLLAMA_MODEL, "keep_alive": keep_alive}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=settings.AI_REQUEST_TIMEOUT) as response:
+        response.read()
+
+
+def keep_model_loaded() -> None:
+    """Load OLLAMA_MODEL if needed and keep it for another OLLAMA_KEEP_ALIVE."""
+    _ollama_request(settings.OLLAMA_KEEP_ALIVE)
+
+
+def unload_model() -> None:
+    _ollama_request(0)
+
+
+def queued_tasks(app, queue: str | None = None) -> int:
+    """Messages waiting in *queue* (default: the app's default queue)."""
+    with app.connection_for_read() as connection:
+        try:
+            declared = connection.default_channel.queue_declare(
+                queue=queue or app.conf.task_default_queue, passive=True
+            )
+        except connection.channel_errors:
+            # Not declared yet — or, on Redis, empty (its list is deleted).
+            return 0
+    return declared.message_count
+
+
+class KeepAlive(threading.Thread):
+    """Pings Ollama every *interval* seconds while *app*'s queue is not empty."""
+
+    def __init__(self, app, interval: float | None = None):
+        super().__init__(name="ollama-keep-alive", daemon=True)
+        self.app = app
+        self.interval = interval or settings.AI_KEEP_ALIVE_INTERVAL
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.tick()
+
+    def tick(self) -> bool:
+        """Ping if tasks are queued; returns whether it pinged."""
+        try:
+            if queued_tasks(self.app) == 0:
+                return False
+            keep_model_loaded()
+        except Exception as exc:
+            logger.warning("Ollama keep-alive failed: %s", exc)
+            return False
+        return True
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init, worker_ready, worker_shutdown
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
@@ -17,6 +18,41 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+# Warm-up: build provider clients and load the Ollama model in every worker
+# process, and keep the model resident while tasks are queued (see
+# consultations/warmup.py).  Imports are deferred until Django is set up.
+_keep_alive = None
+
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    from django.conf import settings
+
+    if settings.AI_WARMUP_ENABLED:
+        from consultations.warmup import warm_up
+
+        warm_up(prime_in_background=True)
+
+
+@worker_ready.connect
+def start_keep_alive(sender=None, **kwargs):
+    global _keep_alive
+    from django.conf import settings
+
+    from consultations.routing import LOCAL_PROVIDER
+    from consultations.warmup import KeepAlive, warmup_providers
+
+    if settings.AI_WARMUP_ENABLED and LOCAL_PROVIDER in warmup_providers():
+        _keep_alive = KeepAlive(app)
+        _keep_alive.start()
+
+
+@worker_shutdown.connect
+def stop_keep_alive(**kwargs):
+    if _keep_alive is not None:
+        _keep_alive.stop()
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f"Request: {self.request!r}")
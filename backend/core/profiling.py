@@ -0,0 +1,291 @@
+"""
+On-demand request profiling.
+
+With PROFILING_ENABLED, ``ProfilingMiddleware`` profiles a request when
+  - it carries a valid ``X-Profile`` header — a value signed with the
+    project SECRET_KEY (copy one from the admin profile list), naming the
+    profiler to use — or
+  - it is picked by PROFILING_SAMPLE_RATE.
+
+Two profilers are available:
+  "cprofile" — deterministic, saved as a ``.pstats`` file
+               (``python -m pstats`` / snakeviz),
+  "sampling" — a stack sampler thread with low overhead, saved as a
+               ``.speedscope.json`` file (https://www.speedscope.app).
+
+Each profile is written to PROFILING_DIR next to a JSON sidecar holding the
+route, method, status, duration and SQL query count, and the response gets
+an ``X-Profile-Id`` header.  Only the newest PROFILING_MAX_FILES profiles
+are kept.  Staff users can list and download them under
+``/admin/profiles/``.
+"""
+
+import cProfile
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core import signing
+from django.db import connection
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+MODES = ("cprofile", "sampling")
+_SIGNING_SALT = "core.profiling"
+_PROFILE_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+
+# ── Signed header ───────────────────────────────────────────────────
+def make_token(mode: str = "cprofile") -> str:
+    """Return an ``X-Profile`` header value enabling *mode* profiling."""
+    return signing.TimestampSigner(salt=_SIGNING_SALT).sign(mode)
+
+
+def _mode_from_token(token: str) -> str | None:
+    try:
+        mode = signing.TimestampSigner(salt=_SIGNING_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        logger.warning("Ignoring %s header with an invalid or expired signature.", HEADER)
+        return None
+    return mode if mode in MODES else None
+
+
+# ── Profilers ───────────────────────────────────────────────────────
+class SamplingProfiler:
+    """
+    Samples the profiled thread's Python stack every *interval* seconds
+    from a background thread (effectively bounded by the interpreter's
+    switch interval, ~5 ms by default).
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: list[tuple[tuple, float]] = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples.append((tuple(reversed(stack)), now - last))
+            last = now
+
+    def speedscope(self, name: str) -> dict:
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, weight in self.samples:
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(weight * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "health-consultant",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+# ── Middleware ───────────────────────────────────────────────────────
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = self._requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        if mode == "sampling":
+            profiler = SamplingProfiler(settings.PROFILING_SAMPLING_INTERVAL)
+            profiler.start()
+            try:
+                with connection.execute_wrapper(counter):
+                    response = self.get_response(request)
+            finally:
+                profiler.stop()
+        else:
+            profiler = cProfile.Profile()
+            with connection.execute_wrapper(counter):
+                response = profiler.runcall(self.get_response, request)
+        duration = time.perf_counter() - started
+
+        try:
+            profile_id = save_profile(request, response, mode, profiler, duration, counter.count)
+        except OSError:
+            logger.exception("Could not save request profile.")
+        else:
+            response["X-Profile-Id"] = profile_id
+        return response
+
+    @staticmethod
+    def _requested_mode(request) -> str | None:
+        if not settings.PROFILING_ENABLED:
+            return None
+        token = request.headers.get(HEADER)
+        if token:
+            return _mode_from_token(token)
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return settings.PROFILING_MODE
+        return None
+
+
+# ── Storage ──────────────────────────────────────────────────────────
+def _profile_dir() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def save_profile(request, response, mode, profiler, duration: float, query_count: int) -> str:
+    """Write the profile and its metadata sidecar; return the profile id."""
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    now = datetime.now(timezone.utc)
+    profile_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    match = getattr(request, "resolver_match", None)
+    route = f"/{match.route}" if match and match.route else request.path
+
+    if mode == "sampling":
+        filename = f"{profile_id}.speedscope.json"
+        (directory / filename).write_text(
+            json.dumps(profiler.speedscope(f"{request.method} {route}"))
+        )
+    else:
+        filename = f"{profile_id}.pstats"
+        profiler.dump_stats(directory / filename)
+
+    metadata = {
+        "id": profile_id,
+        "created_at": now.isoformat(),
+        "mode": mode,
+        "file": filename,
+        "method": request.method,
+        "route": route,
+        "path": request.path,
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "query_count": query_count,
+    }
+    (directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+    _prune(directory)
+    logger.info("Saved %s profile %s for %s %s.", mode, profile_id, request.method, route)
+    return profile_id
+
+
+def _prune(directory: Path) -> None:
+    sidecars = sorted(directory.glob("*.json"), reverse=True)
+    sidecars = [path for path in sidecars if _PROFILE_ID_RE.match(path.stem)]
+    for sidecar in sidecars[settings.PROFILING_MAX_FILES :]:
+        for path in directory.glob(f"{sidecar.stem}.*"):
+            path.unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Metadata of stored profiles, newest first."""
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for sidecar in sorted(directory.glob("*.json"), reverse=True):
+        if not _PROFILE_ID_RE.match(sidecar.stem):
+            continue
+        try:
+            profiles.append(json.loads(sidecar.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+# ── Admin views ──────────────────────────────────────────────────────
+@staff_member_required
+def profile_list(request):
+    """
+    GET /admin/profiles/  → recent profiles (newest first) with download
+                            links, plus fresh X-Profile header values
+    """
+    profiles = list_profiles()
+    for profile in profiles:
+        profile["download_url"] = request.build_absolute_uri(
+            reverse("profile-download", kwargs={"profile_id": profile["id"]})
+        )
+    return JsonResponse(
+        {
+            "enabled": settings.PROFILING_ENABLED,
+            "sample_rate": settings.PROFILING_SAMPLE_RATE,
+            "headers": {mode: {HEADER: make_token(mode)} for mode in MODES},
+            "header_max_age": settings.PROFILING_TOKEN_MAX_AGE,
+            "profiles": profiles,
+        }
+    )
+
+
+@staff_member_required
+def profile_download(request, profile_id):
+    """GET /admin/profiles/{id}/download/  → the .pstats / .speedscope.json file"""
+    if not _PROFILE_ID_RE.match(profile_id):
+        raise Http404
+    for suffix in (".pstats", ".speedscope.json"):
+        path = _profile_dir() / f"{profile_id}{suffix}"
+        if path.is_file():
+            break
+    else:
+        raise Http404
+    return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
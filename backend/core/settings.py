@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -103,6 +104,8 @@ else:
             "PORT": config("DB_PORT", default="5432"),
         }
     }
+    # Trigram lookups / indexes used by the patient autocomplete endpoint
+    INSTALLED_APPS += ["django.contrib.postgres"]
 
 # =============================================================================
 # Password validation
@@ -148,17 +151,94 @@ CORS_ALLOWED_ORIGINS = config(
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # =============================================================================
-# AI Provider  (openai | ollama | mock)
+# AI Provider  (openai | ollama | auto | mock)
 # =============================================================================
 AI_PROVIDER = config("AI_PROVIDER", default="openai")
 
 # — OpenAI
 OPENAI_API_KEY = config("OPENAI_API_KEY", default="")
 OPENAI_MODEL = config("OPENAI_MODEL", default="gpt-4o-mini")
+# Leave empty for api.openai.com; point at `manage.py serve_simulated_llm`
+# (e.g. http://localhost:8099/v1) for load tests.
+OPENAI_BASE_URL = config("OPENAI_BASE_URL", default="")
 
 # — Ollama (local)
 OLLAMA_BASE_URL = config("OLLAMA_BASE_URL", default="http://localhost:11434/v1")
 OLLAMA_MODEL = config("OLLAMA_MODEL", default="phi3.5:3.8b-mini-instruct-q4_K_M")
+# How long Ollama keeps the model loaded after a request (Ollama duration
+# syntax, e.g. "10m"); renewed by the Celery keep-alive while tasks queue.
+OLLAMA_KEEP_ALIVE = config("OLLAMA_KEEP_ALIVE", default="10m")
+
+# — Worker warm-up (core/celery.py): build clients, load and prime the
+#   Ollama model at worker start, ping it every AI_KEEP_ALIVE_INTERVAL
+#   seconds while the queue is not empty
+AI_WARMUP_ENABLED = config("AI_WARMUP_ENABLED", default=True, cast=bool)
+AI_KEEP_ALIVE_INTERVAL = config("AI_KEEP_ALIVE_INTERVAL", default=60.0, cast=float)
+
+# — Client timeouts (per HTTP request; the SDK retries 429s / 5xx itself)
+AI_REQUEST_TIMEOUT = config("AI_REQUEST_TIMEOUT", default=60.0, cast=float)
+AI_MAX_RETRIES = config("AI_MAX_RETRIES", default=2, cast=int)
+
+# — Mock provider simulation.  All zero (the default) keeps the instant,
+#   deterministic mock; otherwise "mock" sleeps base latency (fixed |
+#   uniform ± jitter | lognormal with median latency and sigma jitter) plus
+#   per-token costs, and fails the given share of calls with a timeout or
+#   a 429.  The same knobs drive `manage.py serve_simulated_llm`.
+AI_MOCK_LATENCY = config("AI_MOCK_LATENCY", default=0.0, cast=float)
+AI_MOCK_LATENCY_DISTRIBUTION = config("AI_MOCK_LATENCY_DISTRIBUTION", default="fixed")
+AI_MOCK_LATENCY_JITTER = config("AI_MOCK_LATENCY_JITTER", default=0.0, cast=float)
+AI_MOCK_SECONDS_PER_PROMPT_TOKEN = config("AI_MOCK_SECONDS_PER_PROMPT_TOKEN", default=0.0, cast=float)
+AI_MOCK_SECONDS_PER_COMPLETION_TOKEN = config("AI_MOCK_SECONDS_PER_COMPLETION_TOKEN", default=0.0, cast=float)
+AI_MOCK_TIMEOUT_RATE = config("AI_MOCK_TIMEOUT_RATE", default=0.0, cast=float)
+AI_MOCK_RATE_LIMIT_RATE = config("AI_MOCK_RATE_LIMIT_RATE", default=0.0, cast=float)
+
+# — Routing (AI_PROVIDER=auto): short notes go to Ollama, long ones to
+#   OpenAI; a hedged request is sent to the other provider when the first
+#   has not answered within its rolling p90 latency.
+AI_ROUTING_SHORT_NOTE_TOKENS = config("AI_ROUTING_SHORT_NOTE_TOKENS", default=400, cast=int)
+AI_ROUTING_HEDGE = config("AI_ROUTING_HEDGE", default=True, cast=bool)
+AI_ROUTING_HEDGE_DELAY = config("AI_ROUTING_HEDGE_DELAY", default=5.0, cast=float)
+AI_ROUTING_WINDOW = config("AI_ROUTING_WINDOW", default=100, cast=int)
+AI_ROUTING_MIN_SAMPLES = config("AI_ROUTING_MIN_SAMPLES", default=20, cast=int)
+AI_ROUTING_MAX_ERROR_RATE = config("AI_ROUTING_MAX_ERROR_RATE", default=0.5, cast=float)
+
+# — Token budgets (notes above AI_MAX_PROMPT_TOKENS are summarised map-reduce)
+AI_MAX_PROMPT_TOKENS = config("AI_MAX_PROMPT_TOKENS", default=3000, cast=int)
+AI_CHUNK_TOKENS = config("AI_CHUNK_TOKENS", default=1500, cast=int)
+AI_SUMMARY_MAX_TOKENS = config("AI_SUMMARY_MAX_TOKENS", default=512, cast=int)
+AI_CONDENSE_MAX_TOKENS = config("AI_CONDENSE_MAX_TOKENS", default=256, cast=int)
+AI_MAP_CONCURRENCY = config("AI_MAP_CONCURRENCY", default=4, cast=int)
+
+# — Structured summaries: ask for JSON (chief_complaints, assessment, summary)
+#   via response_format, store it in ConsultationSummary.data and render the
+#   markdown ai_summary from it (enables ?complaint= filtering)
+AI_STRUCTURED_SUMMARIES = config("AI_STRUCTURED_SUMMARIES", default=False, cast=bool)
+
+# — Packed summaries (summarize_consultations(), `manage.py pack_summaries`):
+#   notes up to AI_PACK_SHORT_NOTE_TOKENS share completions, as many as fit
+#   the model's context window (context_tokens) with AI_PACK_ITEM_MAX_TOKENS
+#   of answer each, at most AI_PACK_MAX_ITEMS per completion
+AI_CONTEXT_TOKENS = config("AI_CONTEXT_TOKENS", default=16000, cast=int)
+AI_PACK_SHORT_NOTE_TOKENS = config("AI_PACK_SHORT_NOTE_TOKENS", default=300, cast=int)
+AI_PACK_ITEM_MAX_TOKENS = config("AI_PACK_ITEM_MAX_TOKENS", default=256, cast=int)
+AI_PACK_MAX_ITEMS = config("AI_PACK_MAX_ITEMS", default=8, cast=int)
+
+# — Patient roll-up summaries (new consultation summaries folded per call)
+AI_ROLLUP_MAX_TOKENS = config("AI_ROLLUP_MAX_TOKENS", default=384, cast=int)
+AI_ROLLUP_BATCH_SIZE = config("AI_ROLLUP_BATCH_SIZE", default=5, cast=int)
+
+# Per-model overrides of the budgets above.  Ollama serves models with a
+# 2048-token context window unless num_ctx is raised, so keep prompts small.
+AI_MODEL_TOKEN_BUDGETS = {
+    OLLAMA_MODEL: {"max_prompt_tokens": 1200, "chunk_tokens": 600, "context_tokens": 2048},
+}
+
+# — Embeddings for similar-consultation lookup  (hashing | openai | ollama)
+#   "hashing" needs no model or network.  Each process holds 4 × dimensions
+#   bytes per consultation in memory (≈512 MB per million rows at 128).
+AI_EMBEDDING_PROVIDER = config("AI_EMBEDDING_PROVIDER", default="hashing")
+AI_EMBEDDING_MODEL = config("AI_EMBEDDING_MODEL", default="text-embedding-3-small")
+AI_EMBEDDING_DIMENSIONS = config("AI_EMBEDDING_DIMENSIONS", default=128, cast=int)
 
 # =============================================================================
 # Celery
@@ -169,6 +249,92 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "refresh-consultation-rollups": {
+        "task": "consultations.tasks.refresh_rollups_task",
+        "schedule": config("ROLLUP_INTERVAL", default=60.0, cast=float),
+    },
+}
+
+# Transactional outbox: requests write tasks to the database and
+# `manage.py dispatch_outbox` publishes them to the broker in batches.
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=100, cast=int)
+OUTBOX_POLL_INTERVAL = config("OUTBOX_POLL_INTERVAL", default=0.2, cast=float)
+
+# =============================================================================
+# Batch summaries (`manage.py batch_summaries`) — backfills go through the
+# provider's batch API; request / result files are kept in AI_BATCH_DIR
+# =============================================================================
+AI_BATCH_DIR = config("AI_BATCH_DIR", default=str(BASE_DIR / "batches"))
+AI_BATCH_MAX_REQUESTS = config("AI_BATCH_MAX_REQUESTS", default=50000, cast=int)
+AI_BATCH_COMPLETION_WINDOW = config("AI_BATCH_COMPLETION_WINDOW", default="24h")
+AI_BATCH_POLL_INTERVAL = config("AI_BATCH_POLL_INTERVAL", default=60.0, cast=float)
+# Batches a consultation may fail in before it is left to generate_summary_task
+AI_BATCH_MAX_ATTEMPTS = config("AI_BATCH_MAX_ATTEMPTS", default=3, cast=int)
+
+# =============================================================================
+# Patient autocomplete
+# =============================================================================
+PATIENT_AUTOCOMPLETE_LIMIT = config("PATIENT_AUTOCOMPLETE_LIMIT", default=10, cast=int)
+PATIENT_AUTOCOMPLETE_CACHE_SECONDS = config("PATIENT_AUTOCOMPLETE_CACHE_SECONDS", default=30, cast=int)
+
+# =============================================================================
+# Consultation list previews (?preview=true → truncate text fields server-side)
+# =============================================================================
+CONSULTATION_PREVIEW_LENGTH = config("CONSULTATION_PREVIEW_LENGTH", default=160, cast=int)
+CONSULTATION_PREVIEW_MAX_LENGTH = 1000
+
+# =============================================================================
+# Consultation changes feed (GET /api/consultations/changes/?since=<cursor>)
+# =============================================================================
+CONSULTATION_CHANGES_PAGE_SIZE = config("CONSULTATION_CHANGES_PAGE_SIZE", default=100, cast=int)
+CONSULTATION_CHANGES_MAX_PAGE_SIZE = 1000
+
+# =============================================================================
+# Analytics dashboard (GET /api/analytics/dashboard/) — served from rollup
+# tables refreshed by the beat task above
+# =============================================================================
+ROLLUP_BATCH_SIZE = config("ROLLUP_BATCH_SIZE", default=5000, cast=int)
+ANALYTICS_DASHBOARD_DAYS = 30
+ANALYTICS_DASHBOARD_MAX_DAYS = 366
+ANALYTICS_TOP_DIAGNOSES = 10
+ANALYTICS_MAX_TOP_DIAGNOSES = 100
+
+# =============================================================================
+# Similar consultations (GET /api/consultations/{id}/similar/?k=N)
+# Every web worker holds all vectors in memory: 4 × AI_EMBEDDING_DIMENSIONS
+# bytes per consultation, ~512 MB per worker at 1M consultations × 128.
+# Without the preload the first request in each worker pays for loading them;
+# with it, core/wsgi.py loads them at startup (once, shared copy-on-write,
+# under gunicorn --preload).
+# =============================================================================
+SIMILAR_CONSULTATIONS_LIMIT = config("SIMILAR_CONSULTATIONS_LIMIT", default=5, cast=int)
+SIMILAR_CONSULTATIONS_MAX_LIMIT = 50
+SIMILAR_CONSULTATIONS_PRELOAD = config("SIMILAR_CONSULTATIONS_PRELOAD", default=False, cast=bool)
+
+# =============================================================================
+# Django admin — changelists use planner row estimates above this many rows
+# (Postgres only; see consultations/admin_utils.py)
+# =============================================================================
+ADMIN_EXACT_COUNT_THRESHOLD = config("ADMIN_EXACT_COUNT_THRESHOLD", default=10000, cast=int)
+
+# =============================================================================
+# Summary timings (GET /api/summary-timings/stats/)
+# =============================================================================
+SUMMARY_TIMING_RETENTION_DAYS = config("SUMMARY_TIMING_RETENTION_DAYS", default=30, cast=int)
+SUMMARY_TIMING_MAX_BUCKETS = 500
+
+# =============================================================================
+# Request profiling (X-Profile header signed with SECRET_KEY, or sampling).
+# Profiles are listed for staff at /admin/profiles/
+# =============================================================================
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+PROFILING_MODE = config("PROFILING_MODE", default="sampling")  # "sampling" or "cprofile"
+PROFILING_SAMPLING_INTERVAL = config("PROFILING_SAMPLING_INTERVAL", default=0.005, cast=float)
+PROFILING_TOKEN_MAX_AGE = config("PROFILING_TOKEN_MAX_AGE", default=3600, cast=int)
+PROFILING_DIR = config("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_MAX_FILES = config("PROFILING_MAX_FILES", default=200, cast=int)
 
 # =============================================================================
 # REST Framework & Swagger (drf-spectacular)
@@ -23,12 +23,21 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from core import profiling
+
 
 def health_check(request):
     return JsonResponse({"status": "ok"})
 
 
 urlpatterns = [
+    # Registered ahead of the admin site so its catch-all does not shadow them.
+    path("admin/profiles/", profiling.profile_list, name="profile-list"),
+    path(
+        "admin/profiles/<str:profile_id>/download/",
+        profiling.profile_download,
+        name="profile-download",
+    ),
     path("admin/", admin.site.urls),
     path("api/health/", health_check, name="health-check"),
     path("api/", include("consultations.urls")),
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402  (needs the app registry)
+
+if settings.SIMILAR_CONSULTATIONS_PRELOAD:
+    from consultations.embeddings import preload_similarity_index
+
+    preload_similarity_index()
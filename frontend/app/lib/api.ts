@@ -19,6 +19,14 @@ export interface Consultation {
     diagnosis: string;
     created_at: string;
     ai_summary: string | null;
+    ai_summary_data: SummaryData | null;
+}
+
+// Structured summary, present when the backend runs with AI_STRUCTURED_SUMMARIES.
+export interface SummaryData {
+    chief_complaints: string[];
+    assessment: string;
+    summary: string;
 }
 
 export interface PaginatedResponse<T> {
@@ -34,6 +42,15 @@ export async function fetchPatients(page: number = 1): Promise<PaginatedResponse
     return res.json();
 }
 
+export type PatientSuggestion = Pick<Patient, 'id' | 'full_name' | 'email'>;
+
+export async function searchPatients(query: string, limit: number = 10): Promise<PatientSuggestion[]> {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    const res = await fetch(`${API_URL}/patients/autocomplete/?${params}`);
+    if (!res.ok) throw new Error('Failed to search patients');
+    return res.json();
+}
+
 export async function createPatient(data: Omit<Patient, 'id'>): Promise<Patient> {
     const res = await fetch(`${API_URL}/patients/`, {
         method: 'POST',
@@ -44,11 +61,14 @@ export async function createPatient(data: Omit<Patient, 'id'>): Promise<Patient>
     return res.json();
 }
 
-export async function fetchConsultations(page: number = 1, patientId?: string | number): Promise<PaginatedResponse<Consultation>> {
+export async function fetchConsultations(page: number = 1, patientId?: string | number, complaint?: string): Promise<PaginatedResponse<Consultation>> {
     let url = `${API_URL}/consultations/?page_size=9&page=${page}`;
     if (patientId) {
         url += `&patient=${patientId}`;
     }
+    if (complaint) {
+        url += `&complaint=${encodeURIComponent(complaint)}`;
+    }
     const res = await fetch(url, { cache: 'no-store' });
     if (!res.ok) throw new Error('Failed to fetch consultations');
     return res.json();
@@ -60,6 +80,25 @@ export async function fetchConsultation(id: string | number): Promise<Consultati
     return res.json();
 }
 
+export type SimilarConsultation = Consultation & { similarity: number };
+
+export async function fetchSimilarConsultations(id: string | number, k: number = 5): Promise<SimilarConsultation[]> {
+    const res = await fetch(`${API_URL}/consultations/${id}/similar/?k=${k}`, { cache: 'no-store' });
+    if (!res.ok) throw new Error('Failed to fetch similar consultations');
+    return res.json();
+}
+
+export type ConsultationChanges = { results: Consultation[]; next: string; has_more: boolean };
+
+// Consultations created or updated since `since` (the `next` of a previous call).
+export async function fetchConsultationChanges(since?: string, limit: number = 100): Promise<ConsultationChanges> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (since) params.set('since', since);
+    const res = await fetch(`${API_URL}/consultations/changes/?${params}`, { cache: 'no-store' });
+    if (!res.ok) throw new Error('Failed to fetch consultation changes');
+    return res.json();
+}
+
 export async function createConsultation(data: { patient: number; symptoms: string; diagnosis?: string }): Promise<Consultation> {
     const res = await fetch(`${API_URL}/consultations/`, {
         method: 'POST',